@@ -0,0 +1,101 @@
+"""
+Throughput benchmark for database/bulk_onboard.py.
+
+Generates N synthetic hires (emails under @bench.example), seeds enough
+seats/equipment for them, runs the bulk pipeline and reports rows/sec.
+Everything it created is deleted afterwards.
+
+    python benchmarks/bench_bulk_onboard.py --rows 10000
+"""
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+
+import psycopg
+from dotenv import load_dotenv
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "database"))
+from bulk_onboard import run
+from inventory import KIT_ACCESSORIES
+
+DOMAIN = "bench.example"
+SERIAL_PREFIX = "BENCH-"
+
+
+def write_hires(path: str, n: int, bad_ratio: float) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            row = {
+                "name": f"Bench Hire {i}",
+                "email": f"hire{i}@{DOMAIN}",
+                "phone": f"+1-555-{i:07d}",
+                "seat_type": random.choice(["cabin", "cubicle"]),
+                "os_requirement": random.choice(["linux", "windows", "macos"]),
+            }
+            if random.random() < bad_ratio:
+                row["email"] = "not-an-email"
+            f.write(json.dumps(row) + "\n")
+
+
+def seed(conn, n: int) -> int:
+    """Seed inventory; returns the seat_id watermark to clean up above."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT COALESCE(MAX(seat_id), 0) FROM onboarding.seating_space")
+        watermark = cur.fetchone()[0]
+        for seat_type in ("cabin", "cubicle"):
+            cur.execute(
+                "INSERT INTO onboarding.seating_space (seat_type) SELECT %s FROM generate_series(1, %s)",
+                (seat_type, n),
+            )
+        for os_ in ("linux", "windows", "macos"):
+            cur.execute(
+                "INSERT INTO onboarding.equipments (equipment_type, os, serial_number) "
+                "SELECT 'laptop', %s, %s || 'LT-' || %s || '-' || g FROM generate_series(1, %s) g",
+                (os_, SERIAL_PREFIX, os_, n),
+            )
+        for t in KIT_ACCESSORIES:
+            cur.execute(
+                "INSERT INTO onboarding.equipments (equipment_type, serial_number) "
+                "SELECT %s, %s || %s || '-' || g FROM generate_series(1, %s) g",
+                (t, SERIAL_PREFIX, t, n),
+            )
+    conn.commit()
+    return watermark
+
+
+def cleanup(conn, seat_watermark: int) -> None:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM onboarding.employees WHERE email LIKE %s", (f"%@{DOMAIN}",))
+        cur.execute("DELETE FROM onboarding.equipments WHERE serial_number LIKE %s", (SERIAL_PREFIX + "%",))
+        cur.execute("DELETE FROM onboarding.seating_space WHERE seat_id > %s", (seat_watermark,))
+    conn.commit()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--bad-ratio", type=float, default=0.01)
+    args = ap.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL")
+    with psycopg.connect(dsn) as conn:
+        watermark = seed(conn, args.rows)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "hires.jsonl")
+            write_hires(path, args.rows, args.bad_ratio)
+            try:
+                report = run(path, dsn)
+            finally:
+                cleanup(conn, watermark)
+    failures = report.pop("failures")
+    print(report, f"failures={len(failures)}")
+
+
+if __name__ == "__main__":
+    main()
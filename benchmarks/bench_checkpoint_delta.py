@@ -0,0 +1,134 @@
+"""
+Checkpoint write amplification and resume time: stock PostgresSaver vs
+DeltaPostgresSaver (checkpoint_delta.py) on long threads.
+
+A minimal graph with the agent's `messages` and `token_counts` channels
+appends a user and an assistant message per turn and records their token
+counts; every --summary-every turns it drops the counts the agent prunes
+when a summary lands (0 = never, to see the channel grow). After every turn the bytes the turn added to
+checkpoints / checkpoint_blobs / checkpoint_writes are measured; at the
+end a cold saver (empty in-process cache) times get_tuple on the thread.
+
+    python benchmarks/bench_checkpoint_delta.py --turns 200 --reply-chars 600
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+from typing import TypedDict, Annotated
+
+import psycopg
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.checkpoint.postgres import PostgresSaver
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from checkpoint_delta import DeltaPostgresSaver
+from onboarding_chatbot_with_profile import merge_counts, LAST_K
+
+THREAD_PREFIX = "bench-ckpt-"
+
+BYTES_SQL = """
+    SELECT (SELECT COALESCE(sum(pg_column_size(c.*)), 0) FROM checkpoints c WHERE c.thread_id = %(t)s)
+         + (SELECT COALESCE(sum(pg_column_size(b.*)), 0) FROM checkpoint_blobs b WHERE b.thread_id = %(t)s)
+         + (SELECT COALESCE(sum(pg_column_size(w.*)), 0) FROM checkpoint_writes w WHERE w.thread_id = %(t)s);
+"""
+
+CLEANUP_SQL = [
+    "DELETE FROM checkpoint_writes WHERE thread_id LIKE %s",
+    "DELETE FROM checkpoint_blobs WHERE thread_id LIKE %s",
+    "DELETE FROM checkpoints WHERE thread_id LIKE %s",
+]
+
+
+class State(TypedDict):
+    messages: Annotated[list[BaseMessage], add_messages]
+    token_counts: Annotated[dict, merge_counts]
+
+
+def build(checkpointer, reply_chars: int, summary_every: int):
+    def reply(s: State) -> State:
+        msgs = s["messages"]
+        n = len(msgs)
+        ai = AIMessage(content=f"reply {n}: " + "x" * reply_chars, id=f"a{n}")
+        counts = {msgs[-1].id: len(str(msgs[-1].content)) // 4, ai.id: len(ai.content) // 4}
+        if summary_every and (n // 2 + 1) % summary_every == 0:
+            # what OnboardingAgent._summarize drops once the summary covers these
+            counts.update({m.id: None for m in msgs[max(n - 2 * summary_every - LAST_K, 0):max(n - LAST_K, 0)]})
+        return {"messages": [ai], "token_counts": counts}
+
+    g = StateGraph(State)
+    g.add_node("reply", reply)
+    g.add_edge(START, "reply")
+    g.add_edge("reply", END)
+    return g.compile(checkpointer=checkpointer)
+
+
+def run(name: str, saver_cls, dsn: str, turns: int, reply_chars: int, resume_reps: int,
+        summary_every: int) -> dict:
+    thread = f"{THREAD_PREFIX}{name}-{int(time.time())}"
+    cfg = {"configurable": {"thread_id": thread}}
+    with psycopg.connect(dsn, autocommit=True) as conn, psycopg.connect(dsn, autocommit=True) as meter:
+        saver = saver_cls(conn)
+        saver.setup()
+        app = build(saver, reply_chars, summary_every)
+        per_turn, turn_s = [], []
+        before = 0
+        for i in range(turns):
+            t = time.perf_counter()
+            app.invoke({"messages": [HumanMessage(content=f"user turn {i}")]}, config=cfg)
+            turn_s.append(time.perf_counter() - t)
+            total = meter.execute(BYTES_SQL, {"t": thread}).fetchone()[0]
+            per_turn.append(total - before)
+            before = total
+
+        # cold resume: a fresh saver has nothing cached for this thread
+        cold = saver_cls(conn)
+        resume = []
+        for _ in range(resume_reps):
+            t = time.perf_counter()
+            tup = cold.get_tuple(cfg)
+            resume.append(time.perf_counter() - t)
+        n_messages = len(tup.checkpoint["channel_values"]["messages"])
+        n_counts = len(tup.checkpoint["channel_values"].get("token_counts") or {})
+        assert n_messages == 2 * turns, (n_messages, turns)
+
+    tenth = max(turns // 10, 1)
+    return {
+        "saver": name,
+        "total_kb": round(before / 1024, 1),
+        "bytes_per_turn_first10pct": int(statistics.mean(per_turn[:tenth])),
+        "bytes_per_turn_last10pct": int(statistics.mean(per_turn[-tenth:])),
+        "turn_ms_p50": round(statistics.median(turn_s) * 1000, 2),
+        "resume_ms_p50": round(statistics.median(resume) * 1000, 2),
+        "messages": n_messages,
+        "token_counts": n_counts,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=200)
+    ap.add_argument("--reply-chars", type=int, default=600)
+    ap.add_argument("--resume-reps", type=int, default=20)
+    ap.add_argument("--summary-every", type=int, default=4, help="turns between token_counts prunes (0 = never)")
+    ap.add_argument("--keep", action="store_true", help="leave the benchmark threads in place")
+    args = ap.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL")
+    try:
+        for name, cls in (("stock", PostgresSaver), ("delta", DeltaPostgresSaver)):
+            print(run(name, cls, dsn, args.turns, args.reply_chars, args.resume_reps, args.summary_every))
+    finally:
+        if not args.keep:
+            with psycopg.connect(dsn, autocommit=True) as conn:
+                for sql in CLEANUP_SQL:
+                    conn.execute(sql, (THREAD_PREFIX + "%",))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Microbenchmarks for the Employee model.
+
+  per-record: build an Employee via update_field, then missing_fields /
+              is_ready_for_insert / to_dict, as the chat flow does per turn
+  bulk:       validate N candidate records with validate_records (column-wise)
+              vs. the per-record loop over the same data
+
+    python benchmarks/bench_employee.py --records 10000
+"""
+import os
+import sys
+import random
+import argparse
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from employee import Employee, validate_records
+
+FIELDS = ("name", "email", "phone", "seat_type", "os_requirement")
+
+
+def make_records(n: int):
+    recs = []
+    for i in range(n):
+        recs.append({
+            "name": f"Hire {i}",
+            "email": f" Hire{i}@Example.com " if random.random() > 0.02 else "broken",
+            "phone": f"+1555{i:07d}",
+            "seat_type": random.choice(["Cabin", "cubicle", "CUBICLE"]),
+            "os_requirement": random.choice(["linux", "Windows", "mac", "macos"]),
+        })
+    return recs
+
+
+def per_record(rec):
+    emp = Employee()
+    errors = []
+    for k in FIELDS:
+        try:
+            emp.update_field(k, rec[k])
+        except ValueError as e:
+            errors.append(str(e))
+    emp.missing_fields()
+    emp.is_ready_for_insert()
+    emp.to_dict()
+    return emp, errors
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--records", type=int, default=10_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    recs = make_records(args.records)
+    one = recs[0]
+    n = 100_000
+    t = min(timeit.repeat(lambda: per_record(one), number=n, repeat=args.repeat))
+    print(f"per-record update+checks+to_dict: {t / n * 1e6:.2f} µs")
+
+    emp = per_record(one)[0]
+    for name, fn in (("missing_fields", emp.missing_fields),
+                     ("is_ready_for_insert", emp.is_ready_for_insert),
+                     ("to_dict", emp.to_dict)):
+        t = min(timeit.repeat(fn, number=n, repeat=args.repeat))
+        print(f"  {name:20s} {t / n * 1e6:.3f} µs")
+
+    t_loop = min(timeit.repeat(lambda: [per_record(r) for r in recs], number=1, repeat=args.repeat))
+    t_bulk = min(timeit.repeat(lambda: validate_records(recs, FIELDS), number=1, repeat=args.repeat))
+    print(f"{args.records} records, per-record loop: {t_loop * 1000:.1f} ms ({args.records / t_loop:,.0f} rows/s)")
+    print(f"{args.records} records, validate_records: {t_bulk * 1000:.1f} ms ({args.records / t_bulk:,.0f} rows/s)")
+    print(f"Employee instance size: slots={hasattr(Employee, '__slots__')}, has __dict__={hasattr(emp, '__dict__')}")
+
+
+if __name__ == "__main__":
+    main()
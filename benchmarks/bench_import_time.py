@@ -0,0 +1,84 @@
+"""
+Cold-start (import) time of each entry point, in fresh interpreters.
+
+DATABASE_URL points at an unreachable address, so any connection attempt at
+import time shows up as a failure or a timeout instead of a fast import.
+Each entry point also lists which of the HEAVY modules its import pulled in
+(those should load on first use, not at import). Save a run on the old tree
+and compare against it for a before/after:
+
+    git stash; python benchmarks/bench_import_time.py --save before.json; git stash pop
+    python benchmarks/bench_import_time.py --repeat 5 --compare before.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+ENTRY_POINTS = {
+    "llm_tools": "import llm_tools",
+    "llm_tools+get_tools": "import llm_tools; llm_tools.get_tools()",
+    "mcp_tools": "import mcp_tools",
+    "onboarding_chat_agent": "import onboarding_chat_agent",
+    "onboarding_chatbot_with_profile": "import onboarding_chatbot_with_profile",
+    "employee": "import employee",
+}
+
+HEAVY = ("psycopg", "psycopg_pool", "fastmcp", "langgraph", "langchain_openai",
+         "metrics", "inventory_cache", "tool_executor", "checkpoint_retention", "hold_sweeper", "outbox")
+LOADED = "; import sys; print(' '.join(m for m in %r if m in sys.modules))" % (HEAVY,)
+
+
+def measure(code: str, repeat: int) -> dict:
+    env = dict(os.environ, DATABASE_URL="postgresql://nobody@10.255.255.1:5432/none?connect_timeout=2",
+               PYTHONDONTWRITEBYTECODE="1")
+    times, err = [], None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", code + LOADED], cwd=ROOT, env=env,
+                              capture_output=True, text=True)
+        times.append(time.perf_counter() - t)
+        if proc.returncode != 0:
+            err = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            break
+    heavy = proc.stdout.strip().splitlines()[-1].split() if not err and proc.stdout.strip() else []
+    return {"median_ms": round(statistics.median(times) * 1000, 1),
+            "min_ms": round(min(times) * 1000, 1), "heavy": heavy, "error": err}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--save", help="write results JSON here")
+    ap.add_argument("--compare", help="results JSON from an earlier --save to diff against")
+    args = ap.parse_args()
+
+    before = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            before = json.load(f)
+
+    baseline = measure("pass", args.repeat)
+    results = {"interpreter": baseline}
+    print(f"{'interpreter':34s} {baseline['median_ms']:>8} ms")
+    for name, code in ENTRY_POINTS.items():
+        r = measure(code, args.repeat)
+        results[name] = r
+        line = f"{name:34s} {r['median_ms']:>8} ms"
+        if name in before:
+            line += f"   (before {before[name]['median_ms']} ms, {r['median_ms'] - before[name]['median_ms']:+.1f})"
+        if r["heavy"]:
+            line += f"   loads: {' '.join(r['heavy'])}"
+        print(line + (f"   ERROR: {r['error']}" if r["error"] else ""))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Load test: blocking vs async seat-claim handlers under one event loop.
+
+"blocking" reproduces the previous mcp_tools handler (async def around a
+sync ConnectionPool, max_size=5); "async" is the current AsyncConnectionPool
+path. Both run N concurrent sessions in the same asyncio loop, which is what
+FastMCP does with streamable-http. Seats claimed here are released afterwards.
+
+    python benchmarks/bench_mcp_load.py --requests 2000 --concurrency 200
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+from dotenv import load_dotenv
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from inventory import claim_seat, aclaim_seat
+
+OWNER_PREFIX = "loadtest-"
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+async def drive(handler, requests: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        async with sem:
+            t = time.perf_counter()
+            await handler(f"{OWNER_PREFIX}{i}")
+            latencies.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def release_all(dsn: str) -> None:
+    with ConnectionPool(dsn, min_size=1, max_size=1) as pool, pool.connection() as conn:
+        conn.execute(
+            "UPDATE onboarding.seating_space SET claimed_by = NULL, claimed_at = NULL "
+            "WHERE claimed_by LIKE %s AND employee_id IS NULL",
+            (OWNER_PREFIX + "%",),
+        )
+
+
+async def main_async(args):
+    dsn = os.getenv("DATABASE_URL")
+
+    sync_pool = ConnectionPool(dsn, min_size=1, max_size=5, kwargs={"row_factory": dict_row})
+
+    async def blocking(owner):
+        with sync_pool.connection() as conn:
+            return claim_seat(conn, args.seat_type, claimed_by=owner)
+
+    release_all(dsn)
+    print("blocking", await drive(blocking, args.requests, args.concurrency))
+    sync_pool.close()
+    release_all(dsn)
+
+    async with AsyncConnectionPool(
+        dsn, min_size=args.pool_size, max_size=args.pool_size,
+        kwargs={"row_factory": dict_row}, open=False,
+    ) as apool:
+        async def non_blocking(owner):
+            async with apool.connection() as conn:
+                return await aclaim_seat(conn, args.seat_type, claimed_by=owner)
+
+        print("async   ", await drive(non_blocking, args.requests, args.concurrency))
+    release_all(dsn)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--pool-size", type=int, default=20)
+    ap.add_argument("--seat-type", default=None)
+    args = ap.parse_args()
+    load_dotenv()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
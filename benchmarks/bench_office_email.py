@@ -0,0 +1,211 @@
+"""
+Office address generation for employees sharing popular names.
+
+Creates N employees (personal emails under @bench.example) whose names are
+drawn, Zipf-weighted, from a small set of common first/last names, so the
+top names have thousands of holders. Then times giving all of them an office
+address three ways:
+
+  naive    guess first.last, first.last2, ... and retry on the unique index
+           (one savepoint per guess; quadratic, so only --naive-rows of them)
+  counter  office_email.assign_office_email, one employee per transaction
+           (the confirm_assignment path)
+  bulk     bulk_onboard.py's block reservation, whole cohort in one statement
+
+and finally hammers a single name from --threads connections at once to
+check that every address is distinct and the suffixes have no gaps.
+Everything it created is deleted afterwards.
+
+    python benchmarks/bench_office_email.py --rows 100000 --naive-rows 5000 --threads 16
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+
+import psycopg
+from psycopg.rows import dict_row
+from dotenv import load_dotenv
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "database"))
+from office_email import assign_office_email, local_base, office_address
+from bulk_onboard import STAGE_SQL, ASSIGN_OFFICE_EMAILS_SQL
+
+DOMAIN = "bench.example"  # personal and office addresses, so cleanup finds both
+FIRST = ["Maria", "James", "Wei", "Mohammed", "Anna", "John", "Priya", "David", "Sofia", "Michael",
+         "Fatima", "Daniel", "Olga", "Carlos", "Emma", "Ahmed", "Laura", "Jose", "Mei", "Peter"]
+LAST = ["Garcia", "Smith", "Wang", "Khan", "Kumar", "Lee", "Nguyen", "Rodriguez", "Brown", "Chen",
+        "Silva", "Johnson", "Ivanova", "Martinez", "Muller", "Ali", "Rossi", "Lopez", "Zhang", "Jones"]
+
+# Put the counters of the names we touched back to what the remaining employees use.
+RECONCILE_SQL = """
+    UPDATE onboarding.office_local_parts p
+    SET last_suffix = COALESCE((SELECT max(e.office_suffix) FROM onboarding.employees e
+                                WHERE e.office_local_base = p.local_base), 0)
+    WHERE p.local_base = ANY(%s);
+"""
+
+CHECK_SQL = """
+    SELECT count(*) AS n, count(office_email) AS assigned, count(DISTINCT office_email) AS distinct_
+    FROM onboarding.employees WHERE email LIKE %s;
+"""
+
+
+def names(n: int, rng: random.Random) -> list:
+    wf = [1 / (i + 1) for i in range(len(FIRST))]
+    wl = [1 / (i + 1) for i in range(len(LAST))]
+    return [f"{rng.choices(FIRST, wf)[0]} {rng.choices(LAST, wl)[0]}" for _ in range(n)]
+
+
+def create(conn, people: list, tag: str) -> list:
+    """Insert the bench employees (no office address yet); returns [(employee_id, name)]."""
+    with conn.cursor() as cur:
+        cur.execute("CREATE TEMP TABLE bench_people (i INT, name TEXT) ON COMMIT DROP")
+        with cur.copy("COPY bench_people (i, name) FROM STDIN") as copy:
+            for i, name in enumerate(people):
+                copy.write_row((i, name))
+        cur.execute(
+            "INSERT INTO onboarding.employees (name, email) "
+            "SELECT name, %s || i || '@' || %s FROM bench_people ORDER BY i "
+            "RETURNING employee_ID, name", (tag, DOMAIN))
+        rows = cur.fetchall()
+    conn.commit()
+    return rows
+
+
+def reset(conn, bases: list) -> None:
+    with conn.cursor() as cur:
+        cur.execute("UPDATE onboarding.employees SET office_email = NULL, office_local_base = NULL, "
+                    "office_suffix = NULL WHERE email LIKE %s", (f"%@{DOMAIN}",))
+        cur.execute(RECONCILE_SQL, (bases,))
+    conn.commit()
+
+
+def check(conn) -> dict:
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(CHECK_SQL, (f"%@{DOMAIN}",))
+        return cur.fetchone()
+
+
+def naive(conn, people: list) -> dict:
+    attempts = 0
+    t = time.perf_counter()
+    with conn.cursor() as cur:
+        for employee_id, name in people:
+            base, suffix = local_base(name), 1
+            while True:
+                attempts += 1
+                try:
+                    with conn.transaction():  # savepoint: a collision only undoes this guess
+                        cur.execute("UPDATE onboarding.employees SET office_email = %s WHERE employee_ID = %s",
+                                    (office_address(base, suffix, DOMAIN), employee_id))
+                    break
+                except psycopg.errors.UniqueViolation:
+                    suffix += 1
+            conn.commit()
+    dt = time.perf_counter() - t
+    return {"strategy": "naive", "employees": len(people), "seconds": round(dt, 2),
+            "per_sec": int(len(people) / dt), "statements_per_employee": round(attempts / len(people), 1)}
+
+
+def counter(conn, people: list) -> dict:
+    t = time.perf_counter()
+    with conn.cursor() as cur:
+        for employee_id, name in people:
+            assign_office_email(cur, employee_id, name, DOMAIN)
+            conn.commit()
+    dt = time.perf_counter() - t
+    return {"strategy": "counter", "employees": len(people), "seconds": round(dt, 2),
+            "per_sec": int(len(people) / dt), "statements_per_employee": 1.0}
+
+
+def bulk(conn, people: list) -> dict:
+    t = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(STAGE_SQL)
+        with cur.copy("COPY batch_hires (line_no, name, email, seat_type, os_requirement, local_base, employee_id) "
+                      "FROM STDIN") as copy:
+            for i, (employee_id, name) in enumerate(people):
+                copy.write_row((i, name, f"x{i}", "cubicle", "linux", local_base(name), employee_id))
+        cur.execute(ASSIGN_OFFICE_EMAILS_SQL, {"domain": DOMAIN})
+    conn.commit()
+    dt = time.perf_counter() - t
+    return {"strategy": "bulk", "employees": len(people), "seconds": round(dt, 2),
+            "per_sec": int(len(people) / dt), "statements": 1}
+
+
+def same_name_race(dsn: str, people: list, threads: int) -> dict:
+    """Every thread assigns addresses for its share of `people` (all one name) concurrently."""
+    shares = [people[i::threads] for i in range(threads)]
+    errors = []
+
+    def worker(share):
+        try:
+            with psycopg.connect(dsn) as conn, conn.cursor() as cur:
+                for employee_id, name in share:
+                    assign_office_email(cur, employee_id, name, DOMAIN)
+                    conn.commit()
+        except Exception as e:  # surfaced in the report
+            errors.append(repr(e))
+
+    t = time.perf_counter()
+    ts = [threading.Thread(target=worker, args=(s,)) for s in shares]
+    for th in ts:
+        th.start()
+    for th in ts:
+        th.join()
+    dt = time.perf_counter() - t
+    ids = [employee_id for employee_id, _ in people]
+    with psycopg.connect(dsn) as conn:
+        suffixes = [r[0] for r in conn.execute(
+            "SELECT office_suffix FROM onboarding.employees WHERE employee_ID = ANY(%s) "
+            "AND office_suffix IS NOT NULL ORDER BY 1", (ids,))]
+    return {"strategy": f"same name x{threads} threads", "employees": len(people), "seconds": round(dt, 2),
+            "errors": errors[:3], "distinct": len(set(suffixes)) == len(people),
+            "gapless": suffixes == list(range(suffixes[0], suffixes[0] + len(people))) if suffixes else False}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100_000)
+    ap.add_argument("--naive-rows", type=int, default=5_000, help="naive retry is quadratic in name popularity")
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--race-rows", type=int, default=2_000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL")
+    rng = random.Random(args.seed)
+    people_names = names(args.rows, rng)
+    bases = sorted({local_base(n) for n in people_names} | {local_base(f"{FIRST[0]} {LAST[0]}")})
+    with psycopg.connect(dsn) as conn:
+        try:
+            people = create(conn, people_names, "hire")
+            top, top_n = Counter(local_base(n) for n in people_names).most_common(1)[0]
+            print(f"{len(people)} employees, {len(bases) - 1} distinct names, most common: {top} x{top_n}")
+
+            print(naive(conn, people[:args.naive_rows]), check(conn))
+            reset(conn, bases)
+            print(counter(conn, people), check(conn))
+            reset(conn, bases)
+            print(bulk(conn, people), check(conn))
+            reset(conn, bases)
+
+            racers = create(conn, [f"{FIRST[0]} {LAST[0]}"] * args.race_rows, "racer")
+            print(same_name_race(dsn, racers, args.threads))
+        finally:
+            conn.rollback()
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM onboarding.employees WHERE email LIKE %s", (f"%@{DOMAIN}",))
+                cur.execute(RECONCILE_SQL, (bases,))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
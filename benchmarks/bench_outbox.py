@@ -0,0 +1,107 @@
+"""
+Outbox delivery throughput (outbox.py) with the offline stub consumer.
+
+COPYs N onboarding events (idempotency keys under bench:) into
+onboarding.outbox, then drains them with W workers for each worker count
+and reports events/sec, retries, dead events and duplicate deliveries seen
+by the consumer. With --http the events go over HTTP to
+fake_provisioning_server.py (started in-process) instead of the in-process
+stub. Only the bench rows are counted, but the workers deliver anything
+pending, so run it against a dev database. The bench rows are deleted
+afterwards.
+
+    python benchmarks/bench_outbox.py --events 50000 --workers 1 4 16 --fail-rate 0.02
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+
+import psycopg
+from psycopg.rows import dict_row
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from outbox import OutboxWorker, StubConsumer, HttpConsumer
+from inventory import ONBOARDED_TOPICS
+import fake_provisioning_server
+
+KEY_PREFIX = "bench:"
+PENDING_SQL = "SELECT count(*) AS n FROM onboarding.outbox WHERE idempotency_key LIKE %s AND status = 'pending'"
+STATUS_SQL = "SELECT status, count(*) AS n FROM onboarding.outbox WHERE idempotency_key LIKE %s GROUP BY status"
+
+
+def enqueue(conn, n: int) -> None:
+    payload = json.dumps({"name": "Bench Hire", "email": "hire@bench.example", "seat_id": 1, "items": []})
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM onboarding.outbox WHERE idempotency_key LIKE %s", (KEY_PREFIX + "%",))
+        with cur.copy("COPY onboarding.outbox (idempotency_key, topic, aggregate_id, payload) FROM STDIN") as copy:
+            for i in range(n):
+                topic = ONBOARDED_TOPICS[i % len(ONBOARDED_TOPICS)]
+                copy.write_row((f"{KEY_PREFIX}{topic}:{i}", topic, i, payload))
+    conn.commit()
+
+
+def drain(dsn: str, worker: OutboxWorker, workers: int, n: int) -> dict:
+    stop = threading.Event()
+
+    def loop():
+        with psycopg.connect(dsn, autocommit=True, row_factory=dict_row) as conn:
+            while not stop.is_set():
+                if worker.run_once(conn) == 0:
+                    time.sleep(0.01)  # only backed-off retries left
+
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=loop) for _ in range(workers)]
+    for th in threads:
+        th.start()
+    with psycopg.connect(dsn, autocommit=True, row_factory=dict_row) as conn:
+        while conn.execute(PENDING_SQL, (KEY_PREFIX + "%",)).fetchone()["n"]:
+            time.sleep(0.05)
+        dt = time.perf_counter() - t0
+        stop.set()
+        for th in threads:
+            th.join()
+        status = {r["status"]: r["n"] for r in conn.execute(STATUS_SQL, (KEY_PREFIX + "%",)).fetchall()}
+    return {"workers": workers, "events": n, "seconds": round(dt, 2), "events_per_sec": int(n / dt),
+            "status": status, **worker.stats.as_dict()}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=50_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--batch", type=int, default=100)
+    ap.add_argument("--latency-ms", type=float, default=20, help="consumer latency per batch")
+    ap.add_argument("--per-event-ms", type=float, default=0.2)
+    ap.add_argument("--fail-rate", type=float, default=0.02)
+    ap.add_argument("--http", action="store_true", help="deliver over HTTP to the fake provisioning server")
+    args = ap.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL")
+    if args.http:
+        fake_provisioning_server.serve(8098, args.latency_ms, args.per_event_ms, args.fail_rate, background=True)
+    with psycopg.connect(dsn) as conn:
+        try:
+            for w in args.workers:
+                if args.http:
+                    stub = fake_provisioning_server.STUB
+                    stub.seen.clear()
+                    consumer = HttpConsumer("http://127.0.0.1:8098")
+                else:
+                    stub = consumer = StubConsumer(args.latency_ms, args.per_event_ms, args.fail_rate)
+                # short backoff so retries finish within the run
+                worker = OutboxWorker(dsn, consumer, batch=args.batch, backoff=0.05, max_backoff=1.0)
+                enqueue(conn, args.events)
+                print({**drain(dsn, worker, w, args.events), "consumer": stub.stats()})
+        finally:
+            conn.rollback()
+            conn.execute("DELETE FROM onboarding.outbox WHERE idempotency_key LIKE %s", (KEY_PREFIX + "%",))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Tokens sent per turn: legacy layout (profile/summary block + last LAST_K
+messages) vs prompt_assembly (static prefix + profile/summary + history
+packed to PROMPT_TOKEN_BUDGET), replaying a synthetic onboarding chat that
+includes one pasted document.
+
+    python benchmarks/bench_prompt_tokens.py --turns 40
+"""
+import os
+import sys
+import argparse
+
+from langchain_core.messages import HumanMessage, AIMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from prompt_assembly import assemble_prompt, count_message, STATIC_PREFIX
+from onboarding_chatbot_with_profile import build_system_block, trim_messages, LAST_K
+
+
+def conversation(turns: int, doc_turn: int):
+    for i in range(turns):
+        text = f"Turn {i}: my phone is +1 555 0100 and I would like a cubicle near the window."
+        if i == doc_turn:
+            text = "Here is my CV:\n" + ("Experienced engineer with many projects. " * 800)
+        yield HumanMessage(content=text, id=f"h{i}")
+        yield AIMessage(content=f"Thanks, noted for turn {i}. What else can I help with?", id=f"a{i}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--turns", type=int, default=40)
+    ap.add_argument("--doc-turn", type=int, default=10)
+    args = ap.parse_args()
+
+    profile = {"name": "Ada Lovelace"}
+    summary = "User wants a cubicle and a linux laptop."
+    history, cache = [], {}
+    legacy_total = new_total = legacy_max = new_max = 0
+    for m in conversation(args.turns, args.doc_turn):
+        history.append(m)
+        if not isinstance(m, HumanMessage):
+            continue
+        legacy = [build_system_block(profile, summary)] + trim_messages(history, LAST_K)
+        legacy_tokens = sum(count_message(x) for x in legacy)
+        _, new_counts, new_tokens = assemble_prompt(history, profile, summary, cache)
+        cache.update(new_counts)
+        legacy_total += legacy_tokens
+        new_total += new_tokens
+        legacy_max, new_max = max(legacy_max, legacy_tokens), max(new_max, new_tokens)
+
+    turns = args.turns
+    print(f"static prefix tokens: {count_message(STATIC_PREFIX)} (identical every turn)")
+    print(f"legacy : avg {legacy_total / turns:.0f} tokens/turn, max {legacy_max}")
+    print(f"budget : avg {new_total / turns:.0f} tokens/turn, max {new_max}")
+
+
+if __name__ == "__main__":
+    main()
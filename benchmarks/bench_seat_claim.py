@@ -0,0 +1,90 @@
+"""
+Concurrency benchmark for seat allocation.
+
+Seeds a private batch of seats (seat_type = 'bench'), fires N parallel
+allocations through a ConnectionPool and reports throughput plus how many
+seat_ids were handed out more than once. Rows are removed afterwards.
+
+    python benchmarks/bench_seat_claim.py --claims 500 --workers 50
+"""
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from inventory import claim_seat, peek_seat
+
+BENCH_SEAT_TYPE = "bench"
+
+
+def seed(pool: ConnectionPool, n: int) -> None:
+    with pool.connection() as conn:
+        conn.execute(
+            "INSERT INTO onboarding.seating_space (employee_id, seat_type) "
+            "SELECT NULL, %s FROM generate_series(1, %s)",
+            (BENCH_SEAT_TYPE, n),
+        )
+
+
+def cleanup(pool: ConnectionPool) -> None:
+    with pool.connection() as conn:
+        conn.execute("DELETE FROM onboarding.seating_space WHERE seat_type = %s", (BENCH_SEAT_TYPE,))
+
+
+def run(pool: ConnectionPool, mode: str, claims: int, workers: int) -> dict:
+    def one(i: int):
+        with pool.connection() as conn:
+            if mode == "claim":
+                return claim_seat(conn, BENCH_SEAT_TYPE, claimed_by=f"bench-{i}")
+            return peek_seat(conn, BENCH_SEAT_TYPE)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        results = list(ex.map(one, range(claims)))
+    elapsed = time.perf_counter() - t0
+
+    seat_ids = [r["seat_id"] for r in results if r.get("ok")]
+    dupes = sum(c - 1 for c in Counter(seat_ids).values() if c > 1)
+    return {
+        "mode": mode,
+        "claims": claims,
+        "granted": len(seat_ids),
+        "double_assignments": dupes,
+        "seconds": round(elapsed, 3),
+        "claims_per_sec": round(claims / elapsed, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--claims", type=int, default=500)
+    ap.add_argument("--workers", type=int, default=50)
+    ap.add_argument("--seats", type=int, default=None, help="seats to seed (default: claims)")
+    args = ap.parse_args()
+
+    load_dotenv()
+    pool = ConnectionPool(
+        conninfo=os.getenv("DATABASE_URL"),
+        min_size=args.workers,
+        max_size=args.workers,
+        kwargs={"row_factory": dict_row},
+    )
+    try:
+        for mode in ("peek", "claim"):
+            cleanup(pool)
+            seed(pool, args.seats or args.claims)
+            print(run(pool, mode, args.claims, args.workers))
+    finally:
+        cleanup(pool)
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+End-to-end load test: N concurrent simulated onboarding sessions through
+the compiled graphs (onboarding_chat_agent / onboarding_chatbot_with_profile)
+and, optionally, a running MCP server, against a local Postgres and the
+fake LLM in fake_llm_server.py (started in-process).
+
+Reports throughput, p50/p95/p99 turn latency, DB pool wait and checkpoint
+write cost; --save writes a JSON baseline, --compare diffs against one.
+
+    python benchmarks/bench_sessions.py --sessions 50 --save baseline.json
+    python benchmarks/bench_sessions.py --sessions 50 --compare baseline.json
+    python benchmarks/bench_sessions.py --mcp-url http://127.0.0.1:8000/mcp
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+sys.path.insert(0, HERE)
+import fake_llm_server
+
+SESSION_PREFIX = "loadtest-session-"
+
+SCRIPT = [
+    "Hi, my name is Bench User",
+    "bench{i}@example.com",
+    "+1 555 010 {i:04d}",
+    "I need a cubicle and a linux laptop, please set me up",
+    "Thanks, what happens on my first day?",
+]
+
+
+def pct(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def summarize_latencies(latencies, elapsed):
+    return {
+        "turns": len(latencies),
+        "turns_per_sec": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(pct(latencies, 50) * 1000, 1),
+        "p95_ms": round(pct(latencies, 95) * 1000, 1),
+        "p99_ms": round(pct(latencies, 99) * 1000, 1),
+    }
+
+
+class CheckpointTimer:
+    """Wraps checkpointer.put/put_writes to measure checkpoint write cost."""
+
+    def __init__(self, checkpointer):
+        self.lock = threading.Lock()
+        self.count = 0
+        self.seconds = 0.0
+        for name in ("put", "put_writes"):
+            orig = getattr(checkpointer, name)
+            setattr(checkpointer, name, self._wrap(orig))
+
+    def _wrap(self, fn):
+        def timed(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.count += 1
+                    self.seconds += time.perf_counter() - t
+        return timed
+
+    def report(self):
+        return {"checkpoint_writes": self.count,
+                "checkpoint_write_avg_ms": round(self.seconds / self.count * 1000, 3) if self.count else 0.0}
+
+
+def pool_report(pool):
+    st = pool.get_stats()
+    n = st.get("requests_num", 0)
+    return {"pool_requests": n,
+            "pool_wait_avg_ms": round(st.get("requests_wait_ms", 0) / n, 3) if n else 0.0,
+            "pool_timeouts": st.get("requests_errors", 0)}
+
+
+def run_graph(name, invoke_turn, pool, checkpointer, sessions, concurrency):
+    timer = CheckpointTimer(checkpointer)
+    latencies, lock = [], threading.Lock()
+
+    def session(i):
+        cfg = {"configurable": {"thread_id": f"{SESSION_PREFIX}{name}-{i}-{int(time.time())}"}}
+        for line in SCRIPT:
+            t = time.perf_counter()
+            invoke_turn(line.format(i=i), cfg)
+            with lock:
+                latencies.append(time.perf_counter() - t)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        list(ex.map(session, range(sessions)))
+    elapsed = time.perf_counter() - t0
+    return {**summarize_latencies(latencies, elapsed), **pool_report(pool), **timer.report()}
+
+
+def bench_simple(args):
+    from onboarding_chat_agent import build_app
+    from langchain_core.messages import HumanMessage
+    agent = build_app()
+    invoke = lambda text, cfg: agent.app.invoke({"messages": [HumanMessage(content=text)]}, config=cfg)
+    return run_graph("simple", invoke, agent.pool, agent.checkpointer, args.sessions, args.concurrency)
+
+
+def bench_profile(args):
+    from onboarding_chatbot_with_profile import build_agent
+    agent = build_agent()
+    try:
+        return run_graph("profile", agent.invoke_turn, agent.pool, agent.checkpointer, args.sessions, args.concurrency)
+    finally:
+        agent.close()
+
+
+def bench_mcp(args):
+    from fastmcp import Client
+
+    async def main():
+        latencies = []
+        sem = asyncio.Semaphore(args.concurrency)
+
+        # Holds belong to the MCP session, so each simulated hire is its own
+        # client: claim a seat, then hand it back.
+        async def one(i):
+            async with sem:
+                async with Client(args.mcp_url) as client:
+                    t = time.perf_counter()
+                    await client.call_tool("assign_seating_space", {})
+                    latencies.append(time.perf_counter() - t)
+                    await client.call_tool("cancel_reservation", {})
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.sessions)))
+        return summarize_latencies(latencies, time.perf_counter() - t0)
+
+    return asyncio.run(main())
+
+
+def release_claims():
+    import psycopg
+    with psycopg.connect(os.getenv("DATABASE_URL")) as conn:
+        for table in ("seating_space", "equipments"):
+            conn.execute(
+                f"UPDATE onboarding.{table} SET claimed_by = NULL, claimed_at = NULL "
+                "WHERE claimed_by LIKE %s AND employee_id IS NULL",
+                (SESSION_PREFIX + "%",),
+            )
+
+
+def compare(current: dict, baseline: dict) -> None:
+    for target, metrics in current.items():
+        base = baseline.get(target) or {}
+        for key, value in metrics.items():
+            if key in base and isinstance(value, (int, float)) and base[key]:
+                delta = (value - base[key]) / base[key] * 100
+                print(f"{target:8s} {key:26s} {base[key]:>10} -> {value:>10} ({delta:+.1f}%)")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sessions", type=int, default=20)
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--targets", default="simple,profile", help="comma list of simple,profile")
+    ap.add_argument("--mcp-url", default=None, help="also load a running MCP server")
+    ap.add_argument("--llm-port", type=int, default=8099)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--save", help="write results JSON here")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    args = ap.parse_args()
+
+    load_dotenv()
+    fake_llm_server.serve(args.llm_port, latency_ms=args.latency_ms, background=True)
+    os.environ["JETSTREAM_BASE_URL"] = f"http://127.0.0.1:{args.llm_port}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+    os.environ.setdefault("JETSTREAM_MODEL", "fake-model")
+
+    results = {"config": {"sessions": args.sessions, "concurrency": args.concurrency,
+                          "turns_per_session": len(SCRIPT), "llm_latency_ms": args.latency_ms}}
+    runners = {"simple": bench_simple, "profile": bench_profile}
+    try:
+        for target in filter(None, args.targets.split(",")):
+            results[target] = runners[target](args)
+            print(target, results[target])
+        if args.mcp_url:
+            results["mcp"] = bench_mcp(args)
+            print("mcp", results["mcp"])
+    finally:
+        release_claims()
+    results["fake_llm_requests"] = fake_llm_server.Config.requests
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare({k: v for k, v in results.items() if isinstance(v, dict) and k != "config"}, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
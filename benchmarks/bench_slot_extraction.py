@@ -0,0 +1,83 @@
+"""
+Slot extraction (slot_extraction.py): checks a table of messages against the
+slots they should yield, including lower-case words after "I am" / "this is"
+that must not be taken as a name, and messages fast_path must hand to the
+LLM without touching the profile, then times extract_slots and fast_path.
+
+    python benchmarks/bench_slot_extraction.py --reps 20000
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from slot_extraction import extract_slots, fast_path
+
+# message -> expected name slot (None: no name must be captured)
+NAME_CASES = {
+    "my name is Jane Doe": "Jane Doe",
+    "Hi, I am Ravi Kumar and I'd like a cabin": "Ravi Kumar",
+    "i'm Anna, a cubicle please": "Anna",
+    "Name: Li Wei": "Li Wei",
+    "I am happy with a cubicle": None,
+    "this is great, cubicle please": None,
+    "I am Sure a cabin": None,
+    "I am fine with windows": None,
+    "I AM READY for a mac": None,
+}
+OTHER_CASES = {
+    "A CUBICLE on Linux please": {"seat_type": "CUBICLE", "os_requirement": "Linux"},
+    "jane@example.com, +1 555 010 0199": {"email": "jane@example.com", "phone": "+1 555 010 0199"},
+    "call me at 2024-01-15": {},
+}
+# messages that go to the LLM: fast_path must return reply=None and no new slots
+LLM_CASES = (
+    "I am happy with a cubicle",
+    "not windows, linux please",
+    "I am Windows user",
+    "call me at 2024-01-15",
+    "cabin? or is a cubicle better",
+)
+
+
+def check() -> int:
+    failures = 0
+    for text, want in NAME_CASES.items():
+        got = extract_slots(text).get("name")
+        if got != want:
+            failures += 1
+            print(f"FAIL name {text!r}: got {got!r}, want {want!r}")
+    for text, want in OTHER_CASES.items():
+        got = {k: v for k, v in extract_slots(text).items() if k in want}
+        if got != want:
+            failures += 1
+            print(f"FAIL {text!r}: got {got!r}, want {want!r}")
+    for text in LLM_CASES:
+        profile, reply = fast_path(text, {})
+        if profile or reply is not None:
+            failures += 1
+            print(f"FAIL fast_path {text!r}: stored {profile!r}, reply {reply!r}")
+    total = len(NAME_CASES) + len(OTHER_CASES) + len(LLM_CASES)
+    print(f"{total - failures} checks passed, {failures} failed")
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--reps", type=int, default=20_000)
+    args = ap.parse_args()
+
+    failures = check()
+    texts = list(NAME_CASES) + list(OTHER_CASES)
+    for name, fn in (("extract_slots", extract_slots), ("fast_path", lambda t: fast_path(t, {}))):
+        t0 = time.perf_counter()
+        for i in range(args.reps):
+            fn(texts[i % len(texts)])
+        dt = time.perf_counter() - t0
+        print(f"{name:14s} {dt / args.reps * 1e6:.1f} us/message")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
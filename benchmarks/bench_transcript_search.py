@@ -0,0 +1,139 @@
+"""
+Transcript search latency (transcript_search.py) over millions of messages.
+
+COPYs N synthetic messages into the projection tables (threads under the
+bench-ts- prefix, timestamps spread over the last 90 days, a vocabulary where
+"laptop" is in most messages and "macos" / "standing desk" are rare), then
+times a set of searches, including walking --pages pages deep with the
+cursor. Everything it created is deleted afterwards.
+
+    python benchmarks/bench_transcript_search.py --messages 2000000 --reps 20
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+import psycopg
+from psycopg.rows import dict_row
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from transcript_search import search
+
+THREAD_PREFIX = "bench-ts-"
+PER_THREAD = 20
+USER_LINES = [
+    "Hi, I'm starting Monday and need a laptop",
+    "I'd like a cubicle near the window please",
+    "Can I get a linux laptop with a webcam",
+    "A windows laptop is fine, and a cabin if possible",
+    "Could I have a quiet cabin, my laptop should run linux",
+]
+RARE_LINES = [
+    "I need a macos laptop for iOS development",
+    "Is a standing desk available in the cubicle area",
+]
+BOT_LINES = [
+    "I reserved a cubicle and a laptop kit for you, shall I confirm?",
+    "Your seat and equipment are confirmed, welcome aboard!",
+    "Which laptop OS do you need: linux, windows or macos?",
+]
+
+
+def load(conn, n: int, rare: float, seed: int) -> int:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    threads = max(n // PER_THREAD, 1)
+    t0 = time.perf_counter()
+    with conn.cursor() as cur:
+        with cur.copy("COPY onboarding.transcript_threads (thread_id, profile, projected_upto) FROM STDIN") as copy:
+            for t in range(threads):
+                os_ = rng.choice(("linux", "windows", "macos"))
+                copy.write_row((f"{THREAD_PREFIX}{t}",
+                                f'{{"os_requirement": "{os_}", "seat_type": "{rng.choice(("cabin", "cubicle"))}"}}',
+                                PER_THREAD))
+        with cur.copy("COPY onboarding.transcript_messages (thread_id, seq, role, content, created_at) FROM STDIN") as copy:
+            for t in range(threads):
+                start = now - timedelta(days=rng.random() * 90)
+                for seq in range(PER_THREAD):
+                    if seq % 2 == 0:
+                        text = rng.choice(RARE_LINES) if rng.random() < rare else rng.choice(USER_LINES)
+                        role = "user"
+                    else:
+                        text, role = rng.choice(BOT_LINES), "assistant"
+                    copy.write_row((f"{THREAD_PREFIX}{t}", seq, role, text, start + timedelta(seconds=20 * seq)))
+    conn.commit()
+    conn.execute("ANALYZE onboarding.transcript_threads")
+    conn.execute("ANALYZE onboarding.transcript_messages")
+    conn.commit()
+    print(f"loaded {threads * PER_THREAD} messages in {time.perf_counter() - t0:.1f}s")
+    return threads * PER_THREAD
+
+
+def timed(conn, reps: int, **kwargs) -> dict:
+    times, page = [], None
+    for _ in range(reps):
+        t = time.perf_counter()
+        page = search(conn, **kwargs)
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return {"p50_ms": round(statistics.median(times) * 1000, 1),
+            "p95_ms": round(times[min(len(times) - 1, int(0.95 * len(times)))] * 1000, 1),
+            "hits": len(page["results"])}
+
+
+def deep(conn, pages: int, **kwargs) -> dict:
+    cursor, times = None, []
+    for _ in range(pages):
+        t = time.perf_counter()
+        page = search(conn, cursor=cursor, **kwargs)
+        times.append(time.perf_counter() - t)
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    return {"pages": len(times), "first_ms": round(times[0] * 1000, 1), "last_ms": round(times[-1] * 1000, 1),
+            "p95_ms": round(sorted(times)[min(len(times) - 1, int(0.95 * len(times)))] * 1000, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--messages", type=int, default=2_000_000)
+    ap.add_argument("--rare", type=float, default=0.002, help="share of user messages with a rare phrase")
+    ap.add_argument("--reps", type=int, default=20)
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--keep", action="store_true", help="leave the benchmark rows in place")
+    args = ap.parse_args()
+
+    load_dotenv()
+    week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    with psycopg.connect(os.getenv("DATABASE_URL"), row_factory=dict_row) as conn:
+        try:
+            load(conn, args.messages, args.rare, args.seed)
+            conn.autocommit = True
+            cases = {
+                "rare term": {"query": "macos"},
+                "rare phrase": {"query": '"standing desk"'},
+                "common term": {"query": "laptop"},
+                "macos laptop, user, last 7 days": {"query": "macos laptop", "role": "user", "since": week_ago},
+                "profile os=macos, last 7 days": {"profile": {"os_requirement": "macos"}, "since": week_ago},
+                "no query (newest)": {},
+            }
+            for name, kwargs in cases.items():
+                print(f"{name:34s}", timed(conn, args.reps, **kwargs))
+            print(f"{'common term, deep paging':34s}", deep(conn, args.pages, query="laptop"))
+            print(f"{'rare term, deep paging':34s}", deep(conn, args.pages, query="macos"))
+        finally:
+            if not args.keep:
+                conn.rollback()
+                conn.autocommit = True
+                conn.execute("DELETE FROM onboarding.transcript_threads WHERE thread_id LIKE %s",
+                             (THREAD_PREFIX + "%",))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Streamlit rerun cost vs conversation length, with and without the bounded
+hot window in chat_ui_streamlit.py.
+
+Uses streamlit.testing's AppTest to run the script headless with a session
+pre-filled with N messages (no LLM or database is touched: no message is
+sent and no older page is opened), then times plain reruns.
+UI_HOT_WINDOW is set huge for the "unbounded" rows to reproduce the old
+render-everything behaviour.
+
+    python benchmarks/bench_ui_rerun.py --sizes 50 200 500 1000 --reruns 10
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+APP = os.path.join(ROOT, "chat_ui_streamlit.py")
+sys.path.insert(0, ROOT)
+
+
+def fake_history(n: int) -> list:
+    msgs = []
+    for i in range(n // 2):
+        msgs.append({"role": "user", "content": f"message {i}: I'd like a cubicle and a linux laptop please"})
+        msgs.append({"role": "assistant", "content": f"reply {i}: " + "Sure, here's the plan. " * 8,
+                     "upto": 2 * i + 2})
+    return msgs
+
+
+def measure(n: int, reruns: int, hot_window: str) -> dict:
+    os.environ["UI_HOT_WINDOW"] = hot_window
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.session_state["thread_id"] = "bench-ui"
+    at.session_state["turn_metrics"] = []
+    at.session_state["messages"] = fake_history(n)
+    at.run()  # first run trims to the hot window
+    times = []
+    for _ in range(reruns):
+        t = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t)
+    return {
+        "messages": n,
+        "kept_in_session": len(at.session_state["messages"]),
+        "rendered_bubbles": len(at.chat_message),
+        "rerun_ms_p50": round(statistics.median(times) * 1000, 1),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 500, 1000])
+    ap.add_argument("--reruns", type=int, default=10)
+    args = ap.parse_args()
+
+    hot = os.getenv("UI_HOT_WINDOW", "40")  # read before measure() overwrites it
+    for label, window in (("unbounded", "1000000000"), ("hot window", hot)):
+        print(f"--- {label} (UI_HOT_WINDOW={window})")
+        for n in args.sizes:
+            print(measure(n, args.reruns, window))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Local OpenAI-compatible stub for load tests (POST /v1/chat/completions).
+
+* fixed + jittered latency per request (--latency-ms, --jitter-ms), and
+  per-token delay when the client streams (--token-ms)
+* scripted tool calls: the first rule whose regex matches the latest user
+  message answers with those tool calls; after tool results come back (or
+  when nothing matches) it answers with plain text
+
+    python benchmarks/fake_llm_server.py --port 8099 --latency-ms 300
+    JETSTREAM_BASE_URL=http://127.0.0.1:8099/v1 python onboarding_chat_agent.py
+"""
+import re
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+DEFAULT_SCRIPT = [
+    {"match": r"set me up|assign|provision",
+     "tool_calls": [
+         {"name": "assign_seating_space", "arguments": {"seat_type": "cubicle"}},
+         {"name": "assign_equipment_kit", "arguments": {"os_requirement": "linux"}},
+     ]},
+    {"match": r"\bseat\b", "tool_calls": [{"name": "assign_seating_space", "arguments": {}}]},
+]
+DEFAULT_REPLY = "Got it. Is there anything else you need for your first day?"
+AFTER_TOOLS_REPLY = "All set: your seat and equipment are reserved. Please confirm to finalize."
+
+
+class Config:
+    latency_ms = 300.0
+    jitter_ms = 50.0
+    token_ms = 5.0
+    script = DEFAULT_SCRIPT
+    requests = 0
+    lock = threading.Lock()
+
+
+def plan_reply(messages: list) -> dict:
+    """Return {"content": str} or {"tool_calls": [...]} for the conversation."""
+    last = messages[-1] if messages else {}
+    if last.get("role") == "tool":
+        return {"content": AFTER_TOOLS_REPLY}
+    text = ""
+    for m in reversed(messages):
+        if m.get("role") == "user":
+            text = m.get("content") or ""
+            if isinstance(text, list):
+                text = " ".join(p.get("text", "") for p in text if isinstance(p, dict))
+            break
+    for rule in Config.script:
+        if re.search(rule["match"], text, re.I):
+            return {"tool_calls": rule["tool_calls"]}
+    return {"content": DEFAULT_REPLY}
+
+
+def _tool_calls_payload(calls: list) -> list:
+    return [
+        {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+         "function": {"name": c["name"], "arguments": json.dumps(c.get("arguments") or {})}}
+        for c in calls
+    ]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):  # keep the benchmark output clean
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with Config.lock:
+            Config.requests += 1
+        time.sleep(max(0.0, Config.latency_ms + random.uniform(-Config.jitter_ms, Config.jitter_ms)) / 1000)
+
+        reply = plan_reply(body.get("messages") or [])
+        model = body.get("model") or "fake-model"
+        cid = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        if body.get("stream"):
+            self._stream(cid, model, reply)
+        else:
+            self._complete(cid, model, reply)
+
+    def _complete(self, cid: str, model: str, reply: dict):
+        message = {"role": "assistant", "content": reply.get("content")}
+        finish = "stop"
+        if "tool_calls" in reply:
+            message["tool_calls"] = _tool_calls_payload(reply["tool_calls"])
+            finish = "tool_calls"
+        out = json.dumps({
+            "id": cid, "object": "chat.completion", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def _stream(self, cid: str, model: str, reply: dict):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(delta: dict, finish=None):
+            chunk = {"id": cid, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            data = f"data: {json.dumps(chunk)}\n\n".encode()
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+        if "tool_calls" in reply:
+            calls = _tool_calls_payload(reply["tool_calls"])
+            send({"role": "assistant", "tool_calls": [dict(c, index=i) for i, c in enumerate(calls)]})
+            send({}, "tool_calls")
+        else:
+            send({"role": "assistant", "content": ""})
+            for word in re.findall(r"\S+\s*", reply["content"]):
+                time.sleep(Config.token_ms / 1000)
+                send({"content": word})
+            send({}, "stop")
+        done = b"data: [DONE]\n\n"
+        self.wfile.write(f"{len(done):X}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+
+
+def serve(port: int = 8099, latency_ms: float = 300, jitter_ms: float = 50, token_ms: float = 5,
+          script: list = None, background: bool = False) -> ThreadingHTTPServer:
+    Config.latency_ms, Config.jitter_ms, Config.token_ms = latency_ms, jitter_ms, token_ms
+    if script is not None:
+        Config.script = script
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, name="fake-llm", daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency-ms", type=float, default=300)
+    ap.add_argument("--jitter-ms", type=float, default=50)
+    ap.add_argument("--token-ms", type=float, default=5)
+    ap.add_argument("--script", help="JSON file with [{match, tool_calls:[{name, arguments}]}]")
+    args = ap.parse_args()
+    script = json.load(open(args.script)) if args.script else None
+    print(f"fake LLM on http://127.0.0.1:{args.port}/v1")
+    serve(args.port, args.latency_ms, args.jitter_ms, args.token_ms, script)
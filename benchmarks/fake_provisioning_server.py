@@ -0,0 +1,71 @@
+"""
+Local stand-in for the downstream provisioning services (POST /<topic>), so
+the outbox pipeline can run end to end offline over real HTTP.
+
+Takes {"events": [...]} as outbox.HttpConsumer sends it and answers
+{"failed": {idempotency_key: error}} using outbox.StubConsumer: per-batch
+and per-event latency, a transient failure rate, and dedupe on the
+idempotency key (GET /stats shows provisioned vs duplicate deliveries).
+
+    python benchmarks/fake_provisioning_server.py --port 8098 --fail-rate 0.05
+    OUTBOX_URL=http://127.0.0.1:8098 python outbox.py --workers 4 --loop
+"""
+import os
+import sys
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from outbox import StubConsumer
+
+STUB = StubConsumer()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):  # keep the benchmark output clean
+        pass
+
+    def _reply(self, doc: dict, status: int = 200):
+        out = json.dumps(doc).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._reply(STUB.stats())
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        topic = self.path.strip("/")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        self._reply({"failed": STUB(topic, body.get("events") or [])})
+
+
+def serve(port: int = 8098, latency_ms: float = 20, per_event_ms: float = 1, fail_rate: float = 0.0,
+          background: bool = False) -> ThreadingHTTPServer:
+    STUB.latency_ms, STUB.per_event_ms, STUB.fail_rate = latency_ms, per_event_ms, fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        print(f"fake provisioning server on http://127.0.0.1:{port}")
+        server.serve_forever()
+    return server
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8098)
+    ap.add_argument("--latency-ms", type=float, default=20)
+    ap.add_argument("--per-event-ms", type=float, default=1)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+    serve(args.port, args.latency_ms, args.per_event_ms, args.fail_rate)
@@ -1,12 +1,7 @@
 import os
-import time
-import requests
+import uuid
 import streamlit as st
-from typing import TypedDict, Annotated
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
-from sqlalchemy import event, text
 from dotenv import load_dotenv
-import asyncio
 
 load_dotenv()
 
@@ -14,6 +9,8 @@ from employee import Employee
 
 @st.cache_resource
 def get_async_engine():
+    # imported on first use so the script's cold start doesn't pay for SQLAlchemy
+    from sqlalchemy.ext.asyncio import create_async_engine
     dsn = os.getenv("DATABASE_URL")
     engine = create_async_engine(
         dsn,
@@ -36,13 +33,35 @@ def get_async_engine():
 
 @st.cache_resource
 def get_async_sessionmaker():
+    from sqlalchemy.ext.asyncio import async_sessionmaker
     return async_sessionmaker(bind=get_async_engine(), expire_on_commit=False)
 
 
+@st.cache_resource
+def get_agent():
+    # Compiled LangGraph agent, shared by all sessions of this Streamlit process.
+    from onboarding_chatbot_with_profile import build_agent
+    return build_agent()
+
+
+# UI_WARM_UP=1: build the agent (pool, checkpointer, graph) when the script
+# loads rather than on the first message.
+if os.getenv("UI_WARM_UP") == "1":
+    get_agent()
+
+
 # one object per session
 if "employee" not in st.session_state:
     st.session_state.employee = Employee()
 
+# one agent thread (checkpoint key) per browser session
+if "thread_id" not in st.session_state:
+    st.session_state.thread_id = f"ui-{uuid.uuid4()}"
+
+# per-turn latency: time-to-first-token and total turn time
+if "turn_metrics" not in st.session_state:
+    st.session_state.turn_metrics = []
+
 
 
 
@@ -59,48 +78,119 @@ st.caption("Type below to chat.")
 # Session State for Messages
 # -------------------------------
 
+# Only the newest HOT_WINDOW messages live in session state (and get rendered
+# on every rerun); older ones stay in the agent's checkpoint and are paged in
+# on request, PAGE_SIZE at a time, so rerun cost doesn't grow with the chat.
+HOT_WINDOW = int(os.getenv("UI_HOT_WINDOW", "40"))
+PAGE_SIZE = int(os.getenv("UI_PAGE_SIZE", "20"))
+MAX_TURN_METRICS = 50
+GREETING = "Hi! I can help with onboarding. What is your name?"
+
 if "messages" not in st.session_state:
     st.session_state.messages = []
-
-# Seed first assistant message
-if len(st.session_state.messages) == 0:
-    st.session_state.messages.append({"role": "assistant", "content": "Hi! I can help with onboarding. What is your name?"})
+if "older_end" not in st.session_state:
+    st.session_state.older_end = 0     # transcript position where the hot window starts
+if "older_pages" not in st.session_state:
+    st.session_state.older_pages = 0   # pages of older history currently shown
+
+
+def trim_hot_window() -> None:
+    """Drop whole turns from the front; each assistant msg knows its transcript position."""
+    msgs = st.session_state.messages
+    cut = max(len(msgs) - HOT_WINDOW, 0)
+    if not cut:
+        return
+    while cut < len(msgs) and msgs[cut]["role"] == "assistant":
+        cut += 1  # never keep a reply without its question
+    for msg in msgs[:cut]:
+        if "upto" in msg:
+            st.session_state.older_end = msg["upto"]
+    del msgs[:cut]
 
 # -------------------------------
 # Backend reply function (single entry point)
 # -------------------------------
 
-def backend_reply(user_text: str, history: list[str]) -> str:
+TOOL_LABELS = {
+    "assign_seating_space": "Assigning your seat…",
+    "assign_equipment_kit": "Reserving your laptop and accessories…",
+    "check_availability": "Checking what is available…",
+    "confirm_assignment": "Confirming your seat and equipment…",
+}
+
+def backend_reply(user_text: str) -> str:
     """
     Central place to compute the assistant's reply.
-    Replace this with a real model or API later.
+    Streams the agent's tokens (and tool progress) into the current chat
+    bubble as they arrive, so call it inside st.chat_message("assistant").
 
     Args:
-        user_text: the latest user message
-        history: list of past messages (as dicts with role/content)
+        user_text: the latest user message (the agent keeps the history
+                   in its checkpointer)
 
     Returns:
         assistant reply (str)
     """
+    cfg = {"configurable": {"thread_id": st.session_state.thread_id}}
+    progress = st.container()   # tool events render above the reply text
+    placeholder = st.empty()
+    parts: list[str] = []
+
+    for kind, payload in get_agent().stream_turn(user_text, cfg):
+        if kind in ("token", "reply"):
+            parts.append(payload)
+            placeholder.markdown("".join(parts) + "▌")
+        elif kind == "tool_start":
+            progress.caption(TOOL_LABELS.get(payload, f"Running {payload}…"))
+        elif kind == "tool_end":
+            progress.caption(f"✓ {payload['name']} done")
+        elif kind == "metrics":
+            st.session_state.turn_metrics.append(payload)
+            del st.session_state.turn_metrics[:-MAX_TURN_METRICS]
+
+    reply = "".join(parts)
+    placeholder.markdown(reply)
+    return reply
+
+# -------------------------------
+# Older history, paged from the checkpoint
+# -------------------------------
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def older_messages(thread_id: str, start: int, end: int) -> list:
+    # Messages at a given position never change (the thread is append-only),
+    # so a page is fetched once per process.
+    cfg = {"configurable": {"thread_id": thread_id}}
+    return get_agent().transcript(cfg, start, end)[0]
 
-    # Local simple logic (placeholder):
-    text = user_text.strip().lower()
 
-    st.session_state.employee.seat_type = "cabin"
+# A fragment: paging reruns only this block, not the whole chat.
+_fragment = getattr(st, "fragment", None) or (lambda f: f)
 
-    from llm_tools import assign_seating_space
-    out = asyncio.run(assign_seating_space(get_async_sessionmaker(), st.session_state.employee.seat_type))
-    print(out, type(out))
+@_fragment
+def render_older_history() -> None:
+    end = st.session_state.older_end
+    shown = min(st.session_state.older_pages * PAGE_SIZE, end)
+    if shown < end and st.button(f"Show earlier messages ({end - shown} more)"):
+        st.session_state.older_pages += 1
+        shown = min(shown + PAGE_SIZE, end)
+    if not shown:
+        return
+    for msg in older_messages(st.session_state.thread_id, end - shown, end):
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
 
-    print(out)
-    print(type(out))
-    # Default echo with slight delay to mimic thinking
-    time.sleep(0.2)
-    return "Your input text is: "+text
 
 # -------------------------------
-# Render previous history
+# Render history: older pages (on demand) + the hot window
 # -------------------------------
+trim_hot_window()
+if st.session_state.older_end:
+    render_older_history()
+else:
+    with st.chat_message("assistant"):
+        st.markdown(GREETING)
+
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
@@ -117,10 +207,35 @@ if user_input:
     with st.chat_message("user"):
         st.markdown(user_input)
 
-    # Get assistant reply from backend function
-    reply = backend_reply(user_input, st.session_state.messages)
-
-    # Append and display assistant msg
-    st.session_state.messages.append({"role": "assistant", "content": reply})
+    # Get assistant reply from backend function (rendered while it streams)
     with st.chat_message("assistant"):
-        st.markdown(reply)
+        reply = backend_reply(user_input)
+
+    # Append assistant msg; older ones fall out of the hot window next rerun
+    last = st.session_state.turn_metrics[-1] if st.session_state.turn_metrics else {}
+    st.session_state.messages.append({"role": "assistant", "content": reply, "upto": last.get("transcript_len", 0)})
+
+# -------------------------------
+# Perceived latency
+# -------------------------------
+
+if st.session_state.turn_metrics:
+    last = st.session_state.turn_metrics[-1]
+    st.sidebar.metric("Time to first token", f"{last['ttft_s']:.2f}s")
+    st.sidebar.metric("Turn time", f"{last['total_s']:.2f}s")
+
+# -------------------------------
+# Capacity (availability summary: a few rows, cheap to poll)
+# -------------------------------
+
+@st.cache_data(ttl=10)
+def capacity() -> dict:
+    from inventory import availability
+    with get_agent().pool.connection() as conn:
+        return availability(conn)
+
+
+if st.session_state.turn_metrics:
+    cap = capacity()
+    st.sidebar.caption("Free seats: " + ", ".join(f"{k} {v}" for k, v in sorted(cap["seats"].items())))
+    st.sidebar.caption("Free kits: " + ", ".join(f"{k} {v}" for k, v in sorted(cap["kits"].items())))
@@ -0,0 +1,230 @@
+# checkpoint_delta.py
+"""
+Delta-encoded, compressed checkpoint storage for PostgresSaver.
+
+PostgresSaver already writes a blob only for the channels that changed in a
+step, but the `messages` channel changes every step and is re-serialized in
+full, so bytes per turn grow with the length of the conversation. Here:
+
+  * the messages blob is written as a delta ("delta" row in checkpoint_blobs:
+    base version + the messages appended since it) whenever the new list
+    extends the previous one unchanged; every SNAPSHOT_EVERY deltas, or after
+    an edit/removal, a full snapshot is written instead
+  * blobs above COMPRESS_MIN_BYTES are zlib-compressed
+
+Resume fetches the snapshot and the deltas after it in one query
+and replays them, so reads are bounded by SNAPSHOT_EVERY.
+checkpoint_retention.py knows not to delete a delta's base blobs.
+
+Enable with CHECKPOINT_DELTA=1 (see onboarding_chatbot_with_profile.py).
+Threads written by the stock saver stay readable. The reverse is not true:
+the stock saver cannot read "delta"/"z:" blobs, so expire those threads
+before turning the mode off again.
+"""
+from __future__ import annotations
+import os
+import json
+import zlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Tuple, List
+
+from langgraph.checkpoint.postgres import PostgresSaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+DELTA_CHANNELS = ("messages",)
+SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "50"))
+COMPRESS_MIN_BYTES = int(os.getenv("CHECKPOINT_COMPRESS_MIN_BYTES", "512"))
+DELTA_TYPE = "delta"
+ZLIB_PREFIX = "z:"
+
+# Snapshot at or below the target version plus every delta after it.
+CHAIN_SQL = """
+    SELECT version, type, blob
+    FROM checkpoint_blobs
+    WHERE thread_id = %(thread_id)s AND checkpoint_ns = %(checkpoint_ns)s AND channel = %(channel)s
+      AND version <= %(version)s
+      AND version >= (
+          SELECT max(version) FROM checkpoint_blobs
+          WHERE thread_id = %(thread_id)s AND checkpoint_ns = %(checkpoint_ns)s AND channel = %(channel)s
+            AND version <= %(version)s AND type <> 'delta'
+      )
+    ORDER BY version;
+"""
+
+BLOB_SQL = """
+    SELECT version, type, blob
+    FROM checkpoint_blobs
+    WHERE thread_id = %(thread_id)s AND checkpoint_ns = %(checkpoint_ns)s AND channel = %(channel)s
+      AND version = %(version)s;
+"""
+
+
+@dataclass
+class MessagesDelta:
+    """Messages appended on top of the blob stored at `base` (a channel version)."""
+    base: str
+    append: list
+    depth: int = 1  # deltas since the last snapshot, this one included
+
+
+class CompressedSerializer:
+    """
+    Wraps a serde: compresses large blobs (type becomes "z:<type>") and
+    encodes MessagesDelta as type "delta" with a small JSON header.
+    """
+
+    def __init__(self, inner=None, min_bytes: int = COMPRESS_MIN_BYTES, level: int = 6):
+        self.inner = inner or JsonPlusSerializer()
+        self.min_bytes = min_bytes
+        self.level = level
+
+    # plain (untyped) serde calls are passed through untouched
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def _pack(self, type_: str, data: bytes) -> Tuple[str, bytes]:
+        if data is not None and len(data) >= self.min_bytes:
+            return ZLIB_PREFIX + type_, zlib.compress(data, self.level)
+        return type_, data
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if isinstance(obj, MessagesDelta):
+            type_, data = self._pack(*self.inner.dumps_typed(obj.append))
+            header = json.dumps({"base": obj.base, "type": type_, "depth": obj.depth}).encode()
+            return DELTA_TYPE, header + b"\n" + data
+        return self._pack(*self.inner.dumps_typed(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, blob = data
+        if type_ == DELTA_TYPE:
+            header, _, payload = blob.partition(b"\n")
+            meta = json.loads(header)
+            return MessagesDelta(meta["base"], self.loads_typed((meta["type"], payload)), meta.get("depth", 1))
+        if type_.startswith(ZLIB_PREFIX):
+            return self.inner.loads_typed((type_[len(ZLIB_PREFIX):], zlib.decompress(blob)))
+        return self.inner.loads_typed(data)
+
+
+def _extends(base: list, new: list) -> bool:
+    """True if `new` is `base` plus appended messages (nothing edited or removed)."""
+    if len(new) < len(base):
+        return False
+    return all(a is b or a == b for a, b in zip(base, new))
+
+
+class DeltaPostgresSaver(PostgresSaver):
+    """PostgresSaver that stores DELTA_CHANNELS as appends and compresses blobs."""
+
+    def __init__(self, conn, pipe=None, serde=None, snapshot_every: int = SNAPSHOT_EVERY,
+                 max_threads: int = 1024):
+        super().__init__(conn, pipe=pipe, serde=CompressedSerializer(serde))
+        self.snapshot_every = snapshot_every
+        self.max_threads = max_threads
+        # (thread_id, ns, channel) -> (version, messages, depth) of the last blob seen
+        self._last: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._last_lock = threading.Lock()
+
+    # ---- bookkeeping of the last known version per thread/channel ----
+    def _remember(self, key: tuple, version: str, value: list, depth: int) -> None:
+        with self._last_lock:
+            self._last[key] = (str(version), list(value), depth)
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_threads:
+                self._last.popitem(last=False)
+
+    def _recall(self, key: tuple):
+        with self._last_lock:
+            return self._last.get(key)
+
+    # ---- writes ----
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        values = dict(checkpoint["channel_values"])
+        seen = []
+        for channel in DELTA_CHANNELS:
+            value = values.get(channel)
+            if channel not in new_versions or not isinstance(value, list):
+                continue
+            key = (thread_id, ns, channel)
+            prev = self._recall(key)
+            depth = 0
+            if prev and prev[2] < self.snapshot_every and _extends(prev[1], value):
+                depth = prev[2] + 1
+                values[channel] = MessagesDelta(prev[0], value[len(prev[1]):], depth)
+            seen.append((key, new_versions[channel], value, depth))
+        if seen:
+            checkpoint = {**checkpoint, "channel_values": values}
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        # only once the blob is stored may later deltas use it as their base
+        for args in seen:
+            self._remember(*args)
+        return next_config
+
+    # ---- reads ----
+    def _resolve(self, thread_id: str, ns: str, channel: str, version: str) -> list:
+        params = {"thread_id": thread_id, "checkpoint_ns": ns, "channel": channel, "version": str(version)}
+        with self._cursor() as cur:
+            cur.execute(CHAIN_SQL, params)
+            rows = {r["version"]: r for r in cur.fetchall()}
+        # walk back from the target to the snapshot, then replay forward
+        chain: List[MessagesDelta] = []
+        v = str(version)
+        while True:
+            row = rows.get(v)
+            if row is None:
+                # a forked branch can put a newer snapshot above our base
+                with self._cursor() as cur:
+                    cur.execute(BLOB_SQL, {**params, "version": v})
+                    row = cur.fetchone()
+            value = self.serde.loads_typed((row["type"], row["blob"]))
+            if not isinstance(value, MessagesDelta):
+                break
+            chain.append(value)
+            v = value.base
+        messages = list(value)
+        for delta in reversed(chain):
+            messages.extend(delta.append)
+        return messages
+
+    def _resolve_tuple(self, tup):
+        if tup is None:
+            return tup
+        cfg = tup.config["configurable"]
+        thread_id, ns = cfg["thread_id"], cfg.get("checkpoint_ns", "")
+        values = tup.checkpoint["channel_values"]
+        for channel in DELTA_CHANNELS:
+            value = values.get(channel)
+            version = tup.checkpoint["channel_versions"].get(channel)
+            if isinstance(value, MessagesDelta):
+                value = values[channel] = self._resolve(thread_id, ns, channel, version)
+            if not isinstance(value, list) or version is None:
+                continue
+            key = (thread_id, ns, channel)
+            prev = self._recall(key)
+            if not prev or prev[0] != str(version):
+                # Not the version we last wrote (restart, fork, another writer):
+                # the next put writes a snapshot, so a delta's base is always
+                # this process's previous write and no other snapshot sits
+                # between them (checkpoint_retention relies on that).
+                self._remember(key, version, value, self.snapshot_every)
+        return tup
+
+    def get_tuple(self, config):
+        return self._resolve_tuple(super().get_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        for tup in super().list(config, filter=filter, before=before, limit=limit):
+            yield self._resolve_tuple(tup)
+
+
+def make_checkpointer(conn, serde=None) -> PostgresSaver:
+    """DeltaPostgresSaver when CHECKPOINT_DELTA=1, else the stock PostgresSaver."""
+    if os.getenv("CHECKPOINT_DELTA") == "1":
+        return DeltaPostgresSaver(conn, serde=serde)
+    return PostgresSaver(conn, serde=serde)
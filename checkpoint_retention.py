@@ -0,0 +1,312 @@
+# checkpoint_retention.py
+"""
+Retention for the LangGraph PostgresSaver tables
+(checkpoints / checkpoint_writes / checkpoint_blobs).
+
+  * keep only the latest N checkpoints per thread (older ones and their
+    pending writes are dropped, then blobs no surviving checkpoint points at)
+  * expire whole threads of completed onboardings after a TTL, and
+    optionally any thread idle for longer than an "abandoned" TTL
+
+The checkpoints table is scanned once per sweep to pick the candidate
+threads; the work is then done a few threads at a time in short
+transactions with a lock_timeout, so agents writing checkpoints never wait
+long on it. Each batch re-checks its own threads (by primary key) in case
+one became active since the scan. Reclaimed rows/bytes are exported as
+onboarding_retention_* counters on metrics.REGISTRY.
+
+    python checkpoint_retention.py --keep 20 --completed-ttl "30 days" --loop 300
+"""
+from __future__ import annotations
+import os
+import time
+import argparse
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Optional, List, Dict
+
+import psycopg
+from dotenv import load_dotenv
+
+from metrics import REGISTRY
+
+# Threads touched in the last MIN_IDLE are left alone: PostgresSaver writes
+# blobs before the checkpoint that references them, so a live thread can
+# briefly own blobs that look orphaned.
+MIN_IDLE = "10 minutes"
+
+CHECKPOINT_TS = "(c.checkpoint->>'ts')::timestamptz"
+
+# One pass over checkpoints per sweep: every thread that some step may act on.
+# A NULL ttl disables that step.
+SWEEP_CANDIDATES_SQL = f"""
+    SELECT thread_id,
+           COALESCE(completed AND last_ts < NOW() - %(completed_ttl)s::interval, false) AS completed,
+           COALESCE(last_ts < NOW() - %(idle_ttl)s::interval, false) AS idle,
+           n > %(keep)s AS trim
+    FROM (
+        SELECT c.thread_id, count(*) AS n, max({CHECKPOINT_TS}) AS last_ts,
+               -- a thread is a completed onboarding once the seat it claimed is bound to an employee
+               EXISTS (
+                   SELECT 1 FROM onboarding.seating_space ss
+                   WHERE ss.claimed_by = c.thread_id AND ss.employee_id IS NOT NULL
+               ) AS completed
+        FROM checkpoints c
+        GROUP BY c.thread_id
+    ) t
+    WHERE last_ts < NOW() - %(min_idle)s::interval
+    ORDER BY thread_id;
+"""
+
+# Per batch: the threads still idle past `idle`, read through the primary key.
+STILL_IDLE_SQL = f"""
+    SELECT c.thread_id
+    FROM checkpoints c
+    WHERE c.thread_id = ANY(%(threads)s)
+    GROUP BY c.thread_id
+    HAVING max({CHECKPOINT_TS}) < NOW() - %(idle)s::interval;
+"""
+
+TRIM_SQL = """
+    WITH victims AS (
+        SELECT thread_id, checkpoint_ns, checkpoint_id
+        FROM (
+            SELECT thread_id, checkpoint_ns, checkpoint_id,
+                   row_number() OVER (PARTITION BY thread_id, checkpoint_ns
+                                      ORDER BY checkpoint_id DESC) AS rn
+            FROM checkpoints
+            WHERE thread_id = ANY(%(threads)s)
+        ) ranked
+        WHERE rn > %(keep)s
+    ),
+    dw AS (
+        DELETE FROM checkpoint_writes w USING victims v
+        WHERE w.thread_id = v.thread_id AND w.checkpoint_ns = v.checkpoint_ns
+          AND w.checkpoint_id = v.checkpoint_id
+        RETURNING pg_column_size(w.*) AS sz
+    ),
+    dc AS (
+        DELETE FROM checkpoints c USING victims v
+        WHERE c.thread_id = v.thread_id AND c.checkpoint_ns = v.checkpoint_ns
+          AND c.checkpoint_id = v.checkpoint_id
+        RETURNING pg_column_size(c.*) AS sz
+    )
+    SELECT (SELECT count(*) FROM dc), (SELECT COALESCE(sum(sz), 0) FROM dc),
+           (SELECT count(*) FROM dw), (SELECT COALESCE(sum(sz), 0) FROM dw);
+"""
+
+# Separate statement so it sees TRIM_SQL's deletions.
+ORPHAN_BLOBS_SQL = """
+    WITH live AS (
+        SELECT c.thread_id, c.checkpoint_ns, cv.key AS channel, cv.value AS version
+        FROM checkpoints c, jsonb_each_text(c.checkpoint->'channel_versions') cv
+        WHERE c.thread_id = ANY(%(threads)s)
+    ),
+    -- A live "delta" blob (checkpoint_delta.py) also needs every blob back to
+    -- the snapshot below it, so keep each channel from its oldest such floor.
+    chain_floor AS (
+        SELECT l.thread_id, l.checkpoint_ns, l.channel, min(s.version) AS version
+        FROM live l
+        JOIN checkpoint_blobs lb
+          ON lb.thread_id = l.thread_id AND lb.checkpoint_ns = l.checkpoint_ns
+         AND lb.channel = l.channel AND lb.version = l.version AND lb.type = 'delta'
+        CROSS JOIN LATERAL (
+            SELECT max(sb.version) AS version
+            FROM checkpoint_blobs sb
+            WHERE sb.thread_id = l.thread_id AND sb.checkpoint_ns = l.checkpoint_ns
+              AND sb.channel = l.channel AND sb.version < l.version AND sb.type <> 'delta'
+        ) s
+        GROUP BY l.thread_id, l.checkpoint_ns, l.channel
+    ),
+    d AS (
+        DELETE FROM checkpoint_blobs b
+        WHERE b.thread_id = ANY(%(threads)s)
+          AND NOT EXISTS (
+              SELECT 1 FROM live l
+              WHERE l.thread_id = b.thread_id AND l.checkpoint_ns = b.checkpoint_ns
+                AND l.channel = b.channel AND l.version = b.version
+          )
+          AND NOT EXISTS (
+              SELECT 1 FROM chain_floor f
+              WHERE f.thread_id = b.thread_id AND f.checkpoint_ns = b.checkpoint_ns
+                AND f.channel = b.channel AND b.version >= f.version
+          )
+        RETURNING pg_column_size(b.*) AS sz
+    )
+    SELECT count(*), COALESCE(sum(sz), 0) FROM d;
+"""
+
+DELETE_THREADS_SQL = """
+    WITH dw AS (
+        DELETE FROM checkpoint_writes WHERE thread_id = ANY(%(threads)s)
+        RETURNING pg_column_size(checkpoint_writes.*) AS sz
+    ),
+    db AS (
+        DELETE FROM checkpoint_blobs WHERE thread_id = ANY(%(threads)s)
+        RETURNING pg_column_size(checkpoint_blobs.*) AS sz
+    ),
+    dc AS (
+        DELETE FROM checkpoints WHERE thread_id = ANY(%(threads)s)
+        RETURNING pg_column_size(checkpoints.*) AS sz
+    )
+    SELECT (SELECT count(*) FROM dc), (SELECT COALESCE(sum(sz), 0) FROM dc),
+           (SELECT count(*) FROM dw), (SELECT COALESCE(sum(sz), 0) FROM dw),
+           (SELECT count(*) FROM db), (SELECT COALESCE(sum(sz), 0) FROM db);
+"""
+
+
+@dataclass
+class RetentionStats:
+    """Cumulative rows/bytes reclaimed (bytes are pg_column_size of the deleted rows)."""
+    checkpoints_rows: int = 0
+    checkpoints_bytes: int = 0
+    writes_rows: int = 0
+    writes_bytes: int = 0
+    blobs_rows: int = 0
+    blobs_bytes: int = 0
+    threads_trimmed: int = 0
+    threads_expired: int = 0
+    runs: int = 0
+    last_run_seconds: float = 0.0
+
+    def add(self, checkpoints=(0, 0), writes=(0, 0), blobs=(0, 0)) -> None:
+        self.checkpoints_rows += checkpoints[0]
+        self.checkpoints_bytes += checkpoints[1]
+        self.writes_rows += writes[0]
+        self.writes_bytes += writes[1]
+        self.blobs_rows += blobs[0]
+        self.blobs_bytes += blobs[1]
+        for table, (rows, nbytes) in (("checkpoints", checkpoints), ("checkpoint_writes", writes),
+                                      ("checkpoint_blobs", blobs)):
+            if rows:
+                REGISTRY.inc("onboarding_retention_rows_total", rows, table=table)
+                REGISTRY.inc("onboarding_retention_bytes_total", nbytes, table=table)
+
+    @property
+    def bytes_reclaimed(self) -> int:
+        return self.checkpoints_bytes + self.writes_bytes + self.blobs_bytes
+
+    def as_dict(self) -> Dict[str, float]:
+        d = asdict(self)
+        d["bytes_reclaimed"] = self.bytes_reclaimed
+        return d
+
+
+@dataclass
+class CheckpointRetention:
+    dsn: str
+    keep_last: int = 20
+    completed_ttl: Optional[str] = "30 days"   # Postgres interval text; None disables
+    idle_ttl: Optional[str] = None             # expire any thread idle this long
+    batch_threads: int = 50
+    lock_timeout: str = "2s"
+    pause: float = 0.05                        # seconds between batches
+    stats: RetentionStats = field(default_factory=RetentionStats)
+
+    def _begin(self, conn) -> None:
+        conn.execute("SELECT set_config('lock_timeout', %s, true)", (self.lock_timeout,))
+
+    def _batches(self, threads: List[str]):
+        for i in range(0, len(threads), self.batch_threads):
+            yield threads[i:i + self.batch_threads]
+
+    def trim(self, conn, threads: List[str]) -> None:
+        """Keep only the latest keep_last checkpoints of each of `threads`."""
+        for batch in self._batches(threads):
+            with conn.transaction():
+                self._begin(conn)
+                batch = [r[0] for r in conn.execute(STILL_IDLE_SQL, {"threads": batch, "idle": MIN_IDLE})]
+                if not batch:
+                    continue
+                cp_rows, cp_bytes, w_rows, w_bytes = conn.execute(
+                    TRIM_SQL, {"threads": batch, "keep": self.keep_last}).fetchone()
+                b_rows, b_bytes = conn.execute(ORPHAN_BLOBS_SQL, {"threads": batch}).fetchone()
+            self.stats.add((cp_rows, cp_bytes), (w_rows, w_bytes), (b_rows, b_bytes))
+            self.stats.threads_trimmed += len(batch)
+            REGISTRY.inc("onboarding_retention_threads_total", len(batch), action="trim")
+            time.sleep(self.pause)
+
+    def expire(self, conn, threads: List[str], ttl: str) -> None:
+        """Delete `threads` whole, in batches, if still idle for ttl."""
+        for batch in self._batches(threads):
+            with conn.transaction():
+                self._begin(conn)
+                batch = [r[0] for r in conn.execute(STILL_IDLE_SQL, {"threads": batch, "idle": ttl})]
+                if not batch:
+                    continue
+                cp_rows, cp_bytes, w_rows, w_bytes, b_rows, b_bytes = conn.execute(
+                    DELETE_THREADS_SQL, {"threads": batch}).fetchone()
+            self.stats.add((cp_rows, cp_bytes), (w_rows, w_bytes), (b_rows, b_bytes))
+            self.stats.threads_expired += len(batch)
+            REGISTRY.inc("onboarding_retention_threads_total", len(batch), action="expire")
+            time.sleep(self.pause)
+
+    def run_once(self) -> RetentionStats:
+        t0 = time.perf_counter()
+        with psycopg.connect(self.dsn, autocommit=True) as conn:
+            rows = conn.execute(SWEEP_CANDIDATES_SQL, {
+                "completed_ttl": self.completed_ttl, "idle_ttl": self.idle_ttl,
+                "keep": self.keep_last, "min_idle": MIN_IDLE,
+            }).fetchall()
+            completed = [r[0] for r in rows if r[1]]
+            idle = [r[0] for r in rows if r[2] and not r[1]]
+            expired = set(completed) | set(idle)
+            if completed:
+                self.expire(conn, completed, self.completed_ttl)
+            if idle:
+                self.expire(conn, idle, self.idle_ttl)
+            self.trim(conn, [r[0] for r in rows if r[3] and r[0] not in expired])
+        self.stats.runs += 1
+        self.stats.last_run_seconds = round(time.perf_counter() - t0, 3)
+        REGISTRY.observe("onboarding_retention_run_seconds", self.stats.last_run_seconds)
+        return self.stats
+
+    def start_background(self, interval: float = 300.0) -> threading.Thread:
+        """Run forever on a daemon thread, every `interval` seconds."""
+        def loop():
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print("checkpoint retention error:", e)
+                time.sleep(interval)
+        t = threading.Thread(target=loop, name="checkpoint-retention", daemon=True)
+        t.start()
+        return t
+
+
+def from_env(dsn: Optional[str] = None) -> Optional[CheckpointRetention]:
+    """Build a retention job from CHECKPOINT_* env vars, or None if not enabled."""
+    keep = os.getenv("CHECKPOINT_KEEP_LAST")
+    if not keep:
+        return None
+    return CheckpointRetention(
+        dsn=dsn or os.getenv("DATABASE_URL"),
+        keep_last=int(keep),
+        completed_ttl=os.getenv("CHECKPOINT_COMPLETED_TTL", "30 days") or None,
+        idle_ttl=os.getenv("CHECKPOINT_IDLE_TTL") or None,
+    )
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compact LangGraph checkpoint tables.")
+    ap.add_argument("--keep", type=int, default=20, help="checkpoints to keep per thread")
+    ap.add_argument("--completed-ttl", default="30 days", help="expire completed onboardings after this interval ('' disables)")
+    ap.add_argument("--idle-ttl", default=None, help="expire any thread idle this long")
+    ap.add_argument("--batch", type=int, default=50, help="threads per transaction")
+    ap.add_argument("--loop", type=float, default=None, help="repeat every N seconds")
+    args = ap.parse_args()
+
+    load_dotenv()
+    job = CheckpointRetention(
+        dsn=os.getenv("DATABASE_URL"),
+        keep_last=args.keep,
+        completed_ttl=args.completed_ttl or None,
+        idle_ttl=args.idle_ttl,
+        batch_threads=args.batch,
+    )
+    while True:
+        print(job.run_once().as_dict())
+        if not args.loop:
+            break
+        time.sleep(args.loop)
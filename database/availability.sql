@@ -0,0 +1,148 @@
+SET search_path TO onboarding, public;
+
+-- Availability read model: free counts by seat_type and by equipment_type/os,
+-- so capacity questions never scan seating_space / equipments.
+-- "Free" matches the claim queries: employee_ID IS NULL AND claimed_by IS NULL.
+--
+-- Writers never touch a shared counter row (every claim of a cubicle would
+-- queue on it): statement triggers append net changes to
+-- inventory_availability_delta, and fold_inventory_availability() rolls them
+-- into inventory_availability. hold_sweeper.py folds everything on each run
+-- and must be running (HOLD_SWEEP_SECONDS); availability reads
+-- (inventory.availability) also fold a bounded batch first, so the delta
+-- table stays small between sweeps. Readers sum both tables. The delta table
+-- is an unindexed heap on purpose: it is only appended to and drained whole.
+CREATE TABLE IF NOT EXISTS inventory_availability (
+  kind       VARCHAR(16) NOT NULL,          -- 'seat' | 'equipment'
+  item_type  VARCHAR(50) NOT NULL,          -- seat_type / equipment_type
+  os         VARCHAR(20) NOT NULL DEFAULT '',
+  free_count BIGINT NOT NULL,
+  PRIMARY KEY (kind, item_type, os)
+);
+
+CREATE TABLE IF NOT EXISTS inventory_availability_delta (
+  kind      VARCHAR(16) NOT NULL,
+  item_type VARCHAR(50) NOT NULL,
+  os        VARCHAR(20) NOT NULL DEFAULT '',
+  delta     BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION seat_availability_delta() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO inventory_availability_delta (kind, item_type, delta)
+    SELECT 'seat', seat_type, count(*) FROM new_rows
+    WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY seat_type;
+  ELSIF TG_OP = 'DELETE' THEN
+    INSERT INTO inventory_availability_delta (kind, item_type, delta)
+    SELECT 'seat', seat_type, -count(*) FROM old_rows
+    WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY seat_type;
+  ELSE
+    INSERT INTO inventory_availability_delta (kind, item_type, delta)
+    SELECT 'seat', seat_type, sum(d) FROM (
+      SELECT seat_type, -1 AS d FROM old_rows WHERE employee_ID IS NULL AND claimed_by IS NULL
+      UNION ALL
+      SELECT seat_type, 1 FROM new_rows WHERE employee_ID IS NULL AND claimed_by IS NULL
+    ) x GROUP BY seat_type HAVING sum(d) <> 0;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SET search_path = onboarding, public;
+
+CREATE OR REPLACE FUNCTION equipment_availability_delta() RETURNS trigger AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    INSERT INTO inventory_availability_delta (kind, item_type, os, delta)
+    SELECT 'equipment', equipment_type, COALESCE(os, ''), count(*) FROM new_rows
+    WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY 2, 3;
+  ELSIF TG_OP = 'DELETE' THEN
+    INSERT INTO inventory_availability_delta (kind, item_type, os, delta)
+    SELECT 'equipment', equipment_type, COALESCE(os, ''), -count(*) FROM old_rows
+    WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY 2, 3;
+  ELSE
+    INSERT INTO inventory_availability_delta (kind, item_type, os, delta)
+    SELECT 'equipment', equipment_type, os_key, sum(d) FROM (
+      SELECT equipment_type, COALESCE(os, '') AS os_key, -1 AS d FROM old_rows
+      WHERE employee_ID IS NULL AND claimed_by IS NULL
+      UNION ALL
+      SELECT equipment_type, COALESCE(os, ''), 1 FROM new_rows
+      WHERE employee_ID IS NULL AND claimed_by IS NULL
+    ) x GROUP BY equipment_type, os_key HAVING sum(d) <> 0;
+  END IF;
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SET search_path = onboarding, public;
+
+-- Transition tables allow only one event per trigger, hence three of each.
+DROP TRIGGER IF EXISTS trg_seating_space_avail_ins ON seating_space;
+CREATE TRIGGER trg_seating_space_avail_ins AFTER INSERT ON seating_space
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION seat_availability_delta();
+DROP TRIGGER IF EXISTS trg_seating_space_avail_upd ON seating_space;
+CREATE TRIGGER trg_seating_space_avail_upd AFTER UPDATE ON seating_space
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION seat_availability_delta();
+DROP TRIGGER IF EXISTS trg_seating_space_avail_del ON seating_space;
+CREATE TRIGGER trg_seating_space_avail_del AFTER DELETE ON seating_space
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION seat_availability_delta();
+
+DROP TRIGGER IF EXISTS trg_equipments_avail_ins ON equipments;
+CREATE TRIGGER trg_equipments_avail_ins AFTER INSERT ON equipments
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION equipment_availability_delta();
+DROP TRIGGER IF EXISTS trg_equipments_avail_upd ON equipments;
+CREATE TRIGGER trg_equipments_avail_upd AFTER UPDATE ON equipments
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION equipment_availability_delta();
+DROP TRIGGER IF EXISTS trg_equipments_avail_del ON equipments;
+CREATE TRIGGER trg_equipments_avail_del AFTER DELETE ON equipments
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION equipment_availability_delta();
+
+-- Fold pending deltas (at most max_rows; NULL = all) into the summary. Safe
+-- to run concurrently with writers and with other folds: only deltas visible
+-- to this statement are moved, and rows another fold holds are skipped.
+DROP FUNCTION IF EXISTS fold_inventory_availability();
+CREATE OR REPLACE FUNCTION fold_inventory_availability(max_rows INT DEFAULT NULL) RETURNS BIGINT AS $$
+DECLARE
+  moved BIGINT;
+BEGIN
+  WITH d AS (
+    DELETE FROM inventory_availability_delta
+    WHERE ctid = ANY(ARRAY(
+      SELECT ctid FROM inventory_availability_delta LIMIT max_rows FOR UPDATE SKIP LOCKED
+    ))
+    RETURNING kind, item_type, os, delta
+  ),
+  agg AS (
+    SELECT kind, item_type, os, sum(delta) AS delta, count(*) AS n FROM d GROUP BY kind, item_type, os
+  ),
+  up AS (
+    INSERT INTO inventory_availability AS a (kind, item_type, os, free_count)
+    SELECT kind, item_type, os, delta FROM agg
+    ON CONFLICT (kind, item_type, os) DO UPDATE SET free_count = a.free_count + EXCLUDED.free_count
+  )
+  SELECT COALESCE(sum(n), 0) INTO moved FROM agg;
+  RETURN moved;
+END;
+$$ LANGUAGE plpgsql SET search_path = onboarding, public;
+
+-- Full recount from the base tables (first install, after a trigger-less
+-- bulk load such as migrate.py --seed-*, or to repair drift). Blocks
+-- writers on the two inventory tables while it counts.
+CREATE OR REPLACE FUNCTION refresh_inventory_availability() RETURNS VOID AS $$
+BEGIN
+  LOCK TABLE seating_space, equipments IN SHARE MODE;
+  DELETE FROM inventory_availability_delta;
+  DELETE FROM inventory_availability;
+  INSERT INTO inventory_availability (kind, item_type, os, free_count)
+  SELECT 'seat', seat_type, '', count(*) FROM seating_space
+  WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY seat_type;
+  INSERT INTO inventory_availability (kind, item_type, os, free_count)
+  SELECT 'equipment', equipment_type, COALESCE(os, ''), count(*) FROM equipments
+  WHERE employee_ID IS NULL AND claimed_by IS NULL GROUP BY 2, 3;
+END;
+$$ LANGUAGE plpgsql SET search_path = onboarding, public;
+
+SELECT refresh_inventory_availability();
@@ -0,0 +1,411 @@
+"""
+Bulk onboarding for new-hire cohorts.
+
+Streams a CSV or JSONL file of hires (name, email, phone, seat_type,
+os_requirement), validates it in chunks, column-wise (employee.validate_records), COPYs the
+valid rows into a staging table and then, in one transaction:
+  1) inserts employees (duplicate emails are reported, not fatal) and gives
+     them office addresses, reserving a block of suffixes per name,
+  2) assigns one free seat per hire by seat_type,
+  3) assigns a laptop for the hire's OS plus one of each accessory, only to
+     hires whose whole kit is in stock,
+  4) rolls back the hires left without a seat or a kit: their partial
+     assignments are released and their employee rows deleted, so the same
+     file can simply be re-run after a restock,
+  5) queues the provisioning events for every fully provisioned new
+     employee (outbox.py),
+all with set-based SQL. Per-row failures (including unparseable JSONL
+lines and values too long for their column) are written as JSONL.
+
+    python bulk_onboard.py hires.csv --errors failures.jsonl
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from typing import Iterator, Dict, Any, List, Tuple
+
+import psycopg
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from employee import validate_records
+from inventory import KIT_ACCESSORIES, ONBOARDED_TOPICS
+from office_email import ADDRESS_SQL, OFFICE_DOMAIN, local_base
+
+FIELDS = ("name", "email", "phone", "seat_type", "os_requirement")
+REQUIRED = ("name", "email", "seat_type", "os_requirement")
+CHUNK = 5000  # rows validated column-wise per pass
+
+STAGE_SQL = """
+    CREATE TEMP TABLE batch_hires (
+        line_no        INT PRIMARY KEY,
+        name           VARCHAR(100) NOT NULL,
+        email          VARCHAR(255) NOT NULL,
+        phone          VARCHAR(32),
+        seat_type      VARCHAR(50) NOT NULL,
+        os_requirement VARCHAR(20) NOT NULL,
+        local_base     VARCHAR(64) NOT NULL,
+        employee_id    BIGINT
+    ) ON COMMIT DROP;
+"""
+
+INSERT_EMPLOYEES_SQL = """
+    WITH ins AS (
+        INSERT INTO onboarding.employees (name, email, phone)
+        SELECT name, email, phone FROM batch_hires ORDER BY line_no
+        ON CONFLICT (email) DO NOTHING
+        RETURNING employee_id, email
+    )
+    UPDATE batch_hires b SET employee_id = ins.employee_id
+    FROM ins WHERE ins.email = b.email;
+"""
+
+# Office addresses for the new employees: one counter bump per distinct local
+# base reserves a block of n suffixes, and the cohort's hires with that base
+# take them in line order. Counter rows are locked in local_base order so two
+# cohorts sharing names can't deadlock.
+ASSIGN_OFFICE_EMAILS_SQL = """
+    WITH need AS (
+        SELECT employee_id, local_base,
+               row_number() OVER (PARTITION BY local_base ORDER BY line_no) AS rn
+        FROM batch_hires WHERE employee_id IS NOT NULL
+    ),
+    per_base AS (
+        SELECT local_base, count(*) AS n FROM need GROUP BY local_base
+    ),
+    bump AS (
+        INSERT INTO onboarding.office_local_parts AS p (local_base, last_suffix)
+        SELECT local_base, n FROM per_base ORDER BY local_base
+        ON CONFLICT (local_base) DO UPDATE SET last_suffix = p.last_suffix + EXCLUDED.last_suffix
+        RETURNING local_base, last_suffix
+    ),
+    addr AS (
+        SELECT need.employee_id, need.local_base, bump.last_suffix - per_base.n + need.rn AS suffix
+        FROM need JOIN per_base USING (local_base) JOIN bump USING (local_base)
+    )
+    UPDATE onboarding.employees e
+    SET office_local_base = addr.local_base, office_suffix = addr.suffix,
+        office_email = {address}
+    FROM addr WHERE e.employee_ID = addr.employee_id;
+""".format(address=ADDRESS_SQL.format(base="addr.local_base", suffix="addr.suffix"))
+
+# Rank hires and free seats within each seat_type and pair them by rank.
+# Locking happens in its own CTE because FOR UPDATE can't sit next to a window,
+# and takes at most as many free rows per type as the cohort needs (LATERAL
+# LIMIT), not every free seat of that type.
+ASSIGN_SEATS_SQL = """
+    WITH need_count AS (
+        SELECT seat_type, count(*) AS n
+        FROM batch_hires WHERE employee_id IS NOT NULL
+        GROUP BY seat_type
+    ),
+    free_locked AS (
+        SELECT f.seat_id, nc.seat_type
+        FROM need_count nc
+        CROSS JOIN LATERAL (
+            SELECT ss.seat_id
+            FROM onboarding.seating_space ss
+            WHERE ss.employee_id IS NULL AND ss.claimed_by IS NULL
+              AND ss.seat_type = nc.seat_type
+            LIMIT nc.n
+            FOR UPDATE SKIP LOCKED
+        ) f
+    ),
+    free AS (
+        SELECT seat_id, seat_type,
+               row_number() OVER (PARTITION BY seat_type ORDER BY seat_id) AS rn
+        FROM free_locked
+    ),
+    need AS (
+        SELECT employee_id, seat_type,
+               row_number() OVER (PARTITION BY seat_type ORDER BY line_no) AS rn
+        FROM batch_hires WHERE employee_id IS NOT NULL
+    )
+    UPDATE onboarding.seating_space ss
+    SET employee_id = need.employee_id
+    FROM need JOIN free USING (seat_type, rn)
+    WHERE ss.seat_id = free.seat_id;
+"""
+
+# Kits are all-or-nothing per hire, as in inventory.claim_equipment_kit: a
+# hire gets equipment only if every kit line ranks within the locked stock of
+# that line; the complete hires are then re-ranked (ranks only shrink) and
+# paired with free rows. Locks are capped at the cohort's need per line.
+ASSIGN_EQUIPMENT_SQL = """
+    WITH kit AS (
+        SELECT t.equipment_type, t.is_laptop
+        FROM unnest(%(types)s::text[], %(is_laptop)s::bool[]) AS t(equipment_type, is_laptop)
+    ),
+    need AS (
+        SELECT b.employee_id, b.line_no, k.equipment_type,
+               CASE WHEN k.is_laptop THEN b.os_requirement ELSE '' END AS os_key
+        FROM batch_hires b CROSS JOIN kit k
+        WHERE b.employee_id IS NOT NULL
+    ),
+    need_count AS (
+        SELECT equipment_type, os_key, count(*) AS n FROM need GROUP BY equipment_type, os_key
+    ),
+    free_locked AS (
+        SELECT f.equipment_id, nc.equipment_type, nc.os_key
+        FROM need_count nc
+        CROSS JOIN LATERAL (
+            SELECT eq.equipment_id
+            FROM onboarding.equipments eq
+            WHERE eq.employee_id IS NULL AND eq.claimed_by IS NULL
+              AND eq.equipment_type = nc.equipment_type
+              AND COALESCE(eq.os, '') = nc.os_key
+            LIMIT nc.n
+            FOR UPDATE SKIP LOCKED
+        ) f
+    ),
+    stock AS (
+        SELECT equipment_type, os_key, count(*) AS n FROM free_locked GROUP BY equipment_type, os_key
+    ),
+    complete AS (
+        SELECT r.employee_id
+        FROM (
+            SELECT employee_id, equipment_type, os_key,
+                   row_number() OVER (PARTITION BY equipment_type, os_key ORDER BY line_no) AS rn
+            FROM need
+        ) r
+        LEFT JOIN stock s USING (equipment_type, os_key)
+        GROUP BY r.employee_id
+        HAVING bool_and(r.rn <= COALESCE(s.n, 0))
+    ),
+    take AS (
+        SELECT need.employee_id, need.equipment_type, need.os_key,
+               row_number() OVER (PARTITION BY need.equipment_type, need.os_key ORDER BY need.line_no) AS rn
+        FROM need JOIN complete USING (employee_id)
+    ),
+    free AS (
+        SELECT equipment_id, equipment_type, os_key,
+               row_number() OVER (PARTITION BY equipment_type, os_key ORDER BY equipment_id) AS rn
+        FROM free_locked
+    )
+    UPDATE onboarding.equipments eq
+    SET employee_id = take.employee_id
+    FROM take JOIN free USING (equipment_type, os_key, rn)
+    WHERE eq.equipment_id = free.equipment_id;
+"""
+
+# Which hires ended up short of a seat or a kit line.
+SHORTFALL_SQL = """
+    SELECT b.line_no, b.email,
+           NOT EXISTS (SELECT 1 FROM onboarding.seating_space ss WHERE ss.employee_id = b.employee_id) AS no_seat,
+           ARRAY(
+               SELECT k.t FROM unnest(%(types)s::text[]) AS k(t)
+               WHERE NOT EXISTS (
+                   SELECT 1 FROM onboarding.equipments eq
+                   WHERE eq.employee_id = b.employee_id AND eq.equipment_type = k.t
+               )
+           ) AS missing_equipment
+    FROM batch_hires b
+    WHERE b.employee_id IS NOT NULL;
+"""
+
+# Hires that came up short are not onboarded at all: hand back whatever they
+# were partly given, then drop their employee rows (and their batch_hires
+# link). The office-address suffixes reserved for them are simply skipped.
+RELEASE_SHORT_SQL = """
+    WITH s AS (
+        SELECT employee_id FROM batch_hires WHERE line_no = ANY(%(short)s::int[])
+    ),
+    seats AS (
+        UPDATE onboarding.seating_space ss SET employee_id = NULL
+        FROM s WHERE ss.employee_id = s.employee_id
+        RETURNING 1
+    ),
+    items AS (
+        UPDATE onboarding.equipments eq SET employee_id = NULL
+        FROM s WHERE eq.employee_id = s.employee_id
+        RETURNING 1
+    )
+    SELECT (SELECT count(*) FROM seats), (SELECT count(*) FROM items);
+"""
+
+DELETE_SHORT_SQL = """
+    WITH gone AS (
+        DELETE FROM onboarding.employees e USING batch_hires b
+        WHERE b.line_no = ANY(%(short)s::int[]) AND e.employee_ID = b.employee_id
+        RETURNING e.employee_ID
+    )
+    UPDATE batch_hires b SET employee_id = NULL FROM gone WHERE b.employee_id = gone.employee_ID;
+"""
+
+# Same events and payload shape as inventory.confirm_onboarding, for every
+# employee the cohort still has: short hires were rolled back above, so each
+# remaining one has a seat and a full kit and none is left without its events.
+ENQUEUE_ONBOARDED_SQL = """
+    INSERT INTO onboarding.outbox (idempotency_key, topic, aggregate_id, payload)
+    SELECT t.topic || ':' || e.employee_ID, t.topic, e.employee_ID,
+           jsonb_build_object(
+               'employee_id', e.employee_ID, 'name', e.name, 'email', e.email, 'phone', e.phone,
+               'office_email', e.office_email, 'seat_id', ss.seat_id, 'seat_type', ss.seat_type,
+               'items', COALESCE((
+                   SELECT jsonb_agg(jsonb_build_object(
+                       'equipment_id', eq.equipment_id, 'equipment_type', eq.equipment_type,
+                       'os', eq.os, 'serial_number', eq.serial_number))
+                   FROM onboarding.equipments eq WHERE eq.employee_id = e.employee_ID), '[]'::jsonb))
+    FROM batch_hires b
+    JOIN onboarding.employees e ON e.employee_ID = b.employee_id
+    JOIN onboarding.seating_space ss ON ss.employee_id = e.employee_ID
+    CROSS JOIN unnest(%(topics)s::text[]) AS t(topic)
+    ON CONFLICT (idempotency_key) DO NOTHING;
+"""
+
+
+def read_rows(path: str, unreadable: List[Dict[str, Any]]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yield (line_no, raw dict) from a .csv or .jsonl file without loading it
+    all. JSONL lines that are not a JSON object are appended to `unreadable`
+    as failures instead.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for i, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    doc = json.loads(line)
+                except ValueError as e:
+                    unreadable.append({"line": i, "email": None, "error": f"invalid JSON: {e}"})
+                    continue
+                if not isinstance(doc, dict):
+                    unreadable.append({"line": i, "email": None, "error": "expected a JSON object"})
+                    continue
+                yield i, doc
+        else:
+            for i, row in enumerate(csv.DictReader(f), 2):  # header is line 1
+                yield i, row
+
+
+def validated_chunks(path: str) -> Iterator[Tuple[List[Tuple], List[Dict[str, Any]]]]:
+    """Yield (rows, failures) per CHUNK of input, validated column-wise via employee.validate_records."""
+    buf: List[Tuple[int, Dict[str, Any]]] = []
+    unreadable: List[Dict[str, Any]] = []
+
+    def flush():
+        result = validate_records([raw for _, raw in buf], FIELDS, REQUIRED)
+        failures: Dict[int, Dict[str, Any]] = {f["line"]: f for f in unreadable}
+        unreadable.clear()
+        for i, field, msg in result.errors:
+            line_no, raw = buf[i]
+            if line_no in failures:
+                failures[line_no]["error"] += f"; {msg}"
+            else:
+                failures[line_no] = {"line": line_no, "email": raw.get("email"), "error": msg}
+        rows = [(buf[i][0], *row) for i, row in zip(result.row_index, result.rows())]
+        return rows, list(failures.values())
+
+    for item in read_rows(path, unreadable):
+        buf.append(item)
+        if len(buf) >= CHUNK:
+            yield flush()
+            buf = []
+    if buf or unreadable:
+        yield flush()
+
+
+def run(path: str, dsn: str) -> Dict[str, Any]:
+    t0 = time.perf_counter()
+    failures: List[Dict[str, Any]] = []
+    seen: Dict[str, int] = {}
+    staged = read = 0
+    types = ["laptop", *KIT_ACCESSORIES]
+
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute(STAGE_SQL)
+            with cur.copy(
+                "COPY batch_hires (line_no, name, email, phone, seat_type, os_requirement, local_base) FROM STDIN"
+            ) as copy:
+                for rows, bad in validated_chunks(path):
+                    read += len(rows) + len(bad)
+                    failures.extend(bad)
+                    for line_no, name, email, phone, seat_type, os_requirement in rows:
+                        if email in seen:
+                            failures.append({"line": line_no, "email": email,
+                                             "error": f"duplicate of line {seen[email]}"})
+                            continue
+                        seen[email] = line_no
+                        copy.write_row((line_no, name, email, phone, seat_type, os_requirement, local_base(name)))
+                        staged += 1
+
+            cur.execute("ANALYZE batch_hires")
+            cur.execute(INSERT_EMPLOYEES_SQL)
+            inserted = cur.rowcount
+            cur.execute("SELECT line_no, email FROM batch_hires WHERE employee_id IS NULL")
+            for line_no, email in cur.fetchall():
+                failures.append({"line": line_no, "email": email, "error": "email already exists"})
+            cur.execute(ASSIGN_OFFICE_EMAILS_SQL, {"domain": OFFICE_DOMAIN})
+
+            cur.execute(ASSIGN_SEATS_SQL)
+            seats = cur.rowcount
+            cur.execute(ASSIGN_EQUIPMENT_SQL, {"types": types, "is_laptop": [t == "laptop" for t in types]})
+            equipment = cur.rowcount
+
+            short = []
+            cur.execute(SHORTFALL_SQL, {"types": types})
+            for line_no, email, no_seat, missing in cur.fetchall():
+                if no_seat or missing:
+                    short.append(line_no)
+                    # kits are all-or-nothing, so `missing` is every line when any one ran short
+                    parts = (["no free seat"] if no_seat else []) + (["no complete equipment kit in stock"] if missing else [])
+                    failures.append({"line": line_no, "email": email,
+                                     "error": "; ".join(parts) + " (not onboarded, re-run after a restock)"})
+            if short:
+                cur.execute(RELEASE_SHORT_SQL, {"short": short})
+                released_seats, released_items = cur.fetchone()
+                seats -= released_seats
+                equipment -= released_items
+                cur.execute(DELETE_SHORT_SQL, {"short": short})
+                inserted -= cur.rowcount
+
+            cur.execute(ENQUEUE_ONBOARDED_SQL, {"topics": list(ONBOARDED_TOPICS)})
+            events = cur.rowcount
+        conn.commit()
+
+    elapsed = time.perf_counter() - t0
+    failures.sort(key=lambda f: f["line"])
+    return {
+        "rows_read": read,
+        "staged": staged,
+        "employees_inserted": inserted,
+        "rolled_back_short": len(short),
+        "seats_assigned": seats,
+        "equipment_assigned": equipment,
+        "events_queued": events,
+        "failures": failures,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(read / elapsed, 1) if elapsed else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk onboard a cohort of hires from CSV/JSONL.")
+    ap.add_argument("path")
+    ap.add_argument("--errors", help="write per-row failures as JSONL here (default: stderr)")
+    args = ap.parse_args()
+
+    load_dotenv()
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        raise SystemExit("DATABASE_URL not set (put it in .env or env).")
+    if not os.path.isfile(args.path):
+        raise SystemExit(f"File not found: {args.path}")
+
+    report = run(args.path, dsn)
+    failures = report.pop("failures")
+    out = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    for f in failures:
+        out.write(json.dumps(f) + "\n")
+    if args.errors:
+        out.close()
+    print(f"✅ {report} ({len(failures)} failed rows)")
+
+
+if __name__ == "__main__":
+    main()
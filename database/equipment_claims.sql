@@ -0,0 +1,15 @@
+SET search_path TO onboarding, public;
+
+-- Claim-style equipment allocation, mirroring seat_claims.sql.
+ALTER TABLE equipments ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(128);
+ALTER TABLE equipments ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+
+-- Free-inventory lookup by (equipment_type, os). Accessories have no os, so
+-- the key is COALESCE(os, '') to keep a single equality probe per kit item.
+CREATE INDEX IF NOT EXISTS idx_equipments_free
+  ON equipments (equipment_type, (COALESCE(os, '')), equipment_ID)
+  WHERE employee_ID IS NULL AND claimed_by IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_equipments_claimed_by
+  ON equipments (claimed_by)
+  WHERE claimed_by IS NOT NULL;
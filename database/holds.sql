@@ -0,0 +1,22 @@
+SET search_path TO onboarding, public;
+
+-- Time-limited holds: a claim made while the plan is being confirmed expires
+-- at hold_expires_at unless confirm_onboarding() binds it to an employee
+-- (which clears the expiry). Run after seat_claims.sql / equipment_claims.sql.
+ALTER TABLE seating_space ADD COLUMN IF NOT EXISTS hold_expires_at TIMESTAMPTZ;
+ALTER TABLE equipments ADD COLUMN IF NOT EXISTS hold_expires_at TIMESTAMPTZ;
+
+-- Claims made before holds existed get the default 15 minute TTL from their claim time.
+UPDATE seating_space SET hold_expires_at = claimed_at + interval '15 minutes'
+WHERE claimed_by IS NOT NULL AND employee_ID IS NULL AND hold_expires_at IS NULL;
+UPDATE equipments SET hold_expires_at = claimed_at + interval '15 minutes'
+WHERE claimed_by IS NOT NULL AND employee_ID IS NULL AND hold_expires_at IS NULL;
+
+-- Expiry sweep index: only live holds are in it, ordered by expiry, so the
+-- sweep is a short range scan from the oldest hold up to NOW().
+CREATE INDEX IF NOT EXISTS idx_seating_space_hold_expiry
+  ON seating_space (hold_expires_at)
+  WHERE hold_expires_at IS NOT NULL AND employee_ID IS NULL;
+CREATE INDEX IF NOT EXISTS idx_equipments_hold_expiry
+  ON equipments (hold_expires_at)
+  WHERE hold_expires_at IS NOT NULL AND employee_ID IS NULL;
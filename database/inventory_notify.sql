@@ -0,0 +1,40 @@
+SET search_path TO onboarding, public;
+
+-- Broadcast free/taken transitions of seats and equipment so every process
+-- can keep its in-memory free-inventory index in sync (see inventory_cache.py).
+-- to_jsonb() keeps the function generic across both tables and tolerant of
+-- columns that only one of them has (claimed_by, os, ...).
+CREATE OR REPLACE FUNCTION notify_inventory_change() RETURNS trigger AS $$
+DECLARE
+  doc  JSONB;
+  free BOOLEAN;
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    doc  := to_jsonb(OLD);
+    free := FALSE;
+  ELSE
+    doc  := to_jsonb(NEW);
+    free := doc->>'employee_id' IS NULL AND doc->>'claimed_by' IS NULL;
+  END IF;
+
+  PERFORM pg_notify('onboarding_inventory', json_build_object(
+    'table', TG_TABLE_NAME,
+    'id', COALESCE(doc->>'seat_id', doc->>'equipment_id')::BIGINT,
+    'seat_type', doc->>'seat_type',
+    'equipment_type', doc->>'equipment_type',
+    'os', doc->>'os',
+    'free', free
+  )::text);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_seating_space_notify ON seating_space;
+CREATE TRIGGER trg_seating_space_notify
+  AFTER INSERT OR UPDATE OR DELETE ON seating_space
+  FOR EACH ROW EXECUTE FUNCTION notify_inventory_change();
+
+DROP TRIGGER IF EXISTS trg_equipments_notify ON equipments;
+CREATE TRIGGER trg_equipments_notify
+  AFTER INSERT OR UPDATE OR DELETE ON equipments
+  FOR EACH ROW EXECUTE FUNCTION notify_inventory_change();
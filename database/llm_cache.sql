@@ -0,0 +1,15 @@
+SET search_path TO onboarding, public;
+
+-- Shared tier of the LLM response cache (llm_cache.py), keyed on the whole
+-- normalized prompt including the per-user profile/summary block. Only
+-- tool-free replies that repeat no profile value are ever stored here.
+-- Expired rows are deleted in batches by the writers (llm_cache.PURGE_SQL,
+-- every LLM_CACHE_PURGE_SECONDS).
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+  cache_key   CHAR(64) PRIMARY KEY,          -- sha256 of model + normalized prompt
+  content     TEXT NOT NULL,
+  latency_ms  INTEGER NOT NULL DEFAULT 0,    -- cost of the original call, for "saved" metrics
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at  TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires ON llm_response_cache (expires_at);
@@ -0,0 +1,208 @@
+"""
+Versioned schema runner plus COPY-based bulk seeding.
+
+Migrations are the SQL files in MIGRATIONS, applied in that order. Each file
+runs as one script (one round trip, one transaction) and is recorded in
+onboarding.schema_migrations with its sha256; files whose checksum is
+unchanged are skipped, changed ones are re-applied (every file here is
+written to be re-runnable). An advisory lock keeps two deploys from
+migrating at once.
+
+Seeding generates seats and equipment kits in Python and streams them in
+with COPY, so millions of rows load in seconds instead of minutes:
+
+    python migrate.py                      # apply pending/changed migrations
+    python migrate.py --status
+    python migrate.py --seed-seats 2000000 --seed-kits 1000000
+"""
+import os
+import re
+import time
+import random
+import hashlib
+import argparse
+from typing import List, Tuple
+
+import psycopg
+from dotenv import load_dotenv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Order matters: later files alter tables created by earlier ones.
+# add_seats_equipments.sql is sample data, not a migration (use --seed-*).
+MIGRATIONS = [
+    "schema.sql",
+    "seat_claims.sql",
+    "equipment_claims.sql",
+    "inventory_notify.sql",
+    "holds.sql",
+    "llm_cache.sql",
+    "availability.sql",
+    "office_email.sql",
+    "transcripts.sql",
+    "outbox.sql",
+]
+
+LOCK_KEY = 727_001  # pg_advisory_lock key for this runner
+
+LEDGER_SQL = """
+    CREATE SCHEMA IF NOT EXISTS onboarding;
+    CREATE TABLE IF NOT EXISTS onboarding.schema_migrations (
+        filename    TEXT PRIMARY KEY,
+        checksum    CHAR(64) NOT NULL,
+        applied_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        duration_ms INTEGER NOT NULL
+    );
+"""
+
+RECORD_SQL = """
+    INSERT INTO onboarding.schema_migrations (filename, checksum, duration_ms)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (filename) DO UPDATE
+    SET checksum = EXCLUDED.checksum, applied_at = NOW(), duration_ms = EXCLUDED.duration_ms;
+"""
+
+SEAT_TYPES = (("cubicle", 0.7), ("cabin", 0.3))
+LAPTOP_OS = ("linux", "windows", "macos")
+KIT_PREFIXES = (("headphone", "HP"), ("mic", "MC"), ("webcam", "WC"), ("phone", "PH"))
+COPY_CHUNK = 100_000  # rows formatted per write
+
+
+def plain_dsn(url: str) -> str:
+    """Accept SQLAlchemy-style URLs (postgresql+asyncpg://) from .env too."""
+    return re.sub(r"^postgresql\+\w+://", "postgresql://", url)
+
+
+def checksum(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def plan(conn) -> List[Tuple[str, str, str]]:
+    """(filename, checksum, state) for every migration; state is new/changed/applied."""
+    applied = dict(conn.execute("SELECT filename, checksum FROM onboarding.schema_migrations").fetchall())
+    out = []
+    for name in MIGRATIONS:
+        digest = checksum(os.path.join(HERE, name))
+        state = "applied" if applied.get(name) == digest else ("changed" if name in applied else "new")
+        out.append((name, digest, state))
+    return out
+
+
+def migrate(conn, dry_run: bool = False) -> List[Tuple[str, str, float]]:
+    conn.execute(LEDGER_SQL)
+    conn.execute("SELECT pg_advisory_lock(%s)", (LOCK_KEY,))
+    done = []
+    try:
+        for name, digest, state in plan(conn):
+            if state == "applied":
+                continue
+            if dry_run:
+                done.append((name, state, 0.0))
+                continue
+            with open(os.path.join(HERE, name), encoding="utf-8") as f:
+                sql = f.read()
+            t0 = time.perf_counter()
+            with conn.transaction():
+                # no parameters -> simple query protocol: the whole file in one round trip
+                conn.execute(sql)
+                # scripts may SET search_path; don't let it leak into the next file
+                conn.execute("RESET search_path")
+                ms = int((time.perf_counter() - t0) * 1000)
+                conn.execute(RECORD_SQL, (name, digest, ms))
+            done.append((name, state, ms))
+            print(f"applied {name} ({state}, {ms} ms)")
+    finally:
+        conn.execute("SELECT pg_advisory_unlock(%s)", (LOCK_KEY,))
+    return done
+
+
+# ---------------- seeding ----------------
+
+def _seat_lines(n: int, rng: random.Random):
+    cubicle_share = SEAT_TYPES[0][1]
+    for start in range(0, n, COPY_CHUNK):
+        k = min(COPY_CHUNK, n - start)
+        yield "".join("cubicle\n" if rng.random() < cubicle_share else "cabin\n" for _ in range(k))
+
+
+def _kit_lines(n: int, tag: str, rng: random.Random):
+    # One kit = a laptop plus each accessory, so the fleet matches what
+    # claim_equipment_kit asks for. \N is COPY's NULL.
+    for start in range(0, n, COPY_CHUNK):
+        parts = []
+        for i in range(start, min(start + COPY_CHUNK, n)):
+            parts.append(f"laptop\t{LAPTOP_OS[rng.randrange(3)]}\tLT-{tag}-{i:08d}\n")
+            for etype, prefix in KIT_PREFIXES:
+                parts.append(f"{etype}\t\\N\t{prefix}-{tag}-{i:08d}\n")
+        yield "".join(parts)
+
+
+def _copy(conn, sql: str, chunks) -> None:
+    with conn.cursor().copy(sql) as copy:
+        for block in chunks:
+            copy.write(block)
+
+
+def seed(conn, seats: int = 0, kits: int = 0, seed_value: int = 0) -> dict:
+    """
+    COPY `seats` free seats and `kits` free equipment kits in one transaction.
+    User triggers are disabled for the load (one NOTIFY per row would flood
+    every listener), so the availability summary is recounted afterwards and
+    running agents should be restarted to re-warm their FreeInventoryCache.
+    """
+    rng = random.Random(seed_value)
+    tag = format(int(time.time()), "x")  # keeps serial numbers unique across runs
+    t0 = time.perf_counter()
+    with conn.transaction():
+        if seats:
+            conn.execute("ALTER TABLE onboarding.seating_space DISABLE TRIGGER USER")
+            _copy(conn, "COPY onboarding.seating_space (seat_type) FROM STDIN", _seat_lines(seats, rng))
+            conn.execute("ALTER TABLE onboarding.seating_space ENABLE TRIGGER USER")
+        if kits:
+            conn.execute("ALTER TABLE onboarding.equipments DISABLE TRIGGER USER")
+            _copy(conn, "COPY onboarding.equipments (equipment_type, os, serial_number) FROM STDIN",
+                  _kit_lines(kits, tag, rng))
+            conn.execute("ALTER TABLE onboarding.equipments ENABLE TRIGGER USER")
+        conn.execute("SELECT onboarding.refresh_inventory_availability()")
+    load_s = time.perf_counter() - t0
+    # fresh planner stats so the partial free-inventory indexes get picked
+    conn.execute("ANALYZE onboarding.seating_space")
+    conn.execute("ANALYZE onboarding.equipments")
+    rows = seats + kits * (1 + len(KIT_PREFIXES))
+    return {"seats": seats, "equipment_rows": kits * (1 + len(KIT_PREFIXES)),
+            "seconds": round(load_s, 2), "rows_per_sec": int(rows / load_s) if load_s else 0}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Apply schema migrations and/or bulk-seed inventory.")
+    ap.add_argument("--status", action="store_true", help="show migration state and exit")
+    ap.add_argument("--dry-run", action="store_true", help="list what would be applied")
+    ap.add_argument("--seed-seats", type=int, default=0, help="free seats to COPY in")
+    ap.add_argument("--seed-kits", type=int, default=0, help="free kits (laptop + 4 accessories) to COPY in")
+    ap.add_argument("--random-seed", type=int, default=0)
+    args = ap.parse_args()
+
+    load_dotenv()
+    db_url = os.getenv("DATABASE_URL")
+    if not db_url:
+        raise SystemExit("DATABASE_URL not set (put it in .env or env).")
+
+    with psycopg.connect(plain_dsn(db_url), autocommit=True) as conn:
+        if args.status:
+            conn.execute(LEDGER_SQL)
+            for name, digest, state in plan(conn):
+                print(f"{state:8s} {name}  {digest[:12]}")
+            return
+        done = migrate(conn, dry_run=args.dry_run)
+        if not done:
+            print("schema up to date")
+        elif args.dry_run:
+            for name, state, _ in done:
+                print(f"would apply {name} ({state})")
+        if (args.seed_seats or args.seed_kits) and not args.dry_run:
+            print("seeded:", seed(conn, args.seed_seats, args.seed_kits, args.random_seed))
+
+
+if __name__ == "__main__":
+    main()
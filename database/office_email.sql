@@ -0,0 +1,31 @@
+SET search_path TO onboarding, public;
+
+-- Office addresses: first.last@domain, then first.last2, first.last3, ...
+-- employees.email stays the hire's personal address; office_email is the one
+-- we generate (office_email.py). (office_local_base, office_suffix) is the
+-- address split into its parts; local bases never end in a digit, so two
+-- different pairs can't spell the same address.
+ALTER TABLE employees ADD COLUMN IF NOT EXISTS office_email      VARCHAR(255);
+ALTER TABLE employees ADD COLUMN IF NOT EXISTS office_local_base VARCHAR(64);
+ALTER TABLE employees ADD COLUMN IF NOT EXISTS office_suffix     INTEGER;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_office_email
+  ON employees (office_email) WHERE office_email IS NOT NULL;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_employees_office_local_part
+  ON employees (office_local_base, office_suffix) WHERE office_local_base IS NOT NULL;
+
+-- One row per local base in use, holding the highest suffix handed out.
+-- Taking the next suffix is a single upsert on this row: its row lock queues
+-- concurrent hires with the same name (and only them) until the first one
+-- commits, so nobody has to guess, collide on the unique index and retry.
+CREATE TABLE IF NOT EXISTS office_local_parts (
+  local_base  VARCHAR(64) PRIMARY KEY,
+  last_suffix INTEGER NOT NULL
+);
+
+-- Backfill / repair from addresses already assigned (never moves a counter back).
+INSERT INTO office_local_parts AS p (local_base, last_suffix)
+SELECT office_local_base, max(office_suffix) FROM employees
+WHERE office_local_base IS NOT NULL
+GROUP BY office_local_base
+ON CONFLICT (local_base) DO UPDATE SET last_suffix = GREATEST(p.last_suffix, EXCLUDED.last_suffix);
@@ -0,0 +1,26 @@
+SET search_path TO onboarding, public;
+
+-- Transactional outbox (outbox.py): downstream provisioning events written in
+-- the same transaction that confirms an onboarding, delivered later by
+-- background workers. A row is 'pending' until delivered ('done') or out of
+-- attempts ('dead', kept for inspection / manual requeue).
+CREATE TABLE IF NOT EXISTS outbox (
+  event_id        BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  idempotency_key TEXT NOT NULL UNIQUE,              -- '<topic>:<employee_ID>', sent with every attempt
+  topic           VARCHAR(64) NOT NULL,              -- account.create, badge.request, ...
+  aggregate_id    BIGINT NOT NULL,                   -- employee_ID
+  payload         JSONB NOT NULL,
+  status          VARCHAR(16) NOT NULL DEFAULT 'pending',
+  attempts        INTEGER NOT NULL DEFAULT 0,
+  available_at    TIMESTAMPTZ NOT NULL DEFAULT NOW(), -- next attempt; pushed out by the lease and by backoff
+  last_error      TEXT,
+  created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  processed_at    TIMESTAMPTZ
+);
+
+-- Claim index: only undelivered rows, oldest due first.
+CREATE INDEX IF NOT EXISTS idx_outbox_due
+  ON outbox (available_at) WHERE status = 'pending';
+-- Purge of delivered rows.
+CREATE INDEX IF NOT EXISTS idx_outbox_processed
+  ON outbox (processed_at) WHERE status = 'done';
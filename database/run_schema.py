@@ -40,5 +40,19 @@ if __name__ == "__main__":
 
 #--------------------------------------------------
 #CMD
+# python migrate.py                       # versioned: applies the files below in order, skips unchanged ones
+# python migrate.py --seed-seats 2000000 --seed-kits 1000000
+#
+# one-off runs of a single file:
 # python run_schema.py schema.sql
 # python run_schema.py add_seats_equipments.sql
+# python run_schema.py seat_claims.sql
+# python run_schema.py equipment_claims.sql
+# python run_schema.py inventory_notify.sql
+# python run_schema.py holds.sql
+# python run_schema.py llm_cache.sql
+# python run_schema.py availability.sql
+# python run_schema.py office_email.sql
+# python run_schema.py transcripts.sql
+# python run_schema.py outbox.sql
+# python bulk_onboard.py hires.csv --errors failures.jsonl
@@ -1,8 +1,8 @@
-CREATE SCHEMA onboarding;
+CREATE SCHEMA IF NOT EXISTS onboarding;
 SET search_path TO onboarding, public;
 
 -- EMPLOYEES
-CREATE TABLE employees (
+CREATE TABLE IF NOT EXISTS employees (
   employee_ID BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
   name        VARCHAR(100) NOT NULL,
   email       VARCHAR(255) NOT NULL UNIQUE,
@@ -11,7 +11,7 @@ CREATE TABLE employees (
 );
 
 -- SEATING_SPACE
-CREATE TABLE seating_space (
+CREATE TABLE IF NOT EXISTS seating_space (
   seat_ID     BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
   employee_ID BIGINT NULL,
   seat_type   VARCHAR(50) NOT NULL,
@@ -21,10 +21,10 @@ CREATE TABLE seating_space (
     REFERENCES employees(employee_ID)
     ON DELETE SET NULL
 );
-CREATE INDEX idx_seating_space_employee ON seating_space(employee_ID);
+CREATE INDEX IF NOT EXISTS idx_seating_space_employee ON seating_space(employee_ID);
 
 -- EQUIPMENTS
-CREATE TABLE equipments (
+CREATE TABLE IF NOT EXISTS equipments (
   equipment_ID  BIGINT GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
   employee_ID   BIGINT NULL,
   equipment_type VARCHAR(50) NOT NULL,
@@ -36,4 +36,4 @@ CREATE TABLE equipments (
     REFERENCES employees(employee_ID)
     ON DELETE SET NULL
 );
-CREATE INDEX idx_equipments_employee ON equipments(employee_ID);
+CREATE INDEX IF NOT EXISTS idx_equipments_employee ON equipments(employee_ID);
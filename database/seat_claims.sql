@@ -0,0 +1,19 @@
+SET search_path TO onboarding, public;
+
+-- Claim-style seat allocation: a seat is reserved by an onboarding session
+-- (thread_id) before the employees row exists, then bound via employee_ID.
+ALTER TABLE seating_space ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(128);
+ALTER TABLE seating_space ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMPTZ;
+
+-- Partial index over free seats only: claims never touch taken rows and the
+-- index shrinks as the building fills up.
+CREATE INDEX IF NOT EXISTS idx_seating_space_free
+  ON seating_space (seat_type, seat_ID)
+  WHERE employee_ID IS NULL AND claimed_by IS NULL;
+CREATE INDEX IF NOT EXISTS idx_seating_space_free_any
+  ON seating_space (seat_ID)
+  WHERE employee_ID IS NULL AND claimed_by IS NULL;
+
+CREATE INDEX IF NOT EXISTS idx_seating_space_claimed_by
+  ON seating_space (claimed_by)
+  WHERE claimed_by IS NOT NULL;
@@ -0,0 +1,35 @@
+SET search_path TO onboarding, public;
+
+-- Searchable projection of onboarding conversations (transcript_search.py).
+-- The checkpoint tables stay the source of truth; these rows are appended as
+-- turns finish (or by the backfill) and survive checkpoint retention.
+
+-- One row per thread: the slot-filled profile and how far messages are projected.
+CREATE TABLE IF NOT EXISTS transcript_threads (
+  thread_id      TEXT PRIMARY KEY,
+  profile        JSONB NOT NULL DEFAULT '{}'::jsonb,
+  projected_upto INTEGER NOT NULL DEFAULT 0,   -- transcript messages [0:projected_upto] are in transcript_messages
+  started_at     TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  updated_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+-- profile @> '{"os_requirement": "macos"}' filters
+CREATE INDEX IF NOT EXISTS idx_transcript_threads_profile
+  ON transcript_threads USING GIN (profile jsonb_path_ops);
+
+-- One row per user/assistant message (tool traffic is not projected).
+CREATE TABLE IF NOT EXISTS transcript_messages (
+  thread_id  TEXT NOT NULL REFERENCES transcript_threads (thread_id) ON DELETE CASCADE,
+  seq        INTEGER NOT NULL,                 -- position among the thread's transcript messages
+  role       VARCHAR(16) NOT NULL,             -- 'user' | 'assistant'
+  content    TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  tsv        TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED,
+  PRIMARY KEY (thread_id, seq)
+);
+-- Rare terms: bitmap scan on the GIN index, then a top-N sort of the few matches.
+CREATE INDEX IF NOT EXISTS idx_transcript_messages_tsv
+  ON transcript_messages USING GIN (tsv);
+-- Common terms / no query: walk newest-first on this index and stop after a page.
+-- It is also the keyset the search pages on.
+CREATE INDEX IF NOT EXISTS idx_transcript_messages_recent
+  ON transcript_messages (created_at, thread_id, seq);
@@ -1,7 +1,9 @@
 # employee.py
 from __future__ import annotations
-from dataclasses import dataclass, field, asdict
-from typing import Optional, Literal, Dict, Any
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from operator import attrgetter
+from typing import Optional, Literal, Dict, Any, List, Sequence, Mapping, Tuple
 import re
 
 SeatType = Literal["cabin", "cubicle"]
@@ -10,7 +12,55 @@ EquipType = Literal["laptop", "headphone", "mic", "webcam", "phone"]
 
 EMAIL_RE = re.compile(r"^[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}$")
 
-@dataclass
+SEAT_TYPES = frozenset(("cabin", "cubicle"))
+OS_TYPES = frozenset(("linux", "windows", "macos"))
+EQUIP_TYPES = frozenset(("laptop", "headphone", "mic", "webcam", "phone"))
+OS_SYNONYMS = {"mac": "macos", "osx": "macos", "mac os": "macos"}
+
+# old chat-flow names still accepted by update_field
+FIELD_ALIASES = {"seat_pref": "seat_type", "primary_equipment": "equipment_type"}
+
+
+# ---------- normalizers (shared by the per-record and the batch path) ----------
+
+@lru_cache(maxsize=4096)
+def email_ok(email: str) -> bool:
+    return bool(EMAIL_RE.match(email))
+
+def normalize_email(value: str) -> str:
+    return value.strip().lower()
+
+def normalize_seat_type(value: str) -> str:
+    v = value.strip().lower()
+    if v not in SEAT_TYPES:
+        raise ValueError("seat_type must be 'cabin' or 'cubicle'")
+    return v
+
+def normalize_os(value: str) -> str:
+    v = value.strip().lower()
+    v = OS_SYNONYMS.get(v, v)
+    if v not in OS_TYPES:
+        raise ValueError("os_requirement must be linux/windows/macos")
+    return v
+
+def normalize_equipment_type(value: str) -> str:
+    v = value.strip().lower()
+    if v not in EQUIP_TYPES:
+        raise ValueError("equipment_type invalid")
+    return v
+
+# VARCHAR widths of the employees columns (database/schema.sql)
+MAX_LENGTHS = {"name": 100, "email": 255, "phone": 32}
+
+NORMALIZERS = {
+    "email": normalize_email,
+    "seat_type": normalize_seat_type,
+    "os_requirement": normalize_os,
+    "equipment_type": normalize_equipment_type,
+}
+
+
+@dataclass(slots=True)
 class Employee:
     # ---- DB columns (employees table) ----
     name: Optional[str] = None
@@ -37,13 +87,13 @@ class Employee:
 
     def is_ready_for_insert(self) -> bool:
         """Minimal readiness for creating the employees row."""
-        return all(getattr(self, f) for f in self.REQUIRED_FIELDS) and self._email_ok()
+        return all(_get_required(self)) and self._email_ok()
 
     def _email_ok(self) -> bool:
-        return bool(self.email and EMAIL_RE.match(self.email))
+        return bool(self.email and email_ok(self.email))
 
     def missing_fields(self) -> list[str]:
-        return [f for f in self.REQUIRED_FIELDS if not getattr(self, f)]
+        return [f for f, v in zip(self.REQUIRED_FIELDS, _get_required(self)) if not v]
 
     def to_db_params(self) -> Dict[str, Any]:
         """Map to the DB insert parameter dict for employees table."""
@@ -61,35 +111,115 @@ class Employee:
             f"Name: {self.name or '—'}",
             f"Email: {self.email or '—'}",
             f"Phone: {self.phone or '—'}",
-            f"Address: {self.address or '—'}",
-            f"Seat preference: {self.seat_pref or '—'}",
+            f"Seat: {self.seat_type or '—'}" + (f" (#{self.seat_id})" if self.seat_id else ""),
             f"OS requirement: {self.os_requirement or '—'}",
-            f"Primary equipment: {self.primary_equipment or '—'}",
+            f"Equipment: {self.equipment_type or '—'}" + (f" ({self.equipment_serial})" if self.equipment_serial else ""),
         ]
         return "\n".join(lines)
 
     def update_field(self, key: str, value: Any) -> None:
         """Safe setter used by the chat flow."""
-        if not hasattr(self, key):
+        key = FIELD_ALIASES.get(key, key)
+        if key not in _FIELD_NAMES:
             raise AttributeError(f"Unknown field: {key}")
         # light normalizations
-        if key == "email" and isinstance(value, str):
-            value = value.strip().lower()
-        if key == "seat_pref" and isinstance(value, str):
-            value = value.strip().lower()
-            if value not in ("cabin", "cubicle"):
-                raise ValueError("seat_pref must be 'cabin' or 'cubicle'")
-        if key == "os_requirement" and isinstance(value, str):
-            v = value.strip().lower().replace("mac", "macos")
-            if v not in ("linux", "windows", "macos"):
-                raise ValueError("os_requirement must be linux/windows/macos")
-            value = v
-        if key == "primary_equipment" and isinstance(value, str):
-            v = value.strip().lower()
-            if v not in ("laptop","headphone","mic","webcam","phone"):
-                raise ValueError("primary_equipment invalid")
-            value = v
+        norm = NORMALIZERS.get(key)
+        if norm is not None and isinstance(value, str):
+            value = norm(value)
         setattr(self, key, value)
 
+    def apply_equipment_kit(self, kit: Dict[str, Any]) -> None:
+        """Fill equipment fields from an assign_equipment_kit result (laptop is primary)."""
+        for item in kit.get("items", []):
+            if item["equipment_type"] == "laptop":
+                self.equipment_type = "laptop"
+                self.equipment_id = item["equipment_id"]
+                self.equipment_serial = item["serial_number"]
+                if item.get("os"):
+                    self.os_requirement = item["os"]
+
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        # shallow: every field is a scalar, so asdict()'s deep copy buys nothing
+        return {f: getattr(self, f) for f in _FIELD_NAMES}
+
+
+_FIELD_NAMES: Tuple[str, ...] = tuple(f.name for f in fields(Employee))
+_get_required = attrgetter(*Employee.REQUIRED_FIELDS)
+
+
+# ---------- bulk columnar validation ----------
+
+@dataclass(slots=True)
+class BatchResult:
+    columns: Dict[str, List[Any]]          # normalized values of the valid rows
+    row_index: List[int]                   # input position of each valid row
+    errors: List[Tuple[int, str, str]]     # (input position, field, message)
+
+    def __len__(self) -> int:
+        return len(self.row_index)
+
+    def rows(self) -> List[Tuple[Any, ...]]:
+        """Valid rows as tuples in column order (e.g. for COPY write_row)."""
+        return list(zip(*self.columns.values()))
+
+
+def validate_columns(columns: Mapping[str, Sequence[Any]],
+                     required: Sequence[str] = ("name", "email")) -> BatchResult:
+    """
+    Validate many candidate records at once, one column at a time.
+    Strings are stripped, email/seat_type/os_requirement/equipment_type are
+    normalized, blanks become None, values longer than their column
+    (MAX_LENGTHS) are rejected, and every problem is collected as
+    (row, field, message) instead of raising. A row with any error is dropped.
+    """
+    names = list(columns)
+    n = len(columns[names[0]]) if names else 0
+    bad: Dict[int, None] = {}
+    errors: List[Tuple[int, str, str]] = []
+    out: Dict[str, List[Any]] = {}
+
+    for name in names:
+        if name not in _FIELD_NAMES:
+            raise AttributeError(f"Unknown field: {name}")
+        col = [(v.strip() or None) if isinstance(v, str) else v for v in columns[name]]
+        norm = NORMALIZERS.get(name)
+        if norm is not None:
+            for i, v in enumerate(col):
+                if isinstance(v, str):
+                    try:
+                        col[i] = norm(v)
+                    except ValueError as e:
+                        errors.append((i, name, str(e)))
+                        bad[i] = None
+        if name in required:
+            for i in [i for i, v in enumerate(col) if v is None]:
+                errors.append((i, name, f"{name} is required"))
+                bad[i] = None
+        limit = MAX_LENGTHS.get(name)
+        if limit is not None:
+            for i, v in enumerate(col):
+                if v is not None and len(str(v)) > limit:
+                    errors.append((i, name, f"{name} is longer than {limit} characters"))
+                    bad[i] = None
+        if name == "email":
+            for i, v in enumerate(col):
+                if v is not None and not email_ok(v):
+                    errors.append((i, name, f"invalid email: {v}"))
+                    bad[i] = None
+        out[name] = col
+
+    for name in required:
+        if name not in columns:
+            raise ValueError(f"required column missing: {name}")
+
+    keep = [i for i in range(n) if i not in bad]
+    if len(keep) != n:
+        out = {name: [col[i] for i in keep] for name, col in out.items()}
+    errors.sort()
+    return BatchResult(out, keep, errors)
+
+
+def validate_records(records: Sequence[Mapping[str, Any]], field_names: Sequence[str],
+                     required: Sequence[str] = ("name", "email")) -> BatchResult:
+    """Row-oriented convenience: transpose records into columns and validate."""
+    return validate_columns({f: [r.get(f) for r in records] for f in field_names}, required)
@@ -0,0 +1,154 @@
+# hold_sweeper.py
+"""
+Releases seat/equipment holds whose TTL ran out (see inventory.HOLD_TTL_SECONDS),
+so seats proposed to threads that never confirmed go back to the free pool.
+
+Each batch is an index range scan on idx_*_hold_expiry (database/holds.sql)
+with FOR UPDATE SKIP LOCKED, so it never waits on a thread that is confirming
+or refreshing its hold at the same moment. Released rows fire the inventory
+NOTIFY trigger, which puts them back into every process's FreeInventoryCache.
+Each run also folds pending availability deltas (database/availability.sql)
+into the summary table so capacity reads stay a few rows.
+
+The sweeper is required wherever holds are taken: without it expired holds
+are never released and the availability deltas are only folded in the small
+batches that inventory.availability() takes on read. The agents and the MCP
+server therefore start it by default, every HOLD_SWEEP_SECONDS (30); set
+HOLD_SWEEP_SECONDS=0 only when it runs elsewhere, e.g. as this module:
+
+    python hold_sweeper.py --loop 30
+"""
+from __future__ import annotations
+import os
+import time
+import argparse
+import threading
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict
+
+import psycopg
+from dotenv import load_dotenv
+
+SWEEP_SEATS_SQL = """
+    WITH expired AS (
+        SELECT seat_id
+        FROM onboarding.seating_space
+        WHERE hold_expires_at < NOW() AND employee_ID IS NULL
+        ORDER BY hold_expires_at
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE onboarding.seating_space ss
+    SET claimed_by = NULL, claimed_at = NULL, hold_expires_at = NULL
+    FROM expired
+    WHERE ss.seat_id = expired.seat_id;
+"""
+
+SWEEP_EQUIPMENT_SQL = """
+    WITH expired AS (
+        SELECT equipment_id
+        FROM onboarding.equipments
+        WHERE hold_expires_at < NOW() AND employee_ID IS NULL
+        ORDER BY hold_expires_at
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE onboarding.equipments eq
+    SET claimed_by = NULL, claimed_at = NULL, hold_expires_at = NULL
+    FROM expired
+    WHERE eq.equipment_id = expired.equipment_id;
+"""
+
+
+FOLD_AVAILABILITY_SQL = "SELECT onboarding.fold_inventory_availability();"
+
+
+@dataclass
+class SweepStats:
+    seats_released: int = 0
+    equipment_released: int = 0
+    availability_deltas_folded: int = 0
+    runs: int = 0
+    last_run_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+@dataclass
+class HoldSweeper:
+    dsn: str
+    batch: int = 500
+    pause: float = 0.05   # seconds between batches
+    stats: SweepStats = field(default_factory=SweepStats)
+
+    def sweep(self, conn, sql: str) -> int:
+        """Release expired holds in batches; returns rows released."""
+        total = 0
+        while True:
+            with conn.transaction():
+                n = conn.execute(sql, {"batch": self.batch}).rowcount
+            total += n
+            if n < self.batch:
+                return total
+            time.sleep(self.pause)
+
+    def run_once(self) -> SweepStats:
+        t0 = time.perf_counter()
+        with psycopg.connect(self.dsn, autocommit=True) as conn:
+            self.stats.seats_released += self.sweep(conn, SWEEP_SEATS_SQL)
+            self.stats.equipment_released += self.sweep(conn, SWEEP_EQUIPMENT_SQL)
+            self.stats.availability_deltas_folded += conn.execute(FOLD_AVAILABILITY_SQL).fetchone()[0]
+        self.stats.runs += 1
+        self.stats.last_run_seconds = round(time.perf_counter() - t0, 3)
+        return self.stats
+
+    def start_background(self, interval: float = 30.0) -> threading.Thread:
+        """Run forever on a daemon thread, every `interval` seconds."""
+        def loop():
+            while True:
+                try:
+                    self.run_once()
+                except Exception as e:
+                    print("hold sweeper error:", e)
+                time.sleep(interval)
+        t = threading.Thread(target=loop, name="hold-sweeper", daemon=True)
+        t.start()
+        return t
+
+
+DEFAULT_INTERVAL = "30"
+
+
+def _interval() -> float:
+    return float(os.getenv("HOLD_SWEEP_SECONDS") or DEFAULT_INTERVAL)
+
+
+def from_env(dsn: Optional[str] = None) -> Optional[HoldSweeper]:
+    """Build a sweeper unless HOLD_SWEEP_SECONDS (the interval, default 30) is 0."""
+    if _interval() <= 0:
+        return None
+    return HoldSweeper(dsn=dsn or os.getenv("DATABASE_URL"),
+                       batch=int(os.getenv("HOLD_SWEEP_BATCH", "500")))
+
+
+def start_from_env(dsn: Optional[str] = None) -> Optional[HoldSweeper]:
+    sweeper = from_env(dsn)
+    if sweeper:
+        sweeper.start_background(_interval())
+    return sweeper
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Release expired seat/equipment holds.")
+    ap.add_argument("--batch", type=int, default=500, help="rows per transaction")
+    ap.add_argument("--loop", type=float, default=None, help="repeat every N seconds")
+    args = ap.parse_args()
+
+    load_dotenv()
+    job = HoldSweeper(dsn=os.getenv("DATABASE_URL"), batch=args.batch)
+    while True:
+        print(job.run_once().as_dict())
+        if not args.loop:
+            break
+        time.sleep(args.loop)
@@ -0,0 +1,689 @@
+# inventory.py
+from __future__ import annotations
+import os
+import json
+import time
+from functools import partial
+from typing import Optional, Dict, Any, Callable, List
+
+from office_email import assign_office_email, aassign_office_email
+
+# Claims are provisional holds: a seat/kit claimed while the plan is being
+# negotiated is reserved for HOLD_TTL_SECONDS, refreshed every time the same
+# thread claims again, bound to the employee by confirm_onboarding(), and
+# handed back by the expiry sweep (hold_sweeper.py) if the thread goes quiet.
+HOLD_TTL_SECONDS = int(os.getenv("HOLD_TTL_SECONDS", "900"))
+HOLD_UNTIL = "NOW() + make_interval(secs => %(ttl)s::int)"
+
+# Legacy allocation: look at a random free seat without reserving it.
+# Sorts every free seat and never marks the seat taken, so two sessions
+# can be offered the same seat_id. Kept for read-only "what's free" checks.
+PEEK_SEAT_SQL = """
+    SELECT ss.seat_id, ss.seat_type
+    FROM onboarding.seating_space ss
+    WHERE ss.employee_id IS NULL
+      AND ss.claimed_by IS NULL
+      AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
+    ORDER BY random()
+    LIMIT 1;
+"""
+
+# Claim allocation: pick and reserve a free seat in one round trip.
+# SKIP LOCKED lets concurrent onboarders walk past rows another transaction
+# is claiming instead of queueing behind it; the partial index
+# idx_seating_space_free keeps the candidate lookup off the taken rows.
+# The seat_type filter is spliced in rather than written as
+# "(%s IS NULL OR seat_type = %s)" so prepared (generic) plans still use the index.
+_CLAIM_SEAT_TMPL = """
+    WITH candidate AS (
+        SELECT ss.seat_id
+        FROM onboarding.seating_space ss
+        WHERE ss.employee_id IS NULL
+          AND ss.claimed_by IS NULL
+          {seat_filter}
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE onboarding.seating_space ss
+    SET claimed_by = %(claimed_by)s, claimed_at = NOW(), hold_expires_at = {hold_until}
+    FROM candidate
+    WHERE ss.seat_id = candidate.seat_id
+    RETURNING ss.seat_id, ss.seat_type, ss.hold_expires_at;
+"""
+CLAIM_ANY_SEAT_SQL = _CLAIM_SEAT_TMPL.format(seat_filter="", hold_until=HOLD_UNTIL)
+CLAIM_SEAT_SQL = _CLAIM_SEAT_TMPL.format(seat_filter="AND ss.seat_type = %(seat_type)s::text",
+                                        hold_until=HOLD_UNTIL)
+
+# Confirm a claim on candidates proposed by the in-process free-inventory
+# cache (inventory_cache.py): a primary-key probe instead of an index scan.
+CLAIM_SEAT_BY_ID_SQL = f"""
+    WITH candidate AS (
+        SELECT ss.seat_id
+        FROM onboarding.seating_space ss
+        WHERE ss.seat_id = ANY(%(seat_ids)s)
+          AND ss.employee_id IS NULL
+          AND ss.claimed_by IS NULL
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE onboarding.seating_space ss
+    SET claimed_by = %(claimed_by)s, claimed_at = NOW(), hold_expires_at = {HOLD_UNTIL}
+    FROM candidate
+    WHERE ss.seat_id = candidate.seat_id
+    RETURNING ss.seat_id, ss.seat_type, ss.hold_expires_at;
+"""
+
+# Re-running a claim for the same owner returns the seat it already holds
+# instead of taking a second one (the LLM may call the tool twice), and
+# pushes its hold expiry out again. If the held seat is of another type the
+# owner changed their mind: it is released (RELEASE_SEAT_SQL) and a new seat
+# claimed in the same transaction, which is rolled back if none is free.
+EXISTING_CLAIM_SQL = f"""
+    UPDATE onboarding.seating_space ss
+    SET hold_expires_at = {HOLD_UNTIL}
+    WHERE ss.claimed_by = %(claimed_by)s
+      AND ss.employee_id IS NULL
+      AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
+    RETURNING ss.seat_id, ss.seat_type, ss.hold_expires_at;
+"""
+
+RELEASE_SEAT_SQL = """
+    UPDATE onboarding.seating_space
+    SET claimed_by = NULL, claimed_at = NULL, hold_expires_at = NULL
+    WHERE claimed_by = %(claimed_by)s AND employee_id IS NULL;
+"""
+
+NO_SEAT = {"ok": False, "message": "No available seating space."}
+# Holds are keyed by the session that took them, so confirm/cancel can only
+# touch their own; a claim without one is refused rather than shared.
+NO_SESSION = {"ok": False, "message": "A session id is required to hold a seat or equipment kit."}
+
+
+def _seat_result(row: Optional[Dict[str, Any]]) -> dict:
+    if not row:
+        return dict(NO_SEAT)
+    out = {"ok": True, "seat_id": row["seat_id"], "seat_type": row["seat_type"]}
+    if row.get("hold_expires_at"):
+        out["held_until"] = row["hold_expires_at"].isoformat()
+    return out
+
+
+def _after_commit(updates: List[Callable[[], None]], commit: bool, after_commit: Optional[list]) -> None:
+    """
+    Apply free-inventory cache updates once the claim is durable: now if we
+    committed, otherwise hand them to the caller that owns the transaction.
+    """
+    if commit:
+        for update in updates:
+            update()
+    elif after_commit is not None:
+        after_commit.extend(updates)
+
+
+def peek_seat(conn, seat_type: Optional[str] = None) -> dict:
+    """Return a random free seat without reserving it."""
+    with conn.cursor() as cur:
+        cur.execute(PEEK_SEAT_SQL, {"seat_type": seat_type})
+        return _seat_result(cur.fetchone())
+
+
+def claim_seat(conn, seat_type: Optional[str] = None, claimed_by: Optional[str] = None, cache=None,
+               commit: bool = True, ttl: int = HOLD_TTL_SECONDS, after_commit: Optional[list] = None) -> dict:
+    """
+    Pick and hold a free seat for `claimed_by` (for `ttl` seconds) in a single statement.
+    With a FreeInventoryCache, candidates come from memory and the DB only
+    confirms the claim; it falls back to the index scan if they are all stale.
+    Commits on success so the reservation is visible to other sessions, unless
+    commit=False (the caller owns the transaction, see tool_executor.py); the
+    cache updates are then appended to `after_commit` for the caller to run
+    after its commit.
+    """
+    if not claimed_by:
+        return dict(NO_SESSION)
+    owner = claimed_by
+    params = {"seat_type": seat_type, "claimed_by": owner, "ttl": ttl}
+    row = None
+    discards: list = []
+    with conn.cursor() as cur:
+        cur.execute(EXISTING_CLAIM_SQL, params)
+        row = cur.fetchone()
+        if row:
+            if commit:
+                conn.commit()
+            return _seat_result(row)
+        cur.execute(RELEASE_SEAT_SQL, params)
+        candidates = cache.seat_candidates(seat_type) if cache is not None else []
+        if candidates:
+            cur.execute(CLAIM_SEAT_BY_ID_SQL, {"seat_ids": candidates, "claimed_by": owner, "ttl": ttl})
+            row = cur.fetchone()
+            # Whatever we probed is either ours now or already gone.
+            probed = candidates if not row else [row["seat_id"]]
+            discards = [partial(cache.discard_seat, seat_id) for seat_id in probed]
+        if not row:
+            cur.execute(CLAIM_SEAT_SQL if seat_type else CLAIM_ANY_SEAT_SQL, params)
+            row = cur.fetchone()
+    if commit:
+        if row:
+            conn.commit()
+        else:
+            conn.rollback()  # keeps the seat held before a failed type change
+    _after_commit(discards, commit, after_commit)
+    return _seat_result(row)
+
+
+def release_seat(conn, claimed_by: str) -> int:
+    """Drop any unconfirmed seat claim held by `claimed_by`. Returns rows released."""
+    with conn.cursor() as cur:
+        cur.execute(RELEASE_SEAT_SQL, {"claimed_by": claimed_by})
+        n = cur.rowcount
+    conn.commit()
+    return n
+
+
+# ---------------- Equipment kits ----------------
+
+KIT_ACCESSORIES = ("headphone", "mic", "webcam", "phone")
+OS_ALIASES = {"mac": "macos", "macos": "macos", "osx": "macos", "mac os": "macos",
+              "linux": "linux", "ubuntu": "linux", "windows": "windows", "win": "windows"}
+
+# Claim one free item per kit line in a single statement: the LATERAL probe
+# hits idx_equipments_free once per line and SKIP LOCKED keeps concurrent
+# kits from queueing on the same laptop.
+CLAIM_KIT_SQL = f"""
+    WITH wanted AS (
+        SELECT t.equipment_type, t.os_key
+        FROM unnest(%(types)s::text[], %(os_keys)s::text[]) AS t(equipment_type, os_key)
+    ),
+    picked AS (
+        SELECT e.equipment_id
+        FROM wanted w
+        CROSS JOIN LATERAL (
+            SELECT eq.equipment_id
+            FROM onboarding.equipments eq
+            WHERE eq.equipment_type = w.equipment_type
+              AND COALESCE(eq.os, '') = w.os_key
+              AND eq.employee_id IS NULL
+              AND eq.claimed_by IS NULL
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        ) e
+    )
+    UPDATE onboarding.equipments eq
+    SET claimed_by = %(claimed_by)s, claimed_at = NOW(), hold_expires_at = {HOLD_UNTIL}
+    FROM picked
+    WHERE eq.equipment_id = picked.equipment_id
+    RETURNING eq.equipment_id, eq.equipment_type, eq.os, eq.serial_number, eq.hold_expires_at;
+"""
+
+# Same claim on candidates proposed by the free-inventory cache: each kit line
+# probes only its own candidate ids (primary-key lookups). Lines whose
+# candidates are all stale come back empty and go through CLAIM_KIT_SQL.
+CLAIM_KIT_BY_ID_SQL = f"""
+    WITH cand AS (
+        SELECT c.equipment_id, c.line
+        FROM unnest(%(ids)s::bigint[], %(lines)s::int[]) AS c(equipment_id, line)
+    ),
+    picked AS (
+        SELECT e.equipment_id
+        FROM (SELECT DISTINCT line FROM cand) w
+        CROSS JOIN LATERAL (
+            SELECT eq.equipment_id
+            FROM onboarding.equipments eq
+            WHERE eq.equipment_id IN (SELECT cand.equipment_id FROM cand WHERE cand.line = w.line)
+              AND eq.employee_id IS NULL
+              AND eq.claimed_by IS NULL
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        ) e
+    )
+    UPDATE onboarding.equipments eq
+    SET claimed_by = %(claimed_by)s, claimed_at = NOW(), hold_expires_at = {HOLD_UNTIL}
+    FROM picked
+    WHERE eq.equipment_id = picked.equipment_id
+    RETURNING eq.equipment_id, eq.equipment_type, eq.os, eq.serial_number, eq.hold_expires_at;
+"""
+
+# Re-claiming refreshes the kit already held, but only if its laptop runs the
+# requested OS; otherwise the old kit is released and a new one claimed in the
+# same transaction (a failed claim rolls back to the old kit).
+EXISTING_KIT_SQL = f"""
+    UPDATE onboarding.equipments eq
+    SET hold_expires_at = {HOLD_UNTIL}
+    WHERE eq.claimed_by = %(claimed_by)s AND eq.employee_id IS NULL
+      AND EXISTS (
+        SELECT 1 FROM onboarding.equipments l
+        WHERE l.claimed_by = %(claimed_by)s AND l.employee_id IS NULL
+          AND l.equipment_type = 'laptop' AND l.os = %(os_key)s
+      )
+    RETURNING eq.equipment_id, eq.equipment_type, eq.os, eq.serial_number, eq.hold_expires_at;
+"""
+
+RELEASE_KIT_SQL = """
+    UPDATE onboarding.equipments
+    SET claimed_by = NULL, claimed_at = NULL, hold_expires_at = NULL
+    WHERE claimed_by = %(claimed_by)s AND employee_id IS NULL;
+"""
+
+
+def normalize_os(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return OS_ALIASES.get(value.strip().lower())
+
+
+def _kit_candidates(cache, types: list, os_key: str) -> Dict[str, List[int]]:
+    """Cached free ids per kit line (the laptop line is keyed by OS)."""
+    if cache is None:
+        return {}
+    return {t: cache.equipment_candidates(t, os_key if t == "laptop" else None) for t in types}
+
+
+def _kit_by_id_params(candidates: Dict[str, List[int]], types: list) -> Dict[str, list]:
+    ids, lines = [], []
+    for line, t in enumerate(types):
+        ids += candidates.get(t, [])
+        lines += [line] * len(candidates.get(t, []))
+    return {"ids": ids, "lines": lines}
+
+
+def _kit_discards(cache, candidates: Dict[str, List[int]], rows: list) -> List[Callable[[], None]]:
+    # claimed rows, plus every candidate of a line the cache proposed only stale rows for
+    served = {r["equipment_type"] for r in rows if r["equipment_id"] in candidates.get(r["equipment_type"], ())}
+    stale = [i for t, ids in candidates.items() if t not in served for i in ids]
+    return [partial(cache.discard_equipment, i) for i in [r["equipment_id"] for r in rows] + stale]
+
+
+def _kit_result(rows: list) -> dict:
+    items = [
+        {"equipment_id": r["equipment_id"], "equipment_type": r["equipment_type"],
+         "os": r["os"], "serial_number": r["serial_number"]}
+        for r in rows
+    ]
+    out = {"ok": True, "items": items}
+    expiry = [r["hold_expires_at"] for r in rows if r.get("hold_expires_at")]
+    if expiry:
+        out["held_until"] = min(expiry).isoformat()
+    return out
+
+
+def claim_equipment_kit(conn, os_requirement: Optional[str], claimed_by: Optional[str] = None,
+                        accessories=KIT_ACCESSORIES, cache=None, commit: bool = True,
+                        ttl: int = HOLD_TTL_SECONDS, after_commit: Optional[list] = None) -> dict:
+    """
+    Hold a laptop for `os_requirement` plus one of each accessory (for `ttl`
+    seconds) in one transaction. All-or-nothing: if any line is out of
+    stock the whole kit is rolled back and the missing types are reported.
+    With a FreeInventoryCache, each line first tries its cached candidates
+    by primary key; lines left empty fall back to the index probe.
+    With commit=False the caller owns the transaction, must roll back on
+    a failed result and runs the cache updates collected in `after_commit`
+    once it has committed.
+    """
+    os_key = normalize_os(os_requirement)
+    if not os_key:
+        return {"ok": False, "message": "os_requirement must be linux/windows/macos."}
+
+    types = ["laptop", *accessories]
+    if not claimed_by:
+        return dict(NO_SESSION)
+    owner = claimed_by
+    with conn.cursor() as cur:
+        cur.execute(EXISTING_KIT_SQL, {"claimed_by": owner, "os_key": os_key, "ttl": ttl})
+        held = cur.fetchall()
+        if held:
+            if commit:
+                conn.commit()
+            return _kit_result(held)
+        cur.execute(RELEASE_KIT_SQL, {"claimed_by": owner})
+        rows = []
+        candidates = _kit_candidates(cache, types, os_key)
+        by_id = _kit_by_id_params(candidates, types)
+        if by_id["ids"]:
+            cur.execute(CLAIM_KIT_BY_ID_SQL, {**by_id, "claimed_by": owner, "ttl": ttl})
+            rows = cur.fetchall()
+        got = {r["equipment_type"] for r in rows}
+        rest = [t for t in types if t not in got]
+        if rest:
+            cur.execute(CLAIM_KIT_SQL, {
+                "types": rest,
+                "os_keys": [os_key if t == "laptop" else "" for t in rest],
+                "claimed_by": owner,
+                "ttl": ttl,
+            })
+            rows += cur.fetchall()
+
+    got = {r["equipment_type"] for r in rows}
+    missing = [t for t in types if t not in got]
+    if missing:
+        if commit:
+            conn.rollback()
+        return {"ok": False, "message": f"Out of stock: {', '.join(missing)}.", "missing": missing}
+    if commit:
+        conn.commit()
+    if cache is not None:
+        _after_commit(_kit_discards(cache, candidates, rows), commit, after_commit)
+    return _kit_result(rows)
+
+
+
+# ---------------- Confirmation: holds -> assignments ----------------
+
+# An existing email is never overwritten: a chat session may only reuse the
+# employee it confirmed itself (confirming twice, a resumed thread), i.e. one
+# that a seat held by the same claimed_by is already bound to.
+INSERT_EMPLOYEE_SQL = """
+    INSERT INTO onboarding.employees (name, email, phone)
+    VALUES (%(name)s, %(email)s, %(phone)s)
+    ON CONFLICT (email) DO NOTHING
+    RETURNING employee_ID AS employee_id, office_email;
+"""
+
+OWN_EMPLOYEE_SQL = """
+    SELECT e.employee_ID AS employee_id, e.office_email
+    FROM onboarding.employees e
+    WHERE e.email = %(email)s
+      AND EXISTS (
+          SELECT 1 FROM onboarding.seating_space ss
+          WHERE ss.employee_ID = e.employee_ID AND ss.claimed_by = %(claimed_by)s
+      );
+"""
+
+EMAIL_TAKEN = {"ok": False, "message": "That email is already onboarded; please check the email address."}
+
+# A hold is only lost once the sweep has released it: an expired-but-unswept
+# hold still carries claimed_by and is bound here. The row lock taken by the
+# UPDATE and the sweep's SKIP LOCKED keep the two from both winning.
+# Only the most recent seat and the most recent item of each kit line are
+# bound; anything else the owner still holds is handed back by
+# RELEASE_SEAT_SQL / RELEASE_KIT_SQL in the same transaction.
+CONFIRM_SEAT_SQL = """
+    UPDATE onboarding.seating_space ss
+    SET employee_ID = %(employee_id)s, hold_expires_at = NULL
+    WHERE ss.seat_id = (
+        SELECT h.seat_id FROM onboarding.seating_space h
+        WHERE h.claimed_by = %(claimed_by)s AND h.employee_ID IS NULL
+        ORDER BY h.claimed_at DESC, h.seat_id DESC
+        LIMIT 1
+    )
+      AND ss.claimed_by = %(claimed_by)s AND ss.employee_ID IS NULL
+    RETURNING ss.seat_id, ss.seat_type;
+"""
+
+CONFIRM_KIT_SQL = """
+    UPDATE onboarding.equipments eq
+    SET employee_ID = %(employee_id)s, hold_expires_at = NULL
+    WHERE eq.equipment_id IN (
+        SELECT DISTINCT ON (h.equipment_type) h.equipment_id FROM onboarding.equipments h
+        WHERE h.claimed_by = %(claimed_by)s AND h.employee_ID IS NULL
+        ORDER BY h.equipment_type, h.claimed_at DESC, h.equipment_id DESC
+    )
+      AND eq.claimed_by = %(claimed_by)s AND eq.employee_ID IS NULL
+    RETURNING eq.equipment_id, eq.equipment_type, eq.os, eq.serial_number;
+"""
+
+HOLD_LOST = {"ok": False, "message": "The reservation expired; please assign the seat and kit again."}
+
+# Downstream provisioning for a confirmed hire, written to the outbox in the
+# confirming transaction (delivered by outbox.py workers). One event per topic;
+# the idempotency key makes confirming twice a no-op.
+ONBOARDED_TOPICS = ("account.create", "badge.request", "equipment.ticket", "email.welcome")
+
+ENQUEUE_ONBOARDED_SQL = """
+    INSERT INTO onboarding.outbox (idempotency_key, topic, aggregate_id, payload)
+    SELECT t.topic || ':' || %(employee_id)s::bigint, t.topic, %(employee_id)s, %(payload)s::jsonb
+    FROM unnest(%(topics)s::text[]) AS t(topic)
+    ON CONFLICT (idempotency_key) DO NOTHING;
+"""
+
+
+def _onboarded_event(out: dict, name: str, email: str, phone: Optional[str]) -> dict:
+    payload = {"employee_id": out["employee_id"], "name": name, "email": email, "phone": phone,
+               "office_email": out["office_email"], "seat_id": out["seat_id"],
+               "seat_type": out["seat_type"], "items": out["items"]}
+    return {"employee_id": out["employee_id"], "payload": json.dumps(payload), "topics": list(ONBOARDED_TOPICS)}
+
+
+def _confirm_result(employee_id: int, office_email: Optional[str], seat: Optional[Dict[str, Any]], kit: list) -> dict:
+    if not seat or not kit:
+        missing = [name for name, got in (("seat", seat), ("equipment kit", kit)) if not got]
+        return {**HOLD_LOST, "missing": missing}
+    return {"ok": True, "employee_id": employee_id, "office_email": office_email, "seat_id": seat["seat_id"],
+            "seat_type": seat["seat_type"], "items": _kit_result(kit)["items"]}
+
+
+def confirm_onboarding(conn, name: str, email: str, phone: Optional[str], claimed_by: str,
+                       commit: bool = True) -> dict:
+    """
+    Create the employees row (or reuse the one this thread confirmed before;
+    an email onboarded by anyone else is refused), give it an office address, bind
+    the seat and kit most recently held by `claimed_by` to it (releasing any
+    older holds) and queue the provisioning events, all in one transaction.
+    If either hold is gone the transaction is rolled back and the caller
+    should claim again. With commit=False the caller owns the transaction
+    (see tool_executor.py) and rolls back on a failed result.
+    """
+    with conn.cursor() as cur:
+        cur.execute(INSERT_EMPLOYEE_SQL, {"name": name, "email": email, "phone": phone})
+        emp = cur.fetchone()
+        if emp is None:
+            cur.execute(OWN_EMPLOYEE_SQL, {"email": email, "claimed_by": claimed_by})
+            emp = cur.fetchone()
+        if emp is None:
+            if commit:
+                conn.rollback()
+            return dict(EMAIL_TAKEN)
+        employee_id = emp["employee_id"]
+        office_email = emp["office_email"] or assign_office_email(cur, employee_id, name)
+        params = {"employee_id": employee_id, "claimed_by": claimed_by}
+        cur.execute(CONFIRM_SEAT_SQL, params)
+        seat = cur.fetchone()
+        cur.execute(CONFIRM_KIT_SQL, params)
+        kit = cur.fetchall()
+    out = _confirm_result(employee_id, office_email, seat, kit)
+    if out["ok"]:
+        with conn.cursor() as cur:
+            cur.execute(RELEASE_SEAT_SQL, params)
+            cur.execute(RELEASE_KIT_SQL, params)
+            cur.execute(ENQUEUE_ONBOARDED_SQL, _onboarded_event(out, name, email, phone))
+        if commit:
+            conn.commit()
+    elif commit:
+        conn.rollback()
+    return out
+
+
+def release_holds(conn, claimed_by: str, commit: bool = True) -> dict:
+    """Hand back every unconfirmed seat/equipment hold of `claimed_by` (cancelled onboarding)."""
+    with conn.cursor() as cur:
+        cur.execute(RELEASE_SEAT_SQL, {"claimed_by": claimed_by})
+        seats = cur.rowcount
+        cur.execute(RELEASE_KIT_SQL, {"claimed_by": claimed_by})
+        items = cur.rowcount
+    if commit:
+        conn.commit()
+    return {"ok": True, "seats": seats, "equipment": items}
+
+
+# ---------------- Availability (database/availability.sql) ----------------
+
+# Reads fold a bounded batch of pending deltas first (at most once every
+# AVAILABILITY_FOLD_SECONDS per process), so the delta table can't grow
+# without bound between hold_sweeper.py runs.
+AVAILABILITY_FOLD_ROWS = int(os.getenv("AVAILABILITY_FOLD_ROWS", "1000"))
+AVAILABILITY_FOLD_SECONDS = float(os.getenv("AVAILABILITY_FOLD_SECONDS", "5"))
+FOLD_AVAILABILITY_SQL = "SELECT onboarding.fold_inventory_availability(%(max_rows)s);"
+_last_fold = {"at": 0.0}
+
+
+def _fold_due() -> bool:
+    now = time.monotonic()
+    if now - _last_fold["at"] < AVAILABILITY_FOLD_SECONDS:
+        return False
+    _last_fold["at"] = now
+    return True
+
+# Summary rows plus not-yet-folded deltas: a handful of rows whatever the
+# inventory size.
+AVAILABILITY_SQL = """
+    SELECT kind, item_type, os, sum(n)::bigint AS free
+    FROM (
+        SELECT kind, item_type, os, free_count AS n FROM onboarding.inventory_availability
+        UNION ALL
+        SELECT kind, item_type, os, delta FROM onboarding.inventory_availability_delta
+    ) x
+    GROUP BY kind, item_type, os;
+"""
+
+
+def _availability_result(rows: list) -> dict:
+    seats: Dict[str, int] = {}
+    laptops: Dict[str, int] = {}
+    accessories: Dict[str, int] = {}
+    for r in rows:
+        if r["kind"] == "seat":
+            seats[r["item_type"]] = r["free"]
+        elif r["item_type"] == "laptop":
+            laptops[r["os"]] = r["free"]
+        else:
+            accessories[r["item_type"]] = accessories.get(r["item_type"], 0) + r["free"]
+    # a kit needs one laptop plus one of every accessory
+    spare = min((accessories.get(a, 0) for a in KIT_ACCESSORIES), default=0)
+    kits = {os_key: min(n, spare) for os_key, n in laptops.items()}
+    return {"ok": True, "seats": seats, "laptops": laptops, "accessories": accessories, "kits": kits}
+
+
+def availability(conn) -> dict:
+    """Free seats by type, laptops by OS, accessories, and complete kits by OS."""
+    with conn.cursor() as cur:
+        if _fold_due():
+            cur.execute(FOLD_AVAILABILITY_SQL, {"max_rows": AVAILABILITY_FOLD_ROWS})
+            conn.commit()
+        cur.execute(AVAILABILITY_SQL)
+        return _availability_result(cur.fetchall())
+
+# ---------------- Async variants (MCP server) ----------------
+# Same statements and semantics as above, for psycopg AsyncConnection.
+
+async def aclaim_seat(conn, seat_type: Optional[str] = None, claimed_by: Optional[str] = None, cache=None,
+                      ttl: int = HOLD_TTL_SECONDS) -> dict:
+    if not claimed_by:
+        return dict(NO_SESSION)
+    owner = claimed_by
+    params = {"seat_type": seat_type, "claimed_by": owner, "ttl": ttl}
+    row = None
+    discards: list = []
+    async with conn.cursor() as cur:
+        await cur.execute(EXISTING_CLAIM_SQL, params)
+        row = await cur.fetchone()
+        if row:
+            await conn.commit()
+            return _seat_result(row)
+        await cur.execute(RELEASE_SEAT_SQL, params)
+        candidates = cache.seat_candidates(seat_type) if cache is not None else []
+        if candidates:
+            await cur.execute(CLAIM_SEAT_BY_ID_SQL, {"seat_ids": candidates, "claimed_by": owner, "ttl": ttl})
+            row = await cur.fetchone()
+            probed = candidates if not row else [row["seat_id"]]
+            discards = [partial(cache.discard_seat, seat_id) for seat_id in probed]
+        if not row:
+            await cur.execute(CLAIM_SEAT_SQL if seat_type else CLAIM_ANY_SEAT_SQL, params)
+            row = await cur.fetchone()
+    if row:
+        await conn.commit()
+    else:
+        await conn.rollback()
+    _after_commit(discards, True, None)
+    return _seat_result(row)
+
+
+async def aclaim_equipment_kit(conn, os_requirement: Optional[str], claimed_by: Optional[str] = None,
+                               accessories=KIT_ACCESSORIES, cache=None, ttl: int = HOLD_TTL_SECONDS) -> dict:
+    os_key = normalize_os(os_requirement)
+    if not os_key:
+        return {"ok": False, "message": "os_requirement must be linux/windows/macos."}
+
+    types = ["laptop", *accessories]
+    if not claimed_by:
+        return dict(NO_SESSION)
+    owner = claimed_by
+    async with conn.cursor() as cur:
+        await cur.execute(EXISTING_KIT_SQL, {"claimed_by": owner, "os_key": os_key, "ttl": ttl})
+        held = await cur.fetchall()
+        if held:
+            await conn.commit()
+            return _kit_result(held)
+        await cur.execute(RELEASE_KIT_SQL, {"claimed_by": owner})
+        rows = []
+        candidates = _kit_candidates(cache, types, os_key)
+        by_id = _kit_by_id_params(candidates, types)
+        if by_id["ids"]:
+            await cur.execute(CLAIM_KIT_BY_ID_SQL, {**by_id, "claimed_by": owner, "ttl": ttl})
+            rows = await cur.fetchall()
+        got = {r["equipment_type"] for r in rows}
+        rest = [t for t in types if t not in got]
+        if rest:
+            await cur.execute(CLAIM_KIT_SQL, {
+                "types": rest,
+                "os_keys": [os_key if t == "laptop" else "" for t in rest],
+                "claimed_by": owner,
+                "ttl": ttl,
+            })
+            rows += await cur.fetchall()
+
+    got = {r["equipment_type"] for r in rows}
+    missing = [t for t in types if t not in got]
+    if missing:
+        await conn.rollback()
+        return {"ok": False, "message": f"Out of stock: {', '.join(missing)}.", "missing": missing}
+    await conn.commit()
+    if cache is not None:
+        _after_commit(_kit_discards(cache, candidates, rows), True, None)
+    return _kit_result(rows)
+
+
+async def aconfirm_onboarding(conn, name: str, email: str, phone: Optional[str], claimed_by: str) -> dict:
+    async with conn.cursor() as cur:
+        await cur.execute(INSERT_EMPLOYEE_SQL, {"name": name, "email": email, "phone": phone})
+        emp = await cur.fetchone()
+        if emp is None:
+            await cur.execute(OWN_EMPLOYEE_SQL, {"email": email, "claimed_by": claimed_by})
+            emp = await cur.fetchone()
+        if emp is None:
+            await conn.rollback()
+            return dict(EMAIL_TAKEN)
+        employee_id = emp["employee_id"]
+        office_email = emp["office_email"] or await aassign_office_email(cur, employee_id, name)
+        params = {"employee_id": employee_id, "claimed_by": claimed_by}
+        await cur.execute(CONFIRM_SEAT_SQL, params)
+        seat = await cur.fetchone()
+        await cur.execute(CONFIRM_KIT_SQL, params)
+        kit = await cur.fetchall()
+    out = _confirm_result(employee_id, office_email, seat, kit)
+    if out["ok"]:
+        async with conn.cursor() as cur:
+            await cur.execute(RELEASE_SEAT_SQL, params)
+            await cur.execute(RELEASE_KIT_SQL, params)
+            await cur.execute(ENQUEUE_ONBOARDED_SQL, _onboarded_event(out, name, email, phone))
+        await conn.commit()
+    else:
+        await conn.rollback()
+    return out
+
+
+async def arelease_holds(conn, claimed_by: str) -> dict:
+    async with conn.cursor() as cur:
+        await cur.execute(RELEASE_SEAT_SQL, {"claimed_by": claimed_by})
+        seats = cur.rowcount
+        await cur.execute(RELEASE_KIT_SQL, {"claimed_by": claimed_by})
+        items = cur.rowcount
+    await conn.commit()
+    return {"ok": True, "seats": seats, "equipment": items}
+
+
+async def aavailability(conn) -> dict:
+    async with conn.cursor() as cur:
+        if _fold_due():
+            await cur.execute(FOLD_AVAILABILITY_SQL, {"max_rows": AVAILABILITY_FOLD_ROWS})
+            await conn.commit()
+        await cur.execute(AVAILABILITY_SQL)
+        return _availability_result(await cur.fetchall())
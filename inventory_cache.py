@@ -0,0 +1,200 @@
+# inventory_cache.py
+from __future__ import annotations
+import json
+import bisect
+import random
+import threading
+from collections import defaultdict
+from typing import Optional, Dict, Tuple, List
+
+import psycopg
+
+CHANNEL = "onboarding_inventory"
+
+WARM_SEATS_SQL = """
+    SELECT seat_id, seat_type
+    FROM onboarding.seating_space
+    WHERE employee_id IS NULL AND claimed_by IS NULL;
+"""
+
+WARM_EQUIPMENT_SQL = """
+    SELECT equipment_id, equipment_type, os
+    FROM onboarding.equipments
+    WHERE employee_id IS NULL AND claimed_by IS NULL;
+"""
+
+EquipKey = Tuple[str, Optional[str]]  # (equipment_type, os)
+
+
+class IdPool:
+    """
+    Set of row ids with O(1) add/discard and O(k) random sampling: a list
+    plus a position map, removing by swapping the last id into the hole.
+    """
+    __slots__ = ("ids", "pos")
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.pos: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, row_id: int) -> None:
+        if row_id not in self.pos:
+            self.pos[row_id] = len(self.ids)
+            self.ids.append(row_id)
+
+    def discard(self, row_id: int) -> None:
+        i = self.pos.pop(row_id, None)
+        if i is None:
+            return
+        last = self.ids.pop()
+        if i < len(self.ids):
+            self.ids[i] = last
+            self.pos[last] = i
+
+    def sample(self, k: int) -> List[int]:
+        if len(self.ids) <= k:
+            return list(self.ids)
+        return [self.ids[i] for i in random.sample(range(len(self.ids)), k)]
+
+
+def sample_pools(pools: List[IdPool], k: int) -> List[int]:
+    """k distinct ids drawn uniformly from the union of disjoint pools, without copying them."""
+    pools = [p for p in pools if len(p)]
+    ends, total = [], 0
+    for p in pools:
+        total += len(p)
+        ends.append(total)
+    if total <= k:
+        return [i for p in pools for i in p.ids]
+    out = []
+    for n in random.sample(range(total), k):
+        j = bisect.bisect_right(ends, n)
+        out.append(pools[j].ids[n - (ends[j] - len(pools[j]))])
+    return out
+
+
+class FreeInventoryCache:
+    """
+    Per-process index of free seats (by seat_type) and free equipment
+    (by equipment_type/os), kept in sync via LISTEN/NOTIFY from the
+    triggers in database/inventory_notify.sql.
+
+    The index only proposes candidates: the database still confirms every
+    claim, so a stale entry costs one extra round trip, never a double
+    assignment.
+    """
+
+    def __init__(self, dsn: Optional[str]):
+        self.dsn = dsn
+        self._lock = threading.Lock()
+        self._seats: Dict[str, IdPool] = defaultdict(IdPool)
+        self._seat_kind: Dict[int, str] = {}
+        self._equipment: Dict[EquipKey, IdPool] = defaultdict(IdPool)
+        self._equipment_kind: Dict[int, EquipKey] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.ready = threading.Event()
+
+    # ---------- lifecycle ----------
+    def start(self) -> "FreeInventoryCache":
+        """Warm the index and start the listener thread (idempotent)."""
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="inventory-cache", daemon=True)
+        self._thread.start()
+        self.ready.wait(timeout=10)
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _listen_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    # LISTEN before warming so no change slips between the two.
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    self.warm(conn)
+                    self.ready.set()
+                    while not self._stop.is_set():
+                        for n in conn.notifies(timeout=1.0):
+                            self.apply(json.loads(n.payload))
+            except Exception as e:
+                # Drop to "not ready" so callers go straight to the DB,
+                # then reconnect and re-warm from scratch.
+                self.ready.clear()
+                print("inventory cache listener error:", e)
+                self._stop.wait(2.0)
+
+    def warm(self, conn) -> None:
+        """(Re)load the full free inventory."""
+        seats: Dict[str, IdPool] = defaultdict(IdPool)
+        seat_kind: Dict[int, str] = {}
+        equipment: Dict[EquipKey, IdPool] = defaultdict(IdPool)
+        equipment_kind: Dict[int, EquipKey] = {}
+        with conn.cursor() as cur:
+            cur.execute(WARM_SEATS_SQL)
+            for seat_id, seat_type in cur:
+                seats[seat_type].add(seat_id)
+                seat_kind[seat_id] = seat_type
+            cur.execute(WARM_EQUIPMENT_SQL)
+            for equipment_id, equipment_type, os_ in cur:
+                key = (equipment_type, os_)
+                equipment[key].add(equipment_id)
+                equipment_kind[equipment_id] = key
+        with self._lock:
+            self._seats, self._seat_kind = seats, seat_kind
+            self._equipment, self._equipment_kind = equipment, equipment_kind
+
+    # ---------- sync ----------
+    def apply(self, event: dict) -> None:
+        """Apply one trigger payload to the index."""
+        row_id = event.get("id")
+        if row_id is None:
+            return
+        with self._lock:
+            if event.get("table") == "seating_space":
+                old = self._seat_kind.pop(row_id, None)
+                if old is not None:
+                    self._seats[old].discard(row_id)
+                if event.get("free"):
+                    self._seats[event["seat_type"]].add(row_id)
+                    self._seat_kind[row_id] = event["seat_type"]
+            elif event.get("table") == "equipments":
+                old = self._equipment_kind.pop(row_id, None)
+                if old is not None:
+                    self._equipment[old].discard(row_id)
+                if event.get("free"):
+                    key = (event["equipment_type"], event.get("os"))
+                    self._equipment[key].add(row_id)
+                    self._equipment_kind[row_id] = key
+
+    def discard_seat(self, seat_id: int) -> None:
+        """Forget a seat we just claimed (or found stale) ahead of its NOTIFY."""
+        self.apply({"table": "seating_space", "id": seat_id, "free": False})
+
+    def discard_equipment(self, equipment_id: int) -> None:
+        self.apply({"table": "equipments", "id": equipment_id, "free": False})
+
+    # ---------- lookups ----------
+    def seat_candidates(self, seat_type: Optional[str] = None, k: int = 8) -> List[int]:
+        """Up to k free seat ids (random, to spread concurrent sessions); empty if the index isn't live."""
+        if not self.ready.is_set():
+            return []
+        with self._lock:
+            if seat_type:
+                pool = self._seats.get(seat_type)
+                return pool.sample(k) if pool is not None else []
+            return sample_pools(list(self._seats.values()), k)
+
+    def equipment_candidates(self, equipment_type: str, os_: Optional[str] = None, k: int = 8) -> List[int]:
+        """Up to k free ids of one kit line (os_ only for laptops); empty if the index isn't live."""
+        if not self.ready.is_set():
+            return []
+        with self._lock:
+            pool = self._equipment.get((equipment_type, os_))
+            return pool.sample(k) if pool is not None else []
@@ -0,0 +1,215 @@
+# llm_cache.py
+from __future__ import annotations
+import os
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Dict, Any
+
+from langchain_core.messages import BaseMessage, AIMessage, SystemMessage, ToolMessage
+
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))  # seconds
+PURGE_EVERY = float(os.getenv("LLM_CACHE_PURGE_SECONDS", "300"))  # shared-tier expiry sweep, per process
+PURGE_BATCH = 1000
+
+# Anything that looks personal keeps the turn out of the cache entirely.
+PII_PATTERNS = [
+    re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}"),   # email
+    re.compile(r"(?:\+?\d[\s().-]?){7,}"),                          # phone-ish digit run
+    re.compile(r"\b(?:my name is|i am|i'm|this is)\s+[A-Z][a-z]+", re.I),
+]
+
+_WS = re.compile(r"\s+")
+# Values in the per-user block ("Known user profile: {'name': 'Jane Doe', ...}").
+_PROFILE_VALUE = re.compile(r":\s*(?:'([^'\n]+)'|\"([^\"\n]+)\"|(\d{3,}))")
+
+GET_SQL = """
+    SELECT content, latency_ms FROM onboarding.llm_response_cache
+    WHERE cache_key = %(key)s AND expires_at > NOW();
+"""
+PUT_SQL = """
+    INSERT INTO onboarding.llm_response_cache (cache_key, content, latency_ms, expires_at)
+    VALUES (%(key)s, %(content)s, %(latency_ms)s, NOW() + make_interval(secs => %(ttl)s))
+    ON CONFLICT (cache_key) DO UPDATE
+    SET content = EXCLUDED.content, latency_ms = EXCLUDED.latency_ms, expires_at = EXCLUDED.expires_at;
+"""
+# Bounded so a backlog never turns into one long delete; idx_llm_response_cache_expires.
+PURGE_SQL = """
+    DELETE FROM onboarding.llm_response_cache
+    WHERE cache_key IN (
+        SELECT cache_key FROM onboarding.llm_response_cache
+        WHERE expires_at < NOW()
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    );
+"""
+
+
+def normalize(text: str) -> str:
+    return _WS.sub(" ", text).strip().lower()
+
+
+class ResponseCache:
+    """
+    Exact-match cache of LLM replies keyed on the normalized prompt.
+    Tier 1 is a per-process LRU with TTL; tier 2 (optional) is the shared
+    onboarding.llm_response_cache table so worker processes share hits.
+
+    Per-user system messages (profile/summary, anything but static_prefix)
+    are part of the key, so a reply is only reused for the same question
+    asked in the same profile state; they skip the PII check, but a reply
+    that mentions a value from them is never stored.
+    """
+
+    def __init__(self, maxsize: int = LLM_CACHE_SIZE, ttl: float = LLM_CACHE_TTL, pool=None,
+                 static_prefix: Optional[BaseMessage] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.pool = pool                  # psycopg ConnectionPool for the shared tier
+        self.static_prefix = static_prefix
+        self._lru: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()  # key -> (expires, content, latency)
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = self.bypassed = 0
+        self.saved_seconds = 0.0
+        self._purged_at = time.monotonic()
+
+    # ---------- policy ----------
+    def personal(self, m: BaseMessage) -> bool:
+        """Per-user context (profile/summary): a system message other than the static prefix."""
+        return isinstance(m, SystemMessage) and m is not self.static_prefix and \
+            (self.static_prefix is None or m.content != self.static_prefix.content)
+
+    def cacheable(self, messages: List[BaseMessage]) -> bool:
+        for m in messages:
+            if isinstance(m, ToolMessage) or getattr(m, "tool_calls", None):
+                return False
+            if self.personal(m):
+                continue  # keyed as-is; see storable()
+            text = str(m.content or "")
+            if any(p.search(text) for p in PII_PATTERNS):
+                return False
+        return True
+
+    def storable(self, messages: List[BaseMessage], reply: str) -> bool:
+        """A reply may be shared unless it repeats a profile value from the per-user block."""
+        static = normalize(str(self.static_prefix.content)) if self.static_prefix is not None else ""
+        text = normalize(reply)
+        for m in messages:
+            if not self.personal(m):
+                continue
+            for groups in _PROFILE_VALUE.findall(str(m.content or "")):
+                value = normalize(next(g for g in groups if g))
+                if value not in static and value in text:
+                    return False
+        return True
+
+    def key(self, model: str, messages: List[BaseMessage]) -> str:
+        h = hashlib.sha256(model.encode())
+        for m in messages:
+            h.update(b"\x00" + m.type.encode() + b"\x01" + normalize(str(m.content or "")).encode())
+        return h.hexdigest()
+
+    def count(self, name: str, n: float = 1) -> None:
+        """Bump a stats counter (hits, misses, ...); tool-node threads share the cache."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + n)
+
+    # ---------- tiers ----------
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        now = time.monotonic()
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit and hit[0] > now:
+                self._lru.move_to_end(key)
+                return hit[1], hit[2]
+            if hit:
+                del self._lru[key]
+        if self.pool is not None:
+            try:
+                with self.pool.connection() as conn:
+                    row = conn.execute(GET_SQL, {"key": key}).fetchone()
+            except Exception:
+                row = None
+            if row:
+                content, latency_ms = row["content"], row["latency_ms"] / 1000
+                self._put_local(key, content, latency_ms)
+                self.count("shared_hits")
+                return content, latency_ms
+        return None
+
+    def _put_local(self, key: str, content: str, latency: float) -> None:
+        with self._lock:
+            self._lru[key] = (time.monotonic() + self.ttl, content, latency)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.maxsize:
+                self._lru.popitem(last=False)
+
+    def put(self, key: str, content: str, latency: float) -> None:
+        self._put_local(key, content, latency)
+        if self.pool is not None:
+            try:
+                with self.pool.connection() as conn:
+                    conn.execute(PUT_SQL, {"key": key, "content": content,
+                                           "latency_ms": int(latency * 1000), "ttl": self.ttl})
+                    if self._purge_due():
+                        conn.execute(PURGE_SQL, {"batch": PURGE_BATCH})
+            except Exception as e:
+                print("llm cache shared put failed:", e)
+
+    def _purge_due(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._purged_at < PURGE_EVERY:
+                return False
+            self._purged_at = now
+            return True
+
+    # ---------- metrics ----------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "bypassed": self.bypassed,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "latency_saved_s": round(self.saved_seconds, 3),
+                "entries": len(self._lru),
+            }
+
+
+class CachedChatModel:
+    """Drop-in wrapper for a (tool-bound) chat model's .invoke()."""
+
+    def __init__(self, model, cache: ResponseCache, model_name: str = ""):
+        self.model = model
+        self.cache = cache
+        self.model_name = model_name
+
+    def invoke(self, messages: List[BaseMessage], *args, **kwargs):
+        cache = self.cache
+        if not cache.cacheable(messages):
+            cache.count("bypassed")
+            return self.model.invoke(messages, *args, **kwargs)
+
+        key = cache.key(self.model_name, messages)
+        hit = cache.get(key)
+        if hit is not None:
+            content, latency = hit
+            cache.count("hits")
+            cache.count("saved_seconds", latency)
+            return AIMessage(content=content)
+
+        cache.count("misses")
+        t0 = time.perf_counter()
+        out = self.model.invoke(messages, *args, **kwargs)
+        latency = time.perf_counter() - t0
+        # Replies that call tools (or echo personal data) are never stored.
+        content = str(out.content or "")
+        if not getattr(out, "tool_calls", None) and cache.cacheable([out]) and cache.storable(messages, content):
+            cache.put(key, content, latency)
+        return out
@@ -1,47 +1,145 @@
 from dotenv import load_dotenv
-from fastmcp import FastMCP
-from typing import Optional, List, Tuple
+from typing import Optional
 import os
-from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
-from langchain_core.tools import tool
+import threading
+
+from inventory import claim_seat, claim_equipment_kit, confirm_onboarding, release_holds, availability
 
 load_dotenv(override=True)
 
+# Nothing connects (or imports psycopg/langchain) at import time: the pool and
+# the inventory cache are created on first use, or up front via warm_up().
+_POOL = None
+_CACHE = None
+_SWEEPER = None
+_lock = threading.Lock()
+_tools: Optional[list] = None
+
+
+def get_pool():
+    global _POOL, _SWEEPER
+    if _POOL is None:
+        with _lock:
+            if _POOL is None:
+                from psycopg.rows import dict_row
+                from metrics import TimedConnectionPool
+                import hold_sweeper
+                if _SWEEPER is None:
+                    # these tools take holds, so something has to expire them (HOLD_SWEEP_SECONDS)
+                    _SWEEPER = hold_sweeper.start_from_env()
+                _POOL = TimedConnectionPool(
+                    pool_label="llm_tools",
+                    conninfo=os.getenv("DATABASE_URL"),
+                    min_size=1,
+                    max_size=5,
+                    kwargs={"row_factory": dict_row},
+                )
+    return _POOL
+
+
+def get_cache():
+    """Free-seat/equipment index for this process, kept current by LISTEN/NOTIFY."""
+    global _CACHE
+    if _CACHE is None:
+        with _lock:
+            if _CACHE is None:
+                from inventory_cache import FreeInventoryCache
+                _CACHE = FreeInventoryCache(os.getenv("DATABASE_URL")).start()
+    return _CACHE
+
 
+def warm_up() -> None:
+    """Open the pool (waiting for min_size connections) and warm the inventory cache."""
+    get_pool().wait()
+    get_cache()
 
-POOL: ConnectionPool = ConnectionPool(
-    conninfo=os.getenv("DATABASE_URL"),
-    min_size=1,
-    max_size=5,
-    kwargs={"row_factory": dict_row},
-)
 
-@tool
-def assign_seating_space(seat_type: Optional[str] = None) -> dict:
-    """
-    Assign me a available seat to employee as if optional seating type (seat_id, seat_type) or a message if none found.
-    """
+def close() -> None:
+    global _POOL, _CACHE
+    if _CACHE is not None:
+        _CACHE.stop()
+        _CACHE = None
+    if _POOL is not None:
+        _POOL.close()
+        _POOL = None
 
+
+def _thread_id(config) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def assign_seat_for(seat_type: Optional[str] = None, thread_id: Optional[str] = None) -> dict:
     print("seating type -------------------", seat_type)
-    sql = """
-        SELECT ss.seat_id, ss.seat_type
-        FROM onboarding.seating_space ss
-        WHERE ss.employee_id IS NULL
-        AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
-        ORDER BY random()
-        LIMIT 1;
-    """
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, {"seat_type": seat_type})
-            row = cur.fetchone()
-            print("Console row: ", row)
-            if not row:
-                return {"ok": False, "message": "No available seating space."}
-            return {"ok": True, "seat_id": row["seat_id"], "seat_type": row["seat_type"]}
+    # The seat is reserved for this conversation so another session can't be offered it.
+    with get_pool().connection() as conn:
+        out = claim_seat(conn, seat_type, claimed_by=thread_id, cache=get_cache())
+        print("Console row: ", out)
+        return out
+
+
+def assign_kit_for(os_requirement: str, thread_id: Optional[str] = None) -> dict:
+    with get_pool().connection() as conn:
+        return claim_equipment_kit(conn, os_requirement, claimed_by=thread_id, cache=get_cache())
+
+
+def confirm_for(name: str, email: str, phone: Optional[str] = None, thread_id: Optional[str] = None) -> dict:
+    with get_pool().connection() as conn:
+        return confirm_onboarding(conn, name, email, phone, claimed_by=thread_id)
+
+
+def release_for(thread_id: str) -> dict:
+    with get_pool().connection() as conn:
+        return release_holds(conn, thread_id)
+
+
+def availability_now() -> dict:
+    with get_pool().connection() as conn:
+        return availability(conn)
 
 
 def get_tools()->list:
+    """LangChain tool wrappers (langchain is imported here, on first call)."""
+    global _tools
+    if _tools is not None:
+        return _tools
+
+    from langchain_core.tools import tool
+    from langchain_core.runnables import RunnableConfig
+
+    @tool
+    def check_availability() -> dict:
+        """
+        Free seats by type, laptops by OS, accessories and complete kits by OS. Check this before
+        promising a seat type or OS, and suggest what is actually available.
+        """
+        return availability_now()
+
+    @tool
+    def assign_seating_space(seat_type: Optional[str] = None, config: RunnableConfig = None) -> dict:
+        """
+        Assign me a available seat to employee as if optional seating type (seat_id, seat_type) or a message if none found.
+        """
+        return assign_seat_for(seat_type, _thread_id(config))
+
+    @tool
+    def assign_equipment_kit(os_requirement: str, config: RunnableConfig = None) -> dict:
+        """
+        Assign the full onboarding kit in one call: a laptop for os_requirement (linux/windows/macos)
+        plus headphone, mic, webcam and phone. Returns the items with their serial numbers or a message.
+        """
+        return assign_kit_for(os_requirement, _thread_id(config))
+
+    @tool
+    def confirm_assignment(name: str, email: str, phone: Optional[str] = None, config: RunnableConfig = None) -> dict:
+        """
+        After the user approves the plan: create the employee (ID + office email) and turn the held seat and kit into their assignment.
+        """
+        return confirm_for(name, email, phone, _thread_id(config))
+
+    @tool
+    def cancel_reservation(config: RunnableConfig = None) -> dict:
+        """Release the seat and equipment held for this conversation."""
+        return release_for(_thread_id(config))
 
-    return [assign_seating_space]
\ No newline at end of file
+    _tools = [check_availability, assign_seating_space, assign_equipment_kit, confirm_assignment, cancel_reservation]
+    return _tools
@@ -1,47 +1,294 @@
 from dotenv import load_dotenv
-from fastmcp import FastMCP
-from typing import Optional, List, Tuple
+from typing import Optional
 import os
-from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+import asyncio
+from datetime import datetime, timedelta, timezone
+from contextlib import asynccontextmanager
+
+from inventory import aclaim_seat, aclaim_equipment_kit, aconfirm_onboarding, arelease_holds, aavailability
+from transcript_search import asearch, PAGE_SIZE
 
 load_dotenv(override=True)
 
-mcp = FastMCP(name="Employee_Onboarding")
+# fastmcp, psycopg, the pool, the inventory cache and the background workers
+# are imported on first use (the server object, the first tool call), so
+# importing this module stays cheap; see benchmarks/bench_import_time.py.
+
+@asynccontextmanager
+async def lifespan(server):
+    import hold_sweeper
+    import outbox
+    # MCP_WARM_UP=1: open pool connections and warm the inventory cache before
+    # the first request instead of on it.
+    if os.getenv("MCP_WARM_UP") == "1":
+        await warm_up()
+    hold_sweeper.start_from_env()  # releases expired holds every HOLD_SWEEP_SECONDS (30)
+    outbox.start_from_env()        # OUTBOX_WORKERS=N delivers provisioning events
+    try:
+        yield
+    finally:
+        await close()
+
+# ---- Pool sizing / backpressure (env-tunable) ----
+POOL_MIN_SIZE = int(os.getenv("MCP_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("MCP_POOL_MAX_SIZE", "20"))
+POOL_TIMEOUT = float(os.getenv("MCP_POOL_TIMEOUT", "5"))          # seconds to wait for a connection
+POOL_MAX_WAITING = int(os.getenv("MCP_POOL_MAX_WAITING", "200"))  # queued requests before rejecting
+
+BUSY = {"ok": False, "message": "Onboarding service is busy, please retry shortly."}
+
+# Async pool so DB waits yield the FastMCP event loop instead of blocking it.
+# Created and opened lazily inside the running loop (AsyncConnectionPool can't
+# open before one exists), together with this process's free-seat/equipment
+# index, kept current by LISTEN/NOTIFY (database/inventory_notify.sql).
+POOL = None   # metrics.TimedAsyncConnectionPool
+CACHE = None  # inventory_cache.FreeInventoryCache
+# (PoolTimeout, TooManyRequests) once psycopg_pool is loaded; an except clause
+# reads it when an exception is raised, and nothing can time out before then.
+_POOL_BUSY: tuple = ()
+_pool_lock = asyncio.Lock()
+_pool_opened = False
+
+
+async def metrics_endpoint(request):
+    """Prometheus scrape endpoint (SQL, pool acquire and tool latency histograms)."""
+    from starlette.responses import PlainTextResponse
+    from metrics import REGISTRY
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+async def _ensure_open() -> None:
+    global POOL, CACHE, _POOL_BUSY, _pool_opened
+    if not _pool_opened:
+        async with _pool_lock:
+            if not _pool_opened:
+                from psycopg.rows import dict_row
+                from psycopg_pool import PoolTimeout, TooManyRequests
+                from metrics import TimedAsyncConnectionPool
+                from inventory_cache import FreeInventoryCache
+                _POOL_BUSY = (PoolTimeout, TooManyRequests)
+                if POOL is None:
+                    POOL = TimedAsyncConnectionPool(
+                        pool_label="mcp",
+                        conninfo=os.getenv("DATABASE_URL"),
+                        min_size=POOL_MIN_SIZE,
+                        max_size=POOL_MAX_SIZE,
+                        timeout=POOL_TIMEOUT,
+                        max_waiting=POOL_MAX_WAITING,
+                        kwargs={"row_factory": dict_row},
+                        open=False,
+                    )
+                    CACHE = FreeInventoryCache(os.getenv("DATABASE_URL"))
+                await POOL.open(wait=True)
+                # listener thread; start() blocks while warming, so keep it off the loop
+                await asyncio.to_thread(CACHE.start)
+                _pool_opened = True
+
+
+async def warm_up() -> None:
+    """Pre-open min_size connections and warm the inventory cache."""
+    await _ensure_open()
+
+
+async def close() -> None:
+    """
+    Close the pool and stop the inventory cache listener (server shutdown).
+    A closed pool can't be reopened, so the next _ensure_open() builds new ones.
+    """
+    global POOL, CACHE, _pool_opened
+    async with _pool_lock:
+        if CACHE is not None:
+            CACHE.stop()
+        if POOL is not None and not POOL.closed:
+            await POOL.close()
+        POOL = CACHE = None
+        _pool_opened = False
+
+
+@asynccontextmanager
+async def connection():
+    """Pooled async connection; raises PoolTimeout/TooManyRequests under overload."""
+    await _ensure_open()
+    async with POOL.connection() as conn:
+        yield conn
+
+
+async def check_availability() -> dict:
+    """
+    Free seats by type, laptops by OS, accessories and complete kits by OS, from the
+    availability summary (a few rows, whatever the inventory size).
+    """
+    try:
+        async with connection() as conn:
+            return await aavailability(conn)
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+
+# ---- Caller identity ----
+# Holds and transcript search are keyed by the MCP session the server issued to
+# the caller (the mcp-session-id of the streamable-http transport), never by an
+# id passed in tool arguments: those are guessable (CLI threads are usernames).
+NO_SESSION = {"ok": False, "message": "This tool needs an MCP session (streamable-http transport)."}
+
+# Cross-hire transcript search is an HR task: it needs a bearer token carrying
+# HR_SCOPE, so it is refused unless MCP_AUTH_JWKS_URI turns authentication on.
+HR_SCOPE = os.getenv("MCP_HR_SCOPE", "transcripts:search")
+NOT_AUTHORIZED = {"ok": False, "message": f"Not authorized: requires the {HR_SCOPE} scope."}
+
+
+def _session_id() -> Optional[str]:
+    from fastmcp.server.dependencies import get_context
+    return get_context().session_id or None
+
+
+def _hr_authorized() -> bool:
+    from fastmcp.server.dependencies import get_access_token
+    token = get_access_token()
+    return token is not None and HR_SCOPE in (token.scopes or [])
+
+
+def _since(days: Optional[float]) -> Optional[str]:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat() if days else None
 
-POOL: ConnectionPool = ConnectionPool(
-    conninfo=os.getenv("DATABASE_URL"),
-    min_size=1,
-    max_size=5,
-    kwargs={"row_factory": dict_row},
-)
 
-@mcp.tool
 async def assign_seating_space(seat_type: Optional[str] = None) -> dict:
     """
     Assign me a available seat to employee as if optional seating type (seat_id, seat_type) or a message if none found.
+    The seat is held for this MCP session until confirm_assignment or cancel_reservation.
+    """
+    session_id = _session_id()
+    if not session_id:
+        return dict(NO_SESSION)
+    try:
+        async with connection() as conn:
+            return await aclaim_seat(conn, seat_type, claimed_by=session_id, cache=CACHE)
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+async def assign_equipment_kit(os_requirement: str) -> dict:
+    """
+    Assign the full onboarding kit in one call: a laptop for os_requirement (linux/windows/macos)
+    plus headphone, mic, webcam and phone, held for this MCP session. Returns the items with
+    their serial numbers or a message.
+    """
+    session_id = _session_id()
+    if not session_id:
+        return dict(NO_SESSION)
+    try:
+        async with connection() as conn:
+            return await aclaim_equipment_kit(conn, os_requirement, claimed_by=session_id, cache=CACHE)
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+async def confirm_assignment(name: str, email: str, phone: Optional[str] = None) -> dict:
+    """
+    After the user approves the plan: create the employee (ID + office email) and turn the seat and kit held in
+    this session into their assignment. If the hold expired, assign them again.
+    """
+    session_id = _session_id()
+    if not session_id:
+        return dict(NO_SESSION)
+    try:
+        async with connection() as conn:
+            return await aconfirm_onboarding(conn, name, email, phone, claimed_by=session_id)
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+async def cancel_reservation() -> dict:
+    """Release the seat and equipment held in this session."""
+    session_id = _session_id()
+    if not session_id:
+        return dict(NO_SESSION)
+    try:
+        async with connection() as conn:
+            return await arelease_holds(conn, session_id)
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+
+async def search_transcripts(query: Optional[str] = None, days: Optional[float] = None,
+                             role: Optional[str] = None, cursor: Optional[str] = None,
+                             limit: int = PAGE_SIZE) -> dict:
     """
+    Search this conversation for something said earlier, newest first.
+    query uses web-search syntax (words, "phrases", OR, -word); days limits to the last N days;
+    role is user or assistant. Returns results (seq, role, created_at, snippet) and next_cursor.
+    """
+    session_id = _session_id()
+    if not session_id:
+        return dict(NO_SESSION)
+    try:
+        async with connection() as conn:
+            return {"ok": True, **await asearch(conn, query, since=_since(days), role=role, thread_id=session_id,
+                                                cursor=cursor, limit=limit)}
+    except ValueError as e:
+        return {"ok": False, "message": str(e)}
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+
+async def hr_search_transcripts(query: Optional[str] = None, days: Optional[float] = None,
+                                role: Optional[str] = None, thread_id: Optional[str] = None,
+                                cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    """
+    HR only (needs an authorized token): search every onboarding conversation, newest first,
+    e.g. "who asked for a macOS laptop last week". Same query/days/role/cursor/limit as
+    search_transcripts; thread_id narrows to one conversation.
+    """
+    if not _hr_authorized():
+        return dict(NOT_AUTHORIZED)
+    try:
+        async with connection() as conn:
+            return {"ok": True, **await asearch(conn, query, since=_since(days), role=role, thread_id=thread_id,
+                                                cursor=cursor, limit=limit)}
+    except ValueError as e:
+        return {"ok": False, "message": str(e)}
+    except _POOL_BUSY:
+        return dict(BUSY)
+
+
+TOOLS = (check_availability, assign_seating_space, assign_equipment_kit, confirm_assignment,
+         cancel_reservation, search_transcripts, hr_search_transcripts)
+_server = None
+
+
+def _auth():
+    """Bearer-token verification when MCP_AUTH_JWKS_URI is set (needed for hr_search_transcripts)."""
+    jwks_uri = os.getenv("MCP_AUTH_JWKS_URI")
+    if not jwks_uri:
+        return None
+    from fastmcp.server.auth.providers.jwt import JWTVerifier
+    return JWTVerifier(jwks_uri=jwks_uri, issuer=os.getenv("MCP_AUTH_ISSUER"),
+                       audience=os.getenv("MCP_AUTH_AUDIENCE"))
+
+
+def create_server():
+    """The FastMCP server with every tool and the /metrics route registered."""
+    from fastmcp import FastMCP
+    server = FastMCP(name="Employee_Onboarding", lifespan=lifespan, auth=_auth())
+    for fn in TOOLS:
+        server.tool(fn)
+    server.custom_route("/metrics", methods=["GET"])(metrics_endpoint)
+    return server
+
+
+def __getattr__(name: str):
+    # `mcp_tools.mcp` (and `fastmcp run mcp_tools.py`) builds the server on first access.
+    global _server
+    if name == "mcp":
+        if _server is None:
+            _server = create_server()
+        return _server
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-    print("seating type -------------------", seat_type)
-    sql = """
-        SELECT ss.seat_id, ss.seat_type
-        FROM onboarding.seating_space ss
-        WHERE ss.employee_id IS NULL
-        AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
-        ORDER BY random()
-        LIMIT 1;
-    """
-    with POOL.connection() as conn:
-        with conn.cursor() as cur:
-            cur.execute(sql, {"seat_type": seat_type})
-            row = cur.fetchone()
-            print("Console row: ", row)
-            if not row:
-                return {"ok": False, "message": "No available seating space."}
-            return {"ok": True, "seat_id": row["seat_id"], "seat_type": row["seat_type"]}
 
 if __name__ == "__main__":
     try:
-        mcp.run(transport="streamable-http")
+        create_server().run(transport="streamable-http")
     finally:
-        POOL.close()
+        # lifespan already closed them unless the server stopped before shutdown ran
+        if CACHE is not None:
+            CACHE.stop()
+        if POOL is not None and not POOL.closed:
+            asyncio.run(POOL.close())
@@ -0,0 +1,321 @@
+# metrics.py
+"""
+In-process latency instrumentation with Prometheus text export.
+
+Histograms (seconds):
+  onboarding_node_seconds{node}            every graph node
+  onboarding_llm_seconds{model}            every chat model call
+  onboarding_sql_seconds{statement}        every SQL statement (psycopg cursor)
+  onboarding_pool_acquire_seconds{pool}    every pool connection acquire
+  onboarding_checkpoint_seconds{op}        PostgresSaver reads/writes
+  onboarding_retention_run_seconds         checkpoint_retention sweeps
+Counters:
+  onboarding_llm_tokens_total{model,kind}  prompt / completion tokens
+  onboarding_retention_rows_total{table}   rows deleted by checkpoint_retention
+  onboarding_retention_bytes_total{table}  bytes reclaimed (pg_column_size)
+  onboarding_retention_threads_total{action}  threads trimmed / expired
+
+Recording is a dict lookup plus a bisect under a lock, cheap enough to leave
+on. Set TRACE_TURNS=1 to also print a per-turn span breakdown.
+"""
+from __future__ import annotations
+import os
+import re
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Dict, Tuple, List, Optional
+
+import psycopg
+from psycopg_pool import ConnectionPool, AsyncConnectionPool
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TRACE_TURNS = os.getenv("TRACE_TURNS") == "1"
+
+_HELP = {
+    "onboarding_node_seconds": "Graph node latency",
+    "onboarding_llm_seconds": "Chat model call latency",
+    "onboarding_sql_seconds": "SQL statement latency",
+    "onboarding_pool_acquire_seconds": "Connection pool acquire wait",
+    "onboarding_checkpoint_seconds": "Checkpointer operation latency",
+    "onboarding_llm_tokens_total": "LLM tokens by kind",
+}
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "n")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.n = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hist: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], _Histogram] = {}
+        self._counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        i = bisect.bisect_left(BUCKETS, seconds)
+        with self._lock:
+            h = self._hist.get(key)
+            if h is None:
+                h = self._hist[key] = _Histogram()
+            h.counts[i] += 1
+            h.total += seconds
+            h.n += 1
+        spans = _spans.get()
+        if spans is not None:
+            spans.append((name, dict(labels), seconds))
+
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        def fmt(labels, extra=()):
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in items) + "}"
+
+        lines: List[str] = []
+        with self._lock:
+            hist = sorted(self._hist.items())
+            counters = sorted(self._counters.items())
+        seen = set()
+        for (name, labels), h in hist:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} histogram"]
+            cum = 0
+            for bound, c in zip(BUCKETS, h.counts):
+                cum += c
+                lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cum}")
+            lines.append(f"{name}_bucket{fmt(labels, [('le', '+Inf')])} {h.n}")
+            lines.append(f"{name}_sum{fmt(labels)} {h.total:.6f}")
+            lines.append(f"{name}_count{fmt(labels)} {h.n}")
+        for (name, labels), v in counters:
+            if name not in seen:
+                seen.add(name)
+                lines += [f"# HELP {name} {_HELP.get(name, name)}", f"# TYPE {name} counter"]
+            lines.append(f"{name}{fmt(labels)} {v:g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+_spans: contextvars.ContextVar[Optional[list]] = contextvars.ContextVar("onboarding_spans", default=None)
+
+
+# ---------------- graph nodes / LLM ----------------
+
+def timed_node(name: str, fn):
+    """Wrap a LangGraph node function, keeping its (state[, config]) signature."""
+    import inspect
+    takes_config = len(inspect.signature(fn).parameters) > 1
+
+    if takes_config:
+        @wraps(fn)
+        def node(state, config):
+            t = time.perf_counter()
+            try:
+                return fn(state, config)
+            finally:
+                REGISTRY.observe("onboarding_node_seconds", time.perf_counter() - t, node=name)
+    else:
+        @wraps(fn)
+        def node(state):
+            t = time.perf_counter()
+            try:
+                return fn(state)
+            finally:
+                REGISTRY.observe("onboarding_node_seconds", time.perf_counter() - t, node=name)
+    return node
+
+
+class InstrumentedChatModel:
+    """Times .invoke() and counts tokens from the reply's usage_metadata."""
+
+    def __init__(self, model, model_name: str = ""):
+        self.model = model
+        self.model_name = model_name or "default"
+
+    def invoke(self, *args, **kwargs):
+        t = time.perf_counter()
+        out = self.model.invoke(*args, **kwargs)
+        REGISTRY.observe("onboarding_llm_seconds", time.perf_counter() - t, model=self.model_name)
+        usage = getattr(out, "usage_metadata", None) or {}
+        if usage:
+            REGISTRY.inc("onboarding_llm_tokens_total", usage.get("input_tokens", 0), model=self.model_name, kind="prompt")
+            REGISTRY.inc("onboarding_llm_tokens_total", usage.get("output_tokens", 0), model=self.model_name, kind="completion")
+        return out
+
+    def __getattr__(self, item):
+        return getattr(self.model, item)
+
+
+# ---------------- SQL / pool ----------------
+
+_VERB = re.compile(r"^\s*(?:WITH\b.*?\)\s*)?(SELECT|INSERT|UPDATE|DELETE|COPY|CREATE|ALTER|SET|LISTEN|ANALYZE)\b", re.I | re.S)
+_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE|JOIN|TABLE)\s+([A-Za-z_][\w.]*)", re.I)
+_labels: Dict[str, str] = {}
+
+
+def statement_label(query) -> str:
+    """Low-cardinality label like 'UPDATE onboarding.seating_space' (cached per query text)."""
+    q = query if isinstance(query, str) else str(getattr(query, "_obj", query))
+    label = _labels.get(q)
+    if label is None:
+        verb = _VERB.search(q)
+        table = _TABLE.search(q[verb.start(1):] if verb else q)
+        label = f"{verb.group(1).upper() if verb else 'SQL'} {table.group(1) if table else ''}".strip()
+        if len(_labels) < 1000:
+            _labels[q] = label
+    return label
+
+
+class TimedCursor(psycopg.Cursor):
+    def execute(self, query, params=None, **kwargs):
+        t = time.perf_counter()
+        try:
+            return super().execute(query, params, **kwargs)
+        finally:
+            REGISTRY.observe("onboarding_sql_seconds", time.perf_counter() - t, statement=statement_label(query))
+
+
+class TimedAsyncCursor(psycopg.AsyncCursor):
+    async def execute(self, query, params=None, **kwargs):
+        t = time.perf_counter()
+        try:
+            return await super().execute(query, params, **kwargs)
+        finally:
+            REGISTRY.observe("onboarding_sql_seconds", time.perf_counter() - t, statement=statement_label(query))
+
+
+class TimedConnectionPool(ConnectionPool):
+    """ConnectionPool that records acquire wait and times every statement."""
+
+    def __init__(self, *args, pool_label: str = "default", **kwargs):
+        self.pool_label = pool_label
+        kw = dict(kwargs.pop("kwargs", None) or {})
+        kw.setdefault("cursor_factory", TimedCursor)
+        super().__init__(*args, kwargs=kw, **kwargs)
+
+    def getconn(self, timeout=None):
+        t = time.perf_counter()
+        try:
+            return super().getconn(timeout)
+        finally:
+            REGISTRY.observe("onboarding_pool_acquire_seconds", time.perf_counter() - t, pool=self.pool_label)
+
+
+class TimedAsyncConnectionPool(AsyncConnectionPool):
+    def __init__(self, *args, pool_label: str = "default", **kwargs):
+        self.pool_label = pool_label
+        kw = dict(kwargs.pop("kwargs", None) or {})
+        kw.setdefault("cursor_factory", TimedAsyncCursor)
+        super().__init__(*args, kwargs=kw, **kwargs)
+
+    async def getconn(self, timeout=None):
+        t = time.perf_counter()
+        try:
+            return await super().getconn(timeout)
+        finally:
+            REGISTRY.observe("onboarding_pool_acquire_seconds", time.perf_counter() - t, pool=self.pool_label)
+
+
+def instrument_checkpointer(checkpointer):
+    """Time PostgresSaver get_tuple/put/put_writes/list in place."""
+    for op in ("get_tuple", "put", "put_writes"):
+        fn = getattr(checkpointer, op, None)
+        if fn is None:
+            continue
+
+        def make(fn, op):
+            @wraps(fn)
+            def timed(*args, **kwargs):
+                t = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    REGISTRY.observe("onboarding_checkpoint_seconds", time.perf_counter() - t, op=op)
+            return timed
+        setattr(checkpointer, op, make(fn, op))
+
+    # list() returns a generator: time it until the caller stops iterating,
+    # not just the call that creates it.
+    fn = getattr(checkpointer, "list", None)
+    if fn is not None:
+        def make_list(fn):
+            @wraps(fn)
+            def timed_list(*args, **kwargs):
+                t = time.perf_counter()
+                try:
+                    yield from fn(*args, **kwargs)
+                finally:
+                    REGISTRY.observe("onboarding_checkpoint_seconds", time.perf_counter() - t, op="list")
+            return timed_list
+        checkpointer.list = make_list(fn)
+    return checkpointer
+
+
+# ---------------- per-turn traces ----------------
+
+@contextmanager
+def trace_turn(thread_id: str = ""):
+    """Collect every observation made during one turn; printed when TRACE_TURNS=1."""
+    if not TRACE_TURNS:
+        yield None
+        return
+    spans: list = []
+    token = _spans.set(spans)
+    t = time.perf_counter()
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+        total = time.perf_counter() - t
+        parts = ", ".join(f"{n.replace('onboarding_', '').replace('_seconds', '')}"
+                          f"[{','.join(map(str, l.values()))}]={s * 1000:.1f}ms" for n, l, s in spans)
+        print(f"trace {thread_id} total={total * 1000:.1f}ms: {parts}")
+
+
+# ---------------- export ----------------
+
+def start_http_server(port: int, host: str = "0.0.0.0") -> threading.Thread:
+    """Serve GET /metrics on a daemon thread (for the agent processes)."""
+    from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/metrics":
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    t = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    t.start()
+    return t
+
+
+def start_from_env() -> None:
+    port = os.getenv("METRICS_PORT")
+    if port:
+        start_http_server(int(port))
@@ -0,0 +1,287 @@
+# model_router.py
+"""
+Per-node model routing with fallback, hedged requests and per-endpoint stats.
+
+Each graph node asks the router for a named route ("main" for the planning
+turn, "summarizer" for memory folding) and calls .invoke() on it like a chat
+model. A route has a primary endpoint and, if MODEL_FALLBACK is set, a
+secondary one (a different model and/or base URL):
+
+  * fallback: a failed primary call is retried once on the secondary
+  * hedging:  if the primary hasn't answered within the route's hedge delay,
+              the same request is also sent to the secondary; the first
+              successful reply wins (the loser finishes in the background
+              and is only recorded in the stats)
+  * adapting: every endpoint keeps a rolling window of latency/outcome.
+              When the primary's recent error rate crosses ERROR_RATE_OPEN,
+              the secondary goes first for COOLDOWN_S and the primary's
+              window is cleared. After that one call probes the primary
+              (half-open): success puts it back in front, failure starts
+              another cooldown. With hedge delay "auto" the delay is the
+              primary's recent p95.
+
+Hedged calls run on worker threads outside the caller's callback context,
+so their tokens are not streamed (the reply still arrives whole). Hedge the
+routes where tail latency matters more than first-token time.
+
+Configuration (env), per route NAME in {MAIN, SUMMARIZER}:
+    MODEL_<NAME>            model id      (default JETSTREAM_MODEL)
+    MODEL_<NAME>_BASE_URL   endpoint      (default JETSTREAM_BASE_URL)
+    MODEL_<NAME>_HEDGE_MS   hedge delay in ms, or "auto"; unset = no hedging
+    MODEL_<NAME>_TIMEOUT    request timeout in seconds
+    MODEL_FALLBACK, MODEL_FALLBACK_BASE_URL, MODEL_FALLBACK_API_KEY
+                            secondary endpoint shared by all routes
+
+Slot extraction is deterministic (slot_extraction.py), so it has no route.
+"""
+from __future__ import annotations
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, List
+
+from metrics import REGISTRY, InstrumentedChatModel
+
+WINDOW = 50               # recent calls kept per endpoint
+MIN_SAMPLES = 5           # before error rate / p95 are trusted
+ERROR_RATE_OPEN = 0.5     # primary error rate that flips the route to the secondary
+COOLDOWN_S = 30.0         # how long the secondary stays first
+DEFAULT_HEDGE_S = 2.0     # "auto" hedge delay until there are enough samples
+
+ROUTE_DEFAULTS = {
+    "main": {"temperature": 0.2},
+    "summarizer": {"temperature": 0.0},
+}
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+
+
+@dataclass
+class EndpointStats:
+    calls: deque = field(default_factory=lambda: deque(maxlen=WINDOW))  # (seconds, ok)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, seconds: float, ok: bool) -> None:
+        with self.lock:
+            self.calls.append((seconds, ok))
+
+    def error_rate(self) -> float:
+        with self.lock:
+            calls = list(self.calls)
+        if len(calls) < MIN_SAMPLES:
+            return 0.0
+        return sum(1 for _, ok in calls if not ok) / len(calls)
+
+    def p95(self) -> Optional[float]:
+        with self.lock:
+            lat = sorted(s for s, ok in self.calls if ok)
+        if len(lat) < MIN_SAMPLES:
+            return None
+        return lat[min(len(lat) - 1, int(0.95 * (len(lat) - 1) + 0.5))]
+
+    def reset(self) -> None:
+        with self.lock:
+            self.calls.clear()
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        return {"calls": len(self.calls), "error_rate": round(self.error_rate(), 3),
+                "p95_s": round(p95, 3) if p95 is not None else None}
+
+
+@dataclass
+class Endpoint:
+    name: str            # label for metrics, e.g. "primary:gpt-4o-mini"
+    raw: Any             # the LangChain chat model, unbound
+    model: Any = None    # what is invoked (tool-bound, instrumented)
+    stats: EndpointStats = field(default_factory=EndpointStats)
+
+    def __post_init__(self):
+        if self.model is None:
+            self.model = InstrumentedChatModel(self.raw, self.name)
+
+
+class ModelRoute:
+    """A chat-model-like object (.invoke / .bind_tools) for one graph node."""
+
+    def __init__(self, name: str, primary: Endpoint, secondary: Optional[Endpoint] = None,
+                 hedge_after: Optional[str] = None):
+        self.name = name
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_after = hedge_after     # seconds as text, "auto", or None
+        # Shared with bind_tools() copies. open_until > 0: circuit open, primary
+        # skipped (secondary first) until then; afterwards one call probes it.
+        self._circuit = {"open_until": 0.0, "probing": False, "lock": threading.Lock()}
+
+    def bind_tools(self, tools, **kwargs) -> "ModelRoute":
+        def bound(ep: Optional[Endpoint]) -> Optional[Endpoint]:
+            if ep is None:
+                return None
+            raw = ep.raw.bind_tools(tools, **kwargs)
+            # share stats: a route's tool-bound and plain calls hit the same endpoint
+            return Endpoint(ep.name, raw, InstrumentedChatModel(raw, ep.name), ep.stats)
+        route = ModelRoute(self.name, bound(self.primary), bound(self.secondary), self.hedge_after)
+        route._circuit = self._circuit
+        return route
+
+    # ---- routing decisions ----
+    def _order(self) -> List[Endpoint]:
+        if self.secondary is None:
+            return [self.primary]
+        circuit = self._circuit
+        with circuit["lock"]:
+            now = time.monotonic()
+            if circuit["open_until"]:
+                if now < circuit["open_until"] or circuit["probing"]:
+                    return [self.secondary, self.primary]
+                circuit["probing"] = True  # half-open: this call probes the primary
+                return [self.primary, self.secondary]
+            if self.primary.stats.error_rate() >= ERROR_RATE_OPEN:
+                self._open(now)
+                return [self.secondary, self.primary]
+        return [self.primary, self.secondary]
+
+    def _open(self, now: float) -> None:
+        # caller holds the circuit lock; old failures must not reopen it after the cooldown
+        self._circuit.update(open_until=now + COOLDOWN_S, probing=False)
+        self.primary.stats.reset()
+        REGISTRY.inc("onboarding_llm_route_failovers_total", route=self.name)
+        print(f"model route {self.name}: primary failing, using {self.secondary.name} for {COOLDOWN_S:.0f}s")
+
+    def _probed(self, ok: bool) -> None:
+        circuit = self._circuit
+        with circuit["lock"]:
+            if not circuit["probing"]:
+                return
+            if not ok:
+                self._open(time.monotonic())
+                return
+            circuit.update(open_until=0.0, probing=False)
+            self.primary.stats.reset()
+        print(f"model route {self.name}: primary recovered")
+
+    def _hedge_delay(self, ep: Endpoint) -> Optional[float]:
+        if not self.hedge_after or self.secondary is None:
+            return None
+        if self.hedge_after == "auto":
+            return ep.stats.p95() or DEFAULT_HEDGE_S
+        return float(self.hedge_after)
+
+    # ---- calls ----
+    def _call(self, ep: Endpoint, messages, *args, **kwargs):
+        t = time.perf_counter()
+        try:
+            out = ep.model.invoke(messages, *args, **kwargs)
+        except Exception:
+            dt = time.perf_counter() - t
+            ep.stats.record(dt, False)
+            REGISTRY.inc("onboarding_llm_route_errors_total", route=self.name, endpoint=ep.name)
+            if ep is self.primary:
+                self._probed(False)
+            raise
+        dt = time.perf_counter() - t
+        ep.stats.record(dt, True)
+        if ep is self.primary:
+            self._probed(True)
+        REGISTRY.observe("onboarding_llm_route_seconds", dt, route=self.name, endpoint=ep.name)
+        return out
+
+    def invoke(self, messages, *args, **kwargs):
+        order = self._order()
+        first = order[0]
+        second = order[1] if len(order) > 1 else None
+        delay = self._hedge_delay(first)
+        if delay is None:
+            try:
+                return self._call(first, messages, *args, **kwargs)
+            except Exception as e:
+                if second is None:
+                    raise
+                print(f"model route {self.name}: {first.name} failed ({e!r}), falling back to {second.name}")
+                return self._call(second, messages, *args, **kwargs)
+        return self._hedged(first, second, delay, messages, *args, **kwargs)
+
+    def _hedged(self, first: Endpoint, second: Endpoint, delay: float, messages, *args, **kwargs):
+        futures = {_executor.submit(self._call, first, messages, *args, **kwargs): first}
+        done, _ = wait(futures, timeout=delay)
+        if not done or next(iter(done)).exception() is not None:
+            # slow (or already failed) primary: race the secondary
+            futures[_executor.submit(self._call, second, messages, *args, **kwargs)] = second
+            REGISTRY.inc("onboarding_llm_hedges_total", route=self.name)
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                if fut.exception() is None:
+                    if futures[fut] is not first:
+                        REGISTRY.inc("onboarding_llm_hedge_wins_total", route=self.name)
+                    return fut.result()
+                error = fut.exception()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        out = {"primary": {"endpoint": self.primary.name, **self.primary.stats.snapshot()}}
+        if self.secondary is not None:
+            out["secondary"] = {"endpoint": self.secondary.name, **self.secondary.stats.snapshot()}
+            out["failover_active"] = bool(self._circuit["open_until"])
+        return out
+
+    def __getattr__(self, item):
+        primary = self.__dict__.get("primary")
+        if primary is None:
+            raise AttributeError(item)
+        return getattr(primary.model, item)
+
+
+class ModelRouter:
+    """Builds and holds one ModelRoute per node name, configured from env."""
+
+    def __init__(self):
+        self.routes: Dict[str, ModelRoute] = {}
+        self._fallback: Optional[Endpoint] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chat(model: Optional[str], base_url: Optional[str], api_key: Optional[str], **kwargs):
+        from langchain_openai import ChatOpenAI
+        return ChatOpenAI(base_url=base_url, api_key=api_key, model=model,
+                          max_retries=int(os.getenv("MODEL_MAX_RETRIES", "1")), **kwargs)
+
+    def _fallback_endpoint(self) -> Optional[Endpoint]:
+        if self._fallback is None and os.getenv("MODEL_FALLBACK"):
+            model = os.getenv("MODEL_FALLBACK")
+            self._fallback = Endpoint(f"fallback:{model}", self._chat(
+                model,
+                os.getenv("MODEL_FALLBACK_BASE_URL") or os.getenv("JETSTREAM_BASE_URL"),
+                os.getenv("MODEL_FALLBACK_API_KEY") or os.getenv("OPENAI_API_KEY"),
+                temperature=0.2,
+            ))
+        return self._fallback
+
+    def route(self, name: str) -> ModelRoute:
+        with self._lock:
+            if name not in self.routes:
+                key = name.upper()
+                model = os.getenv(f"MODEL_{key}") or os.getenv("JETSTREAM_MODEL")
+                opts = dict(ROUTE_DEFAULTS.get(name, {}))
+                if os.getenv(f"MODEL_{key}_TIMEOUT"):
+                    opts["timeout"] = float(os.getenv(f"MODEL_{key}_TIMEOUT"))
+                primary = Endpoint(f"{name}:{model}", self._chat(
+                    model,
+                    os.getenv(f"MODEL_{key}_BASE_URL") or os.getenv("JETSTREAM_BASE_URL"),
+                    os.getenv("OPENAI_API_KEY"),
+                    **opts,
+                ))
+                hedge = os.getenv(f"MODEL_{key}_HEDGE_MS")
+                if hedge and hedge != "auto":
+                    hedge = str(float(hedge) / 1000)
+                self.routes[name] = ModelRoute(name, primary, self._fallback_endpoint(), hedge)
+            return self.routes[name]
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: r.stats() for name, r in self.routes.items()}
@@ -0,0 +1,82 @@
+# office_email.py
+"""
+Office address generation: first.last@OFFICE_EMAIL_DOMAIN, then first.last2,
+first.last3, ... for later hires with the same name.
+
+The next suffix comes from onboarding.office_local_parts (database/office_email.sql),
+one row per local base holding the highest suffix handed out. Assigning an
+address is one statement: bump that row and write the address onto the
+employee. Concurrent hires with the same name queue on the row lock instead of
+racing for the same address; the bump is part of the caller's transaction, so
+a rolled-back confirmation gives its suffix back.
+
+The employee ID itself is employees.employee_ID (an identity column).
+"""
+from __future__ import annotations
+import os
+import re
+import unicodedata
+from typing import Optional
+
+OFFICE_DOMAIN = os.getenv("OFFICE_EMAIL_DOMAIN", "company.com")
+PART_MAX = 30  # chars kept from each of first/last (local_base is VARCHAR(64))
+
+# SQL spelling of office_address(); suffix 1 has no number.
+ADDRESS_SQL = "{base} || CASE WHEN {suffix} = 1 THEN '' ELSE {suffix}::text END || '@' || %(domain)s::text"
+
+# Bump the counter (or start it at 1) and store the address, only if the
+# employee doesn't have one yet (confirming twice keeps the first address).
+ASSIGN_SQL = """
+    WITH bump AS (
+        INSERT INTO onboarding.office_local_parts AS p (local_base, last_suffix)
+        SELECT %(base)s::text, 1
+        WHERE EXISTS (SELECT 1 FROM onboarding.employees
+                      WHERE employee_ID = %(employee_id)s AND office_email IS NULL)
+        ON CONFLICT (local_base) DO UPDATE SET last_suffix = p.last_suffix + 1
+        RETURNING last_suffix
+    )
+    UPDATE onboarding.employees e
+    SET office_local_base = %(base)s::text, office_suffix = bump.last_suffix,
+        office_email = {address}
+    FROM bump
+    WHERE e.employee_ID = %(employee_id)s
+    RETURNING e.office_email;
+""".format(address=ADDRESS_SQL.format(base="%(base)s::text", suffix="bump.last_suffix"))
+
+
+def _letters(word: str) -> str:
+    ascii_ = unicodedata.normalize("NFKD", word).encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z]", "", ascii_.lower())[:PART_MAX]
+
+
+def local_base(name: str) -> str:
+    """'José  García-López' -> 'jose.garcialopez'; letters only, so it never ends in a digit."""
+    words = [w for w in (_letters(w) for w in (name or "").split()) if w]
+    if not words:
+        return "employee"
+    return words[0] if len(words) == 1 else f"{words[0]}.{words[-1]}"
+
+
+def office_address(base: str, suffix: int, domain: str = OFFICE_DOMAIN) -> str:
+    return f"{base}{'' if suffix == 1 else suffix}@{domain}"
+
+
+def assign_office_email(cur, employee_id: int, name: str, domain: str = OFFICE_DOMAIN) -> Optional[str]:
+    """
+    Give `employee_id` its office address inside the caller's transaction and
+    return it (None if the employee already had one). Commit promptly: the
+    counter row stays locked for same-name hires until then.
+    """
+    cur.execute(ASSIGN_SQL, {"base": local_base(name), "employee_id": employee_id, "domain": domain})
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return row["office_email"] if isinstance(row, dict) else row[0]
+
+
+async def aassign_office_email(cur, employee_id: int, name: str, domain: str = OFFICE_DOMAIN) -> Optional[str]:
+    await cur.execute(ASSIGN_SQL, {"base": local_base(name), "employee_id": employee_id, "domain": domain})
+    row = await cur.fetchone()
+    if row is None:
+        return None
+    return row["office_email"] if isinstance(row, dict) else row[0]
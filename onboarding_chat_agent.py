@@ -2,62 +2,106 @@ from typing import TypedDict, Annotated, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
 from langgraph.graph.message import add_messages 
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 import os
+from types import SimpleNamespace
 
-from langgraph.checkpoint.postgres import PostgresSaver
-import psycopg
 
 
 #------------------------ New Function
-from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+# psycopg, the pools, metrics and the background workers are imported in
+# build_app(), so importing this module stays cheap.
+from llm_cache import ResponseCache, CachedChatModel
+from inventory import claim_seat, claim_equipment_kit, confirm_onboarding, availability
 
 
 load_dotenv(override=True)
 
 
-def main():
+def build_app() -> SimpleNamespace:
+    """Compile the agent graph; returns app plus the pool/checkpointer/cache it runs on."""
+    # Heavy / connecting imports happen here, not when the module is imported.
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+    import metrics
+    from metrics import TimedConnectionPool, timed_node, instrument_checkpointer
+    from inventory_cache import FreeInventoryCache
+    from tool_executor import make_tool_node
+    import checkpoint_retention
+    import hold_sweeper
+    import outbox
+    from model_router import ModelRouter
+    from checkpoint_delta import make_checkpointer
 
     # @tool
     # def test_tool(a:int, b:int)->float:
     #     '''perform linux operation on 2 integers and return the result'''
     #     return (a**2 + b**2)
 
-    POOL: ConnectionPool = ConnectionPool(
+    POOL: ConnectionPool = TimedConnectionPool(
+        pool_label="simple_agent",
         conninfo=os.getenv("DATABASE_URL"),
         min_size=1,
         max_size=5,
         kwargs={"row_factory": dict_row},
     )
+    inventory_cache = FreeInventoryCache(os.getenv("DATABASE_URL")).start()
 
     @tool
-    def assign_seating_space(seat_type: Optional[str] = None) -> dict:
+    def assign_seating_space(seat_type: Optional[str] = None, config: RunnableConfig = None) -> dict:
         """
         Assign me a available seat to employee as if optional seating type (seat_id, seat_type) or a message if none found.
         """
-        sql = """
-            SELECT ss.seat_id, ss.seat_type
-            FROM onboarding.seating_space ss
-            WHERE ss.employee_id IS NULL
-            AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
-            ORDER BY random()
-            LIMIT 1;
+        # Reserve the seat for this thread so concurrent sessions can't be offered it too.
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return claim_seat(conn, seat_type, claimed_by=thread_id, cache=inventory_cache)
+
+    @tool
+    def assign_equipment_kit(os_requirement: str, config: RunnableConfig = None) -> dict:
+        """
+        Assign the full onboarding kit in one call: a laptop for os_requirement (linux/windows/macos)
+        plus headphone, mic, webcam and phone. Returns the items with their serial numbers or a message.
         """
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
         with POOL.connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, {"seat_type": seat_type})
-                row = cur.fetchone()
-                if not row:
-                    return {"ok": False, "message": "No available seating space."}
-                return {"ok": True, "seat_id": row["seat_id"], "seat_type": row["seat_type"]}
+            return claim_equipment_kit(conn, os_requirement, claimed_by=thread_id, cache=inventory_cache)
 
+    @tool
+    def confirm_assignment(name: str, email: str, phone: Optional[str] = None, config: RunnableConfig = None) -> dict:
+        """
+        After the user approves: create the employee (ID + office email) and turn the held seat and kit into their assignment.
+        """
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return confirm_onboarding(conn, name, email, phone, claimed_by=thread_id)
 
-    tools = [assign_seating_space]
+    @tool
+    def check_availability() -> dict:
+        """
+        Free seats by type, laptops by OS, accessories and complete kits by OS. Check this before
+        promising a seat type or OS, and suggest what is actually available.
+        """
+        with POOL.connection() as conn:
+            return availability(conn)
+
+    tools = [check_availability, assign_seating_space, assign_equipment_kit, confirm_assignment]
+
+    # Every DB-writing tool, run in call order by the tool node inside one per-turn transaction.
+    transactional = {
+        "assign_seating_space": lambda conn, args, owner, after_commit: claim_seat(
+            conn, args.get("seat_type"), claimed_by=owner, cache=inventory_cache, commit=False,
+            after_commit=after_commit),
+        "assign_equipment_kit": lambda conn, args, owner, after_commit: claim_equipment_kit(
+            conn, args.get("os_requirement"), claimed_by=owner, cache=inventory_cache, commit=False,
+            after_commit=after_commit),
+        "confirm_assignment": lambda conn, args, owner, after_commit: confirm_onboarding(
+            conn, args.get("name"), args.get("email"), args.get("phone"), claimed_by=owner, commit=False),
+    }
 
     print(tools)
 
@@ -66,19 +110,28 @@ def main():
     DSN = os.getenv("DATABASE_URL")
     conn = psycopg.connect(DSN)
     conn.autocommit = True
-    checkpointer = PostgresSaver(conn)
+    checkpointer = make_checkpointer(conn)  # CHECKPOINT_DELTA=1: delta-encoded, compressed blobs
     checkpointer.setup()
+    instrument_checkpointer(checkpointer)
+    metrics.start_from_env()  # GET /metrics on METRICS_PORT
 
+    # Optional background compaction of the checkpoint tables (CHECKPOINT_KEEP_LAST=N).
+    retention = checkpoint_retention.from_env(DSN)
+    if retention:
+        retention.start_background()
+    hold_sweeper.start_from_env(DSN)  # releases expired holds every HOLD_SWEEP_SECONDS (30)
+    outbox.start_from_env(DSN)        # OUTBOX_WORKERS=N delivers provisioning events
 
-    llm = model = ChatOpenAI(
-        base_url = os.getenv("JETSTREAM_BASE_URL"),
-        api_key=os.getenv("OPENAI_API_KEY"),
-        model=os.getenv("JETSTREAM_MODEL"),
-        temperature=0.2,
-    )
+
+    # MODEL_MAIN (default JETSTREAM_MODEL), optional MODEL_FALLBACK / hedging: see model_router.py
+    router = ModelRouter()
 
     # llm_bind = create_agent(llm, tools)
-    llm_bind = llm.bind_tools(tools)
+    llm_bind = router.route("main").bind_tools(tools)
+
+    # Exact-match reply cache; LLM_CACHE_SHARED=1 adds the Postgres tier shared by workers.
+    response_cache = ResponseCache(pool=POOL if os.getenv("LLM_CACHE_SHARED") else None)
+    llm_bind = CachedChatModel(llm_bind, response_cache, model_name=llm_bind.primary.name)
 
     # math_response = llm_bind.invoke(
     # [HumanMessage(content="assign me a seat")]
@@ -114,16 +167,23 @@ def main():
 
     graph = StateGraph(State)
 
-    graph.add_node("main_llm", process)
-    graph.add_node("tool_node", ToolNode(tools))
+    graph.add_node("main_llm", timed_node("main_llm", process))
+    graph.add_node("tool_node", timed_node("tool_node", make_tool_node(tools, POOL, transactional)))
 
     graph.add_edge(START, "main_llm")
     graph.add_conditional_edges("main_llm", should_continue )
     graph.add_edge("tool_node", "main_llm")
 
     app = graph.compile(checkpointer=checkpointer)
+    return SimpleNamespace(app=app, pool=POOL, checkpointer=checkpointer, response_cache=response_cache,
+                           router=router)
 
 
+def main():
+    from metrics import trace_turn
+
+    agent = build_app()
+    app, response_cache = agent.app, agent.response_cache
 
     user_input = input("Enter your username.... ")
     cfg = {"configurable": {"thread_id": user_input}}
@@ -136,9 +196,11 @@ def main():
         if user_input.strip().lower() == "exit":
             break
 
-        s = app.invoke({"messages":[HumanMessage(content = user_input)]}, config=cfg)
+        with trace_turn(cfg["configurable"]["thread_id"]):
+            s = app.invoke({"messages":[HumanMessage(content = user_input)]}, config=cfg)
 
         print( [i.content for i in s["messages"][-3:]])
+        print("llm cache:", response_cache.stats())
 
 
 
@@ -150,6 +212,7 @@ if __name__ == "__main__":
 
 
 
+# For routine cleanup use checkpoint_retention.py; full reset:
 # TRUNCATE TABLE checkpoint_writes, checkpoint_blobs, checkpoints;
 
 # -- If you get FK constraint errors, do it in order:
@@ -1,27 +1,35 @@
-from typing import TypedDict, Annotated, Optional
-from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+from typing import TypedDict, Annotated, Optional, Dict
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage, AIMessageChunk, ToolMessage
 from langgraph.graph.message import add_messages 
 from langgraph.graph import StateGraph, START, END
-from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableConfig
 
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
 import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Iterator
 
-from langgraph.checkpoint.postgres import PostgresSaver
-import psycopg
 
 #------------------------ New Function
-from psycopg.rows import dict_row
-from psycopg_pool import ConnectionPool
+# psycopg, the pools, metrics and the background workers are imported in
+# build_agent(), so importing this module (UI, benchmarks) stays cheap.
+from prompt_assembly import assemble_prompt, STATIC_PREFIX
+from llm_cache import ResponseCache, CachedChatModel
+from slot_extraction import fast_path
+from inventory import claim_seat, claim_equipment_kit, confirm_onboarding, release_holds, availability
+import json
 
 load_dotenv(override=True)
 
 # -------- Configs for compact memory --------
 LAST_K = 6  # how many recent messages to send each turn
 MAX_SUMMARY_CHARS = 2000  # keep the summary bounded
+# Summarize only once the un-summarized tail exceeds either budget (env-tunable).
+SUMMARY_TRIGGER_MESSAGES = int(os.getenv("SUMMARY_TRIGGER_MESSAGES", "8"))
+SUMMARY_TRIGGER_TOKENS = int(os.getenv("SUMMARY_TRIGGER_TOKENS", "1500"))
 
 NAME_PATTERNS = [
     re.compile(r"\bmy name is\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+){0,3})\b", re.I),
@@ -62,53 +70,289 @@ def clip_summary(text: str, limit: int = MAX_SUMMARY_CHARS) -> str:
     tail = text[- limit // 2 :]
     return head + " … " + tail
 
-def main():
-    POOL: ConnectionPool = ConnectionPool(
+def approx_tokens(msgs: list[BaseMessage]) -> int:
+    # ~4 chars per token is close enough for a trigger threshold
+    return sum(len(str(getattr(m, "content", "") or "")) for m in msgs) // 4
+
+def merge_counts(a: dict, b: dict) -> dict:
+    """token_counts reducer: merge new counts; a None value drops that message id."""
+    out = dict(a or {})
+    for key, value in (b or {}).items():
+        if value is None:
+            out.pop(key, None)
+        else:
+            out[key] = value
+    return out
+
+def needs_summary(s: dict) -> bool:
+    pending = s["messages"][s.get("summarized_upto", 0):]
+    return len(pending) > SUMMARY_TRIGGER_MESSAGES or approx_tokens(pending) > SUMMARY_TRIGGER_TOKENS
+
+def summarize(llm, old_summary: str, msgs: list[BaseMessage]) -> str:
+    """Fold `msgs` into the running summary with one LLM call."""
+    sys = SystemMessage(
+        content=(
+            "You are a summarizer. Write a terse update to an existing "
+            "running summary in <150 words, focusing on facts and decisions. "
+            "Do NOT restate the whole chat. Keep it compact."
+        )
+    )
+    # We pass the existing summary to be updated, not replaced.
+    user_sum = HumanMessage(
+        content=(
+            f"Existing summary:\n{old_summary}\n\n"
+            f"Recent messages to fold in:\n" +
+            "\n---\n".join(
+                f"{m.type.upper()}: {getattr(m,'content','')}" for m in msgs
+            ) +
+            "\n\nReturn only the updated summary."
+        )
+    )
+    try:
+        new_sum_msg = llm.invoke([sys, user_sum])
+        return clip_summary(getattr(new_sum_msg, "content", "") or "", MAX_SUMMARY_CHARS)
+    except Exception:
+        # Fallback: very cheap heuristic if summarization fails
+        tail = " ".join([getattr(m, "content", "") for m in msgs if getattr(m, "content", "")])
+        return clip_summary((old_summary + " " + tail).strip(), MAX_SUMMARY_CHARS)
+
+def in_transcript(m: BaseMessage) -> bool:
+    """User turns and assistant text; tool calls/results are not shown in a transcript."""
+    return isinstance(m, HumanMessage) or (isinstance(m, AIMessage) and bool(m.content))
+
+
+def visible_messages(messages: list) -> list[dict]:
+    """The transcript as {"role", "content"} dicts (UI paging and the search index)."""
+    return [
+        {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": str(m.content)}
+        for m in messages if in_transcript(m)
+    ]
+
+
+class OnboardingAgent:
+    """Compiled graph plus the per-process helpers a front end (CLI or UI) needs."""
+
+    def __init__(self, app, llm, response_cache, pool=None, checkpointer=None, router=None, projector=None):
+        self.app = app
+        self.llm = llm  # the summarizer's model route
+        self.router = router
+        self.response_cache = response_cache
+        self.pool = pool
+        self.checkpointer = checkpointer
+        self.projector = projector  # transcript_search.TranscriptProjector (TRANSCRIPT_INDEX=1)
+        self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summarizer")
+        self._pending: Dict[str, Future] = {}
+
+    # ---- background summarization (see needs_summary) ----
+    def _summarize(self, cfg: dict, state: dict) -> None:
+        upto = len(state["messages"])
+        start = state.get("summarized_upto", 0)
+        new_summary = summarize(self.llm, state.get("summary", ""), state["messages"][start:upto])
+        # Messages that can no longer be sent (summarized and outside the last
+        # LAST_K) don't need their token counts any more.
+        dropped = state["messages"][max(start - LAST_K, 0):max(upto - LAST_K, 0)]
+        # Merged as a new checkpoint; the next turn reads it like any other channel.
+        self.app.update_state(cfg, {"summary": new_summary, "summarized_upto": upto,
+                                    "token_counts": {m.id: None for m in dropped if m.id}},
+                              as_node="memory_update")
+
+    def wait_for_summary(self, cfg: dict) -> None:
+        """The summary from the previous turn must land before this turn reads state."""
+        fut = self._pending.pop(cfg["configurable"]["thread_id"], None)
+        if fut is not None:
+            fut.result()
+
+    def after_turn(self, cfg: dict, state: dict) -> None:
+        thread_id = cfg["configurable"]["thread_id"]
+        if needs_summary(state):
+            self._pending[thread_id] = self._summarizer.submit(self._summarize, cfg, state)
+        if self.projector is not None:
+            self.projector.submit(thread_id, visible_messages(state.get("messages", [])), state.get("profile"))
+
+    def close(self) -> None:
+        for fut in list(self._pending.values()):
+            fut.result()
+        self._summarizer.shutdown()
+        if self.projector is not None:
+            self.projector.close()
+
+    # ---- transcript paging (UI history lives here, not in session state) ----
+    def transcript(self, cfg: dict, start: int = 0, end: Optional[int] = None) -> tuple[list[dict], int]:
+        """
+        User/assistant messages [start:end] of the thread as {"role", "content"}
+        dicts, skipping tool traffic, plus the total count of such messages.
+        """
+        visible = visible_messages(self.app.get_state(cfg).values.get("messages", []))
+        return visible[start:end], len(visible)
+
+    # ---- turns ----
+    def invoke_turn(self, user_text: str, cfg: dict) -> dict:
+        from metrics import trace_turn
+        self.wait_for_summary(cfg)
+        with trace_turn(cfg["configurable"]["thread_id"]):
+            s = self.app.invoke({"messages": [HumanMessage(content=user_text)]}, config=cfg)
+        self.after_turn(cfg, s)
+        return s
+
+    def stream_turn(self, user_text: str, cfg: dict) -> Iterator[tuple[str, object]]:
+        """
+        Yield ("token", str) as the model produces text, ("tool_start", name),
+        ("tool_end", dict-like result), ("reply", str) for replies that were not
+        streamed (fast path / cache hit), and finally ("metrics", dict) with
+        time-to-first-token and total turn time.
+        """
+        self.wait_for_summary(cfg)
+        t0 = time.perf_counter()
+        ttft = None
+        streamed = False
+        for mode, chunk in self.app.stream(
+            {"messages": [HumanMessage(content=user_text)]},
+            config=cfg,
+            stream_mode=["messages", "updates"],
+        ):
+            if mode == "messages":
+                msg, meta = chunk
+                if meta.get("langgraph_node") == "main_llm" and isinstance(msg, AIMessageChunk) and msg.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - t0
+                    streamed = True
+                    yield "token", msg.content
+                continue
+            for node, update in (chunk or {}).items():
+                for m in (update or {}).get("messages", []) if isinstance(update, dict) else []:
+                    if isinstance(m, AIMessage) and m.tool_calls:
+                        for tc in m.tool_calls:
+                            yield "tool_start", tc["name"]
+                    elif isinstance(m, ToolMessage):
+                        yield "tool_end", {"name": m.name, "content": m.content}
+                    elif isinstance(m, AIMessage) and m.content and not streamed:
+                        if ttft is None:
+                            ttft = time.perf_counter() - t0
+                        yield "reply", m.content
+                if node == "main_llm":
+                    streamed = False  # next main_llm pass (after tools) streams afresh
+        state = self.app.get_state(cfg).values
+        self.after_turn(cfg, state)
+        total = time.perf_counter() - t0
+        yield "metrics", {"ttft_s": round(ttft if ttft is not None else total, 3), "total_s": round(total, 3),
+                          "transcript_len": sum(1 for m in state.get("messages", []) if in_transcript(m))}
+
+
+def build_agent() -> OnboardingAgent:
+    # Heavy / connecting imports happen here, not when the module is imported.
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+    import metrics
+    from metrics import TimedConnectionPool, timed_node, instrument_checkpointer
+    from inventory_cache import FreeInventoryCache
+    from tool_executor import make_tool_node
+    import checkpoint_retention
+    import hold_sweeper
+    import outbox
+    from model_router import ModelRouter
+    from checkpoint_delta import make_checkpointer
+    import transcript_search
+
+    POOL: ConnectionPool = TimedConnectionPool(
+        pool_label="profile_agent",
         conninfo=os.getenv("DATABASE_URL"),
         min_size=1,
         max_size=5,
         kwargs={"row_factory": dict_row},
     )
+    inventory_cache = FreeInventoryCache(os.getenv("DATABASE_URL")).start()
 
     @tool
-    def assign_seating_space(seat_type: Optional[str] = None) -> dict:
+    def assign_seating_space(seat_type: Optional[str] = None, config: RunnableConfig = None) -> dict:
         """
         Assign an available seat to an employee with optional seat_type.
         Returns {"ok": bool, "seat_id": int?, "seat_type": str?, "message": str?}
         """
-        sql = """
-            SELECT ss.seat_id, ss.seat_type
-            FROM onboarding.seating_space ss
-            WHERE ss.employee_id IS NULL
-              AND (%(seat_type)s::text IS NULL OR ss.seat_type = %(seat_type)s::text)
-            ORDER BY random()
-            LIMIT 1;
+        # Reserve the seat for this thread so concurrent sessions can't be offered it too.
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return claim_seat(conn, seat_type, claimed_by=thread_id, cache=inventory_cache)
+
+    @tool
+    def assign_equipment_kit(os_requirement: str, config: RunnableConfig = None) -> dict:
+        """
+        Assign the full onboarding kit in one call: a laptop for os_requirement (linux/windows/macos)
+        plus headphone, mic, webcam and phone. Returns the items with their serial numbers or a message.
+        """
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return claim_equipment_kit(conn, os_requirement, claimed_by=thread_id, cache=inventory_cache)
+
+    @tool
+    def confirm_assignment(name: str, email: str, phone: Optional[str] = None, config: RunnableConfig = None) -> dict:
+        """
+        Call only after the user approves the plan: creates the employee record and turns the
+        held seat and equipment kit into their assignment. Returns the employee ID and the
+        generated office email. If the hold expired, assign again.
+        """
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return confirm_onboarding(conn, name, email, phone, claimed_by=thread_id)
+
+    @tool
+    def cancel_reservation(config: RunnableConfig = None) -> dict:
+        """Release the seat and equipment held for this conversation (user cancels or wants to start over)."""
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        with POOL.connection() as conn:
+            return release_holds(conn, thread_id)
+
+    @tool
+    def check_availability() -> dict:
+        """
+        Free seats by type, laptops by OS, accessories and complete kits by OS. Check this before
+        promising a seat type or OS, and suggest what is actually available.
         """
         with POOL.connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(sql, {"seat_type": seat_type})
-                row = cur.fetchone()
-                if not row:
-                    return {"ok": False, "message": "No available seating space."}
-                return {"ok": True, "seat_id": row["seat_id"], "seat_type": row["seat_type"]}
-
-    tools = [assign_seating_space]
+            return availability(conn)
+
+    tools = [check_availability, assign_seating_space, assign_equipment_kit, confirm_assignment, cancel_reservation]
+
+    # Every DB-writing tool, run in call order by the tool node inside one per-turn transaction.
+    transactional = {
+        "assign_seating_space": lambda conn, args, owner, after_commit: claim_seat(
+            conn, args.get("seat_type"), claimed_by=owner, cache=inventory_cache, commit=False,
+            after_commit=after_commit),
+        "assign_equipment_kit": lambda conn, args, owner, after_commit: claim_equipment_kit(
+            conn, args.get("os_requirement"), claimed_by=owner, cache=inventory_cache, commit=False,
+            after_commit=after_commit),
+        "confirm_assignment": lambda conn, args, owner, after_commit: confirm_onboarding(
+            conn, args.get("name"), args.get("email"), args.get("phone"), claimed_by=owner, commit=False),
+        "cancel_reservation": lambda conn, args, owner, after_commit: release_holds(conn, owner, commit=False),
+    }
     
     print(tools)
 
     DSN = os.getenv("DATABASE_URL")
     conn = psycopg.connect(DSN)
     conn.autocommit = True
-    checkpointer = PostgresSaver(conn)
+    checkpointer = make_checkpointer(conn)  # CHECKPOINT_DELTA=1: delta-encoded, compressed blobs
     checkpointer.setup()
+    instrument_checkpointer(checkpointer)
+    metrics.start_from_env()  # GET /metrics on METRICS_PORT
 
-    llm = model = ChatOpenAI(
-        base_url=os.getenv("JETSTREAM_BASE_URL"),
-        api_key=os.getenv("OPENAI_API_KEY"),
-        model=os.getenv("JETSTREAM_MODEL"),
-        temperature=0.2,
-    )
-    llm_bind = llm.bind_tools(tools)
+    # Optional background compaction of the checkpoint tables (CHECKPOINT_KEEP_LAST=N).
+    retention = checkpoint_retention.from_env(DSN)
+    if retention:
+        retention.start_background()
+    # Hand back holds of threads that never confirmed (every HOLD_SWEEP_SECONDS, default 30).
+    hold_sweeper.start_from_env(DSN)
+    # Deliver provisioning events queued by confirm_assignment (OUTBOX_WORKERS=N, see outbox.py).
+    outbox.start_from_env(DSN)
+
+    # Per-node models (MODEL_MAIN / MODEL_SUMMARIZER, optional MODEL_FALLBACK and
+    # hedging), see model_router.py. Both default to JETSTREAM_MODEL.
+    router = ModelRouter()
+    llm_bind = router.route("main").bind_tools(tools)
+
+    # Exact-match reply cache; LLM_CACHE_SHARED=1 adds the Postgres tier shared by workers.
+    response_cache = ResponseCache(pool=POOL if os.getenv("LLM_CACHE_SHARED") else None, static_prefix=STATIC_PREFIX)
+    llm_bind = CachedChatModel(llm_bind, response_cache, model_name=llm_bind.primary.name)
 
     # -------- Compact-memory state --------
     class State(TypedDict):
@@ -116,15 +360,39 @@ def main():
         username: str
         profile: dict
         summary: str
+        summarized_upto: int  # messages[:summarized_upto] are folded into summary
+        token_counts: Annotated[dict, merge_counts]  # message id -> tokens, counted once
 
-    # ----- LLM turn: inject compact context (profile + summary + last_k) -----
+    # ----- LLM turn: static prefix + profile/summary + history packed to a token budget -----
     def process(s: State) -> State:
-        last_k = trim_messages(s["messages"], LAST_K)
-        sys = build_system_block(s.get("profile", {}), s.get("summary", ""))
-        prompt_msgs = [sys] + last_k
-        # print("prompt_msgs: ", prompt_msgs)
+        # Everything the summary doesn't cover yet, and never less than LAST_K.
+        start = min(s.get("summarized_upto", 0), max(len(s["messages"]) - LAST_K, 0))
+        prompt_msgs, new_counts, sent = assemble_prompt(
+            s["messages"], s.get("profile", {}), s.get("summary", ""), s.get("token_counts"), start=start,
+        )
+        metrics.REGISTRY.inc("onboarding_prompt_tokens_total", sent)
         ai = llm_bind.invoke(prompt_msgs)
-        return {"messages": [ai if isinstance(ai, AIMessage) else AIMessage(content=ai.content)]}
+        return {
+            "messages": [ai if isinstance(ai, AIMessage) else AIMessage(content=ai.content)],
+            "token_counts": new_counts,
+        }
+
+    # ----- Deterministic slot filling in front of the LLM -----
+    def extract_slots(s: State) -> State:
+        last = s["messages"][-1]
+        if not isinstance(last, HumanMessage):
+            return {}
+        profile, reply = fast_path(str(last.content or ""), s.get("profile", {}))
+        out: dict = {"profile": profile}
+        if reply is not None:
+            out["messages"] = [AIMessage(content=reply)]
+        return out
+
+    def after_extract(state: State):
+        # The extractor answered on its own -> skip the LLM entirely.
+        if isinstance(state["messages"][-1], AIMessage):
+            return "memory_update"
+        return "main_llm"
 
     # ----- Should call tools? -----
     def should_continue(state: State):
@@ -133,7 +401,7 @@ def main():
             return "tool_node"
         return "memory_update"
 
-    # ----- After the LLM (and after tools), update memory cheaply -----
+    # ----- After the LLM (and after tools), update memory cheaply (no LLM call) -----
     def memory_update(s: State) -> State:
         # 1) Lightweight entity extraction: capture name once
         try:
@@ -155,77 +423,66 @@ def main():
         except Exception:
             pass
 
-        # 2) Update a compact summary using the last small window
-        #    We’ll synthesize a very short summary with the same LLM (cheap prompt).
-        #    This runs on the same model for simplicity; you can swap in a cheaper model.
-        recent = trim_messages(s["messages"], 4)  # only 4 messages to summarize
-        if recent:
-            sys = SystemMessage(
-                content=(
-                    "You are a summarizer. Write a terse update to an existing "
-                    "running summary in <150 words, focusing on facts and decisions. "
-                    "Do NOT restate the whole chat. Keep it compact."
-                )
-            )
-            old_summary = s.get("summary", "")
-            # We pass the existing summary to be updated, not replaced.
-            user_sum = HumanMessage(
-                content=(
-                    f"Existing summary:\n{old_summary}\n\n"
-                    f"Recent messages to fold in:\n" +
-                    "\n---\n".join(
-                        f"{m.type.upper()}: {getattr(m,'content','')}" for m in recent
-                    ) +
-                    "\n\nReturn only the updated summary."
-                )
-            )
-            try:
-                new_sum_msg = llm.invoke([sys, user_sum])
-                new_summary = getattr(new_sum_msg, "content", "") or ""
-                s["summary"] = clip_summary(new_summary, MAX_SUMMARY_CHARS)
-            except Exception:
-                # Fallback: very cheap heuristic if summarization fails
-                tail = " ".join([getattr(m, "content", "") for m in recent if getattr(m, "content", "")])
-                merged = (old_summary + " " + tail).strip()
-                s["summary"] = clip_summary(merged, MAX_SUMMARY_CHARS)
-
-        return {"profile": s.get("profile", {}), "summary": s.get("summary", "")}
+        # 2) A successful confirm_assignment in this turn marks the plan confirmed.
+        for m in reversed(s["messages"]):
+            if isinstance(m, HumanMessage):
+                break
+            if isinstance(m, ToolMessage) and m.name == "confirm_assignment":
+                try:
+                    res = json.loads(m.content)
+                except (TypeError, ValueError):
+                    continue
+                if res.get("ok"):
+                    prof = dict(s.get("profile") or {})
+                    prof.update(confirmed=True, employee_ID=res.get("employee_id"),
+                                office_email=res.get("office_email"), seat_id=res.get("seat_id"))
+                    s["profile"] = prof
+                break
+
+        # 3) Summarization is not done here: it runs after the reply is
+        #    returned (see run loop), only once needs_summary() trips.
+        return {"profile": s.get("profile", {})}
 
     # -------- Build graph --------
     graph = StateGraph(State)
-    graph.add_node("main_llm", process)
-    graph.add_node("tool_node", ToolNode(tools))
-    graph.add_node("memory_update", memory_update)
+    graph.add_node("extract_slots", timed_node("extract_slots", extract_slots))
+    graph.add_node("main_llm", timed_node("main_llm", process))
+    graph.add_node("tool_node", timed_node("tool_node", make_tool_node(tools, POOL, transactional)))
+    graph.add_node("memory_update", timed_node("memory_update", memory_update))
 
-    graph.add_edge(START, "main_llm")
+    graph.add_edge(START, "extract_slots")
+    graph.add_conditional_edges("extract_slots", after_extract)
     graph.add_conditional_edges("main_llm", should_continue)
     graph.add_edge("tool_node", "main_llm")
     graph.add_edge("memory_update", END)
 
     app = graph.compile(checkpointer=checkpointer)
+    # TRANSCRIPT_INDEX=1: project each finished turn into the transcript search tables.
+    projector = transcript_search.from_env(POOL)
+    return OnboardingAgent(app, router.route("summarizer"), response_cache, pool=POOL, checkpointer=checkpointer,
+                           router=router, projector=projector)
+
+
+def main():
+    agent = build_agent()
 
     # -------- Run loop --------
     user_input = input("Enter your username.... ")
     cfg = {"configurable": {"thread_id": user_input}}
     print("\n", "Lets initiate your session so you can resume or start conversing...")
 
-    # Initialize state with empty profile/summary (persisted by checkpointer)
-    # You can seed profile with known facts per user/thread id.
+    # Profile/summary persist via the checkpointer, so only new messages are sent in.
     while True:
         user_input = input("Enter... ")
         if user_input.strip().lower() == "exit":
             break
 
-        s = app.invoke(
-            {
-                "messages": [HumanMessage(content=user_input)],
-                "profile": {},                # persists via checkpointer
-                "summary": "",                # persists via checkpointer
-                "username": user_input or "", # optional
-            },
-            config=cfg,
-        )
+        s = agent.invoke_turn(user_input, cfg)
         print([i.content for i in s["messages"][-3:]])
+        print("llm cache:", agent.response_cache.stats())
+        print("model routes:", agent.router.stats())
+
+    agent.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,328 @@
+# outbox.py
+"""
+Delivers the transactional outbox (database/outbox.sql) to downstream
+provisioning: account creation, badge and equipment tickets, welcome email.
+
+confirm_onboarding() / bulk_onboard.py write the events in the same
+transaction as the employee, seat and equipment updates, so an onboarding is
+never confirmed without its events and no event exists for a rolled-back
+one. The user's turn ends at that commit; everything here runs later, on
+background workers:
+
+  * claim:   a worker takes up to `batch` due rows with FOR UPDATE SKIP LOCKED
+             and leases them (available_at = now + lease) in one short
+             transaction; a worker that dies mid-batch just lets the lease run
+             out and the rows come back.
+  * deliver: rows are grouped by topic and handed to the consumer one batch
+             per topic, outside any transaction. Every event carries its
+             idempotency key ('<topic>:<employee_ID>'); consumers must
+             dedupe on it, since a lease can expire under a slow delivery.
+  * settle:  delivered rows are marked done in one UPDATE; failed ones are
+             rescheduled with exponential backoff and jitter, or marked dead
+             after max_attempts.
+
+A consumer is any callable (topic, events) -> {idempotency_key: error} for
+the events that failed (empty = all delivered); raising fails the batch.
+HttpConsumer POSTs to OUTBOX_URL/<topic>; StubConsumer is an in-process
+stand-in (latency, failure rate, dedupe) for offline runs and benchmarks.
+
+    python outbox.py --workers 4 --loop            # OUTBOX_URL=... or --stub
+    OUTBOX_WORKERS=4 OUTBOX_CONSUMER=stub python onboarding_chatbot_with_profile.py
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import urllib.request
+from dataclasses import dataclass, field, fields
+from typing import Optional, Dict, List, Any, Callable
+
+import psycopg
+from psycopg.rows import dict_row
+from dotenv import load_dotenv
+
+from metrics import REGISTRY
+
+Consumer = Callable[[str, List[Dict[str, Any]]], Dict[str, str]]
+
+CLAIM_SQL = """
+    WITH due AS (
+        SELECT event_id
+        FROM onboarding.outbox
+        WHERE status = 'pending' AND available_at <= NOW()
+        ORDER BY available_at
+        LIMIT %(batch)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE onboarding.outbox o
+    SET attempts = o.attempts + 1,
+        available_at = NOW() + make_interval(secs => %(lease)s)
+    FROM due
+    WHERE o.event_id = due.event_id
+    RETURNING o.event_id, o.idempotency_key, o.topic, o.aggregate_id, o.payload, o.attempts;
+"""
+
+DONE_SQL = """
+    UPDATE onboarding.outbox
+    SET status = 'done', processed_at = NOW(), last_error = NULL
+    WHERE event_id = ANY(%(ids)s) AND status = 'pending';
+"""
+
+RETRY_SQL = """
+    UPDATE onboarding.outbox o
+    SET status = CASE WHEN o.attempts >= %(max_attempts)s THEN 'dead' ELSE 'pending' END,
+        available_at = NOW() + make_interval(secs => r.delay),
+        last_error = left(r.error, 1000)
+    FROM unnest(%(ids)s::bigint[], %(delays)s::float8[], %(errors)s::text[]) AS r(event_id, delay, error)
+    WHERE o.event_id = r.event_id AND o.status = 'pending';
+"""
+
+PURGE_SQL = """
+    DELETE FROM onboarding.outbox
+    WHERE event_id IN (
+        SELECT event_id FROM onboarding.outbox
+        WHERE status = 'done' AND processed_at < NOW() - %(keep)s::interval
+        LIMIT %(batch)s
+    );
+"""
+
+BACKLOG_SQL = """
+    SELECT status, count(*) AS n FROM onboarding.outbox GROUP BY status;
+"""
+
+
+# ---------------- consumers ----------------
+
+class HttpConsumer:
+    """POST {"events": [...]} to <base_url>/<topic>; a JSON {"failed": {key: error}} reply marks partial failure."""
+
+    def __init__(self, base_url: str, timeout: float = 10.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __call__(self, topic: str, events: List[Dict[str, Any]]) -> Dict[str, str]:
+        body = json.dumps({"events": events}, default=str).encode()
+        req = urllib.request.Request(f"{self.base_url}/{topic}", data=body, method="POST",
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            reply = json.loads(resp.read() or b"{}")
+        return reply.get("failed") or {}
+
+
+@dataclass
+class StubConsumer:
+    """Offline downstream: sleeps, fails a share of events, dedupes on idempotency keys."""
+    latency_ms: float = 20.0      # per batch
+    per_event_ms: float = 1.0
+    fail_rate: float = 0.0        # share of events that fail (transiently)
+    seen: Dict[str, int] = field(default_factory=dict)   # key -> deliveries
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def __call__(self, topic: str, events: List[Dict[str, Any]]) -> Dict[str, str]:
+        time.sleep((self.latency_ms + self.per_event_ms * len(events)) / 1000)
+        failed = {}
+        with self.lock:
+            for e in events:
+                key = e["idempotency_key"]
+                if key in self.seen:
+                    self.seen[key] += 1        # duplicate: acknowledged, not re-provisioned
+                elif random.random() < self.fail_rate:
+                    failed[key] = f"stub: {topic} temporarily unavailable"
+                else:
+                    self.seen[key] = 1
+        return failed
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {"provisioned": len(self.seen), "duplicates": sum(self.seen.values()) - len(self.seen)}
+
+
+def consumer_from_env() -> Optional[Consumer]:
+    if os.getenv("OUTBOX_URL"):
+        return HttpConsumer(os.getenv("OUTBOX_URL"), float(os.getenv("OUTBOX_TIMEOUT", "10")))
+    if os.getenv("OUTBOX_CONSUMER") == "stub":
+        return StubConsumer()
+    return None
+
+
+# ---------------- workers ----------------
+
+@dataclass
+class OutboxStats:
+    delivered: int = 0
+    retried: int = 0
+    dead: int = 0
+    batches: int = 0
+    purged: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, **counts: int) -> None:
+        with self.lock:
+            for k, v in counts.items():
+                setattr(self, k, getattr(self, k) + v)
+
+    def as_dict(self) -> Dict[str, int]:
+        with self.lock:
+            return {f.name: getattr(self, f.name) for f in fields(self) if f.name != "lock"}
+
+
+@dataclass
+class OutboxWorker:
+    dsn: str
+    consumer: Consumer
+    batch: int = 100
+    lease: float = 60.0           # seconds a claimed batch is invisible to other workers
+    max_attempts: int = 8
+    backoff: float = 2.0          # first retry delay; doubles per attempt
+    max_backoff: float = 600.0
+    idle: float = 1.0             # poll interval when nothing is due
+    keep: str = "7 days"          # delivered rows kept this long
+    stats: OutboxStats = field(default_factory=OutboxStats)
+
+    def _delay(self, attempts: int) -> float:
+        d = min(self.backoff * 2 ** (attempts - 1), self.max_backoff)
+        return d * (0.5 + random.random() / 2)   # jitter spreads retries of a failed batch
+
+    def _deliver(self, events: List[Dict[str, Any]]) -> Dict[int, str]:
+        """event_id -> error for everything that wasn't delivered."""
+        by_topic: Dict[str, List[Dict[str, Any]]] = {}
+        for e in events:
+            by_topic.setdefault(e["topic"], []).append(e)
+        errors: Dict[int, str] = {}
+        for topic, group in by_topic.items():
+            t = time.perf_counter()
+            docs = [{"idempotency_key": e["idempotency_key"], "employee_id": e["aggregate_id"],
+                     "attempt": e["attempts"], "payload": e["payload"]} for e in group]
+            try:
+                failed = self.consumer(topic, docs)
+            except Exception as exc:
+                failed = {e["idempotency_key"]: repr(exc) for e in group}
+            REGISTRY.observe("onboarding_outbox_deliver_seconds", time.perf_counter() - t, topic=topic)
+            n_failed = 0
+            for e in group:
+                if e["idempotency_key"] in failed:
+                    errors[e["event_id"]] = str(failed[e["idempotency_key"]])
+                    n_failed += 1
+            REGISTRY.inc("onboarding_outbox_delivered_total", len(group) - n_failed, topic=topic)
+            if n_failed:
+                REGISTRY.inc("onboarding_outbox_failed_total", n_failed, topic=topic)
+        return errors
+
+    def run_once(self, conn) -> int:
+        """Claim, deliver and settle one batch; returns events claimed."""
+        with conn.transaction():
+            events = conn.execute(CLAIM_SQL, {"batch": self.batch, "lease": self.lease}).fetchall()
+        if not events:
+            return 0
+        errors = self._deliver(events)
+        ok = [e["event_id"] for e in events if e["event_id"] not in errors]
+        failed = [e for e in events if e["event_id"] in errors]
+        with conn.transaction():
+            if ok:
+                conn.execute(DONE_SQL, {"ids": ok})
+            if failed:
+                conn.execute(RETRY_SQL, {
+                    "ids": [e["event_id"] for e in failed],
+                    "delays": [self._delay(e["attempts"]) for e in failed],
+                    "errors": [errors[e["event_id"]] for e in failed],
+                    "max_attempts": self.max_attempts,
+                })
+        dead = sum(1 for e in failed if e["attempts"] >= self.max_attempts)
+        if dead:
+            REGISTRY.inc("onboarding_outbox_dead_total", dead)
+            print(f"outbox: {dead} event(s) gave up after {self.max_attempts} attempts")
+        self.stats.add(delivered=len(ok), retried=len(failed) - dead, dead=dead, batches=1)
+        return len(events)
+
+    def purge(self, conn, batch: int = 5000) -> int:
+        total = 0
+        while True:
+            n = conn.execute(PURGE_SQL, {"keep": self.keep, "batch": batch}).rowcount
+            total += n
+            if n < batch:
+                break
+        self.stats.add(purged=total)
+        return total
+
+    def drain(self) -> OutboxStats:
+        """Deliver until nothing is due (CLI / tests)."""
+        with psycopg.connect(self.dsn, autocommit=True, row_factory=dict_row) as conn:
+            while self.run_once(conn):
+                pass
+        return self.stats
+
+    def _loop(self, purge_every: float) -> None:
+        last_purge = time.monotonic()
+        while True:
+            try:
+                with psycopg.connect(self.dsn, autocommit=True, row_factory=dict_row) as conn:
+                    while True:
+                        if self.run_once(conn) < self.batch:
+                            time.sleep(self.idle)   # a full batch means more is waiting
+                        if time.monotonic() - last_purge > purge_every:
+                            self.purge(conn)
+                            last_purge = time.monotonic()
+            except Exception as e:
+                print("outbox worker error:", e)
+                time.sleep(self.idle)
+
+    def start_background(self, workers: int = 2, purge_every: float = 3600.0) -> List[threading.Thread]:
+        """`workers` daemon threads, each with its own connection; SKIP LOCKED keeps their batches apart."""
+        threads = []
+        for i in range(workers):
+            t = threading.Thread(target=self._loop, args=(purge_every if i == 0 else float("inf"),),
+                                 name=f"outbox-{i}", daemon=True)
+            t.start()
+            threads.append(t)
+        return threads
+
+
+def backlog(conn) -> Dict[str, int]:
+    return {r["status"]: r["n"] for r in conn.execute(BACKLOG_SQL).fetchall()}
+
+
+def from_env(dsn: Optional[str] = None, consumer: Optional[Consumer] = None) -> Optional[OutboxWorker]:
+    """A worker if OUTBOX_WORKERS is set and a consumer is configured, else None."""
+    if not os.getenv("OUTBOX_WORKERS"):
+        return None
+    consumer = consumer or consumer_from_env()
+    if consumer is None:
+        print("outbox: OUTBOX_WORKERS set but neither OUTBOX_URL nor OUTBOX_CONSUMER=stub; not starting")
+        return None
+    return OutboxWorker(dsn=dsn or os.getenv("DATABASE_URL"), consumer=consumer,
+                        batch=int(os.getenv("OUTBOX_BATCH", "100")),
+                        max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")))
+
+
+def start_from_env(dsn: Optional[str] = None) -> Optional[OutboxWorker]:
+    worker = from_env(dsn)
+    if worker:
+        worker.start_background(int(os.getenv("OUTBOX_WORKERS")))
+    return worker
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Deliver queued onboarding provisioning events.")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--batch", type=int, default=100)
+    ap.add_argument("--loop", action="store_true", help="keep running (otherwise drain once and exit)")
+    ap.add_argument("--stub", action="store_true", help="deliver to the in-process StubConsumer")
+    ap.add_argument("--stub-fail-rate", type=float, default=0.0)
+    args = ap.parse_args()
+
+    load_dotenv()
+    sink = StubConsumer(fail_rate=args.stub_fail_rate) if args.stub else consumer_from_env()
+    if sink is None:
+        raise SystemExit("Set OUTBOX_URL (or OUTBOX_CONSUMER=stub), or pass --stub.")
+    job = OutboxWorker(dsn=os.getenv("DATABASE_URL"), consumer=sink, batch=args.batch)
+    if args.loop:
+        job.start_background(args.workers)
+        while True:
+            time.sleep(30)
+            print(job.stats.as_dict())
+    print(job.drain().as_dict())
+    if isinstance(sink, StubConsumer):
+        print(sink.stats())
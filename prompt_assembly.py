@@ -0,0 +1,116 @@
+# prompt_assembly.py
+from __future__ import annotations
+import os
+from typing import Optional, Dict, List, Tuple
+
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+
+try:  # exact counts when available, ~4 chars/token otherwise
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")
+except Exception:  # pragma: no cover - optional dependency
+    _ENC = None
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+MESSAGE_OVERHEAD = 4  # role/separator tokens per chat message
+
+# Never changes between turns or users, so it goes first: together with the
+# bound tool schemas it forms a stable prefix the provider can cache.
+STATIC_INSTRUCTIONS = (
+    "You are the onboarding assistant for new employees. Collect the new hire's "
+    "name, email, phone, seat preference (cabin or cubicle) and laptop OS "
+    "(linux, windows or macos), one missing item at a time. If unsure an option "
+    "is still available, call check_availability first and offer what is left. Use "
+    "assign_seating_space to reserve a seat and assign_equipment_kit to reserve "
+    "the laptop and accessories; once both seat type and OS are known, call them "
+    "together in the same turn. These only hold the items for a while: summarize "
+    "the plan, ask for confirmation, and once the user approves call "
+    "confirm_assignment with their name, email and phone, then give them their "
+    "employee ID and office email (cancel_reservation if they back out). Be brief."
+)
+STATIC_PREFIX = SystemMessage(content=STATIC_INSTRUCTIONS)
+
+
+def count_text(text: str) -> int:
+    if _ENC is not None:
+        return len(_ENC.encode(text))
+    return len(text) // 4 + 1
+
+
+def count_message(m: BaseMessage) -> int:
+    n = count_text(str(m.content or ""))
+    for tc in getattr(m, "tool_calls", None) or []:
+        n += count_text(tc.get("name", "")) + count_text(str(tc.get("args", "")))
+    return n + MESSAGE_OVERHEAD
+
+
+def _clip_to_tokens(m: BaseMessage, budget: int) -> BaseMessage:
+    """Keep head and tail of an oversized message (e.g. a pasted document)."""
+    text = str(m.content or "")
+    keep_chars = max(budget, 16) * 4
+    if len(text) <= keep_chars:
+        return m
+    half = keep_chars // 2
+    return m.model_copy(update={"content": text[:half] + "\n…[truncated]…\n" + text[-half:]})
+
+
+def dynamic_block(profile: dict, summary: str) -> Optional[SystemMessage]:
+    parts = []
+    if profile:
+        parts.append(f"Known user profile: {profile}.")
+    if summary:
+        parts.append(f"Conversation summary: {summary}")
+    return SystemMessage(content=" ".join(parts)) if parts else None
+
+
+def assemble_prompt(
+    messages: List[BaseMessage],
+    profile: dict,
+    summary: str,
+    token_cache: Optional[Dict[str, int]] = None,
+    budget: int = PROMPT_TOKEN_BUDGET,
+    start: int = 0,
+) -> Tuple[List[BaseMessage], Dict[str, int], int]:
+    """
+    Build [static prefix, profile/summary, newest history that fits `budget`].
+    Messages before `start` (already covered by the summary) are not considered.
+
+    Returns (prompt, new_token_counts, tokens) where new_token_counts are the
+    per-message counts computed this call (keyed by message id) so the graph
+    can persist them and never count the same message twice.
+    """
+    token_cache = token_cache or {}
+    new_counts: Dict[str, int] = {}
+
+    def tokens_of(m: BaseMessage) -> int:
+        if m.id and m.id in token_cache:
+            return token_cache[m.id]
+        n = count_message(m)
+        if m.id:
+            new_counts[m.id] = n
+        return n
+
+    head = [STATIC_PREFIX]
+    dyn = dynamic_block(profile, summary)
+    if dyn is not None:
+        head.append(dyn)
+    used = sum(count_message(m) for m in head)
+
+    # Walk back from the newest message until the budget is spent.
+    window: List[BaseMessage] = []
+    for m in reversed(messages[start:]):
+        n = tokens_of(m)
+        if used + n > budget:
+            if not window:  # always send the latest message, clipped if needed
+                window.append(_clip_to_tokens(m, budget - used))
+                used = budget
+            break
+        window.append(m)
+        used += n
+    window.reverse()
+
+    # A tool result without the AI message that requested it is rejected by the API.
+    while window and isinstance(window[0], ToolMessage):
+        used -= tokens_of(window.pop(0))
+
+    return head + window, new_counts, used
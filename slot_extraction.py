@@ -0,0 +1,124 @@
+# slot_extraction.py
+from __future__ import annotations
+import re
+from typing import Optional, Dict, Tuple
+
+from employee import Employee
+from inventory import normalize_os
+
+# Profile slots in the order we ask for them.
+SLOT_ORDER = ("name", "email", "phone", "seat_type", "os_requirement")
+
+SLOT_PROMPTS = {
+    "name": "What is your full name?",
+    "email": "What's your personal email address?",
+    "phone": "What phone number can we reach you on?",
+    "seat_type": "Would you prefer a cabin or a cubicle?",
+    "os_requirement": "Which laptop OS do you need: linux, windows or macos?",
+}
+
+# Words that are never part of a name after "my name is / I am ...", in any
+# case ("I am Sure a cabin").
+_NOT_NAME = (
+    r"(?i:cabin|cubicle|linux|ubuntu|windows|macos|mac|osx|and|but|or|i|a|an|the|want|need|would|"
+    r"like|prefer|please|from|with|my|looking|fine|good|ok|okay|new|using|on|here|at|in|to|"
+    r"sure|happy|great|glad|ready|excited|just|not|so|very|really|also|all|still|back|done|"
+    r"interested|going|thinking|well|starting|joining)\b"
+)
+# Case-sensitive on purpose: a name has to be capitalised ("I am happy" is not one).
+_NAME_WORD = rf"(?!{_NOT_NAME})[A-Z][a-z]+"
+
+# Every slot in one alternation so a message is scanned exactly once. Only the
+# keywords are case-insensitive; name capture relies on capitalisation.
+SLOT_RE = re.compile(
+    rf"""
+      (?P<email>[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{{2,}})
+    | (?<![\d-])(?!\d{{4}}-\d\d-\d\d\b)(?P<phone>\+?\d[\d\s().-]{{6,}}\d)
+    | \b(?P<seat_type>(?i:cabin|cubicle))(?i:s)?\b
+    | \b(?P<os_requirement>(?i:linux|ubuntu|windows|mac\s?os|macos|osx|mac))\b
+    | \b(?i:my\s+name\s+is|i\s+am|i'm|this\s+is|name\s*[:=])\s+(?P<name>{_NAME_WORD}(?:\s+{_NAME_WORD}){{0,3}})
+    """,
+    re.X,
+)
+
+# What may be left over once slots are removed for the message to count as
+# pure slot-filling (anything else goes to the LLM).
+FILLER = frozenset("""
+    hi hello hey thanks thank you my name is email mail e-mail phone number mobile cell it's its i i'm i'd am
+    prefer would like want need a an the and please seat seating laptop os use using with for me
+    sure yes ok okay also is: it be will work
+""".split())
+_WORD = re.compile(r"[a-z'-]+")
+# "not windows, linux please": which value is meant is for the LLM to decide.
+_NEGATION = re.compile(r"\b(?:no|not|never|don't|dont|doesn't|isn't|instead|except|without|rather)\b|n't\b", re.I)
+
+
+def extract_slots(text: str) -> Dict[str, str]:
+    """Raw slot values found in `text` (first occurrence wins)."""
+    found: Dict[str, str] = {}
+    for m in SLOT_RE.finditer(text):
+        key = m.lastgroup
+        if key and key not in found:
+            found[key] = m.group(key).strip()
+    return found
+
+
+def residual_words(text: str) -> list[str]:
+    stripped = SLOT_RE.sub(" ", text)
+    return [w for w in _WORD.findall(stripped.lower()) if w not in FILLER]
+
+
+def fill_profile(profile: dict, slots: Dict[str, str]) -> Tuple[dict, Dict[str, str]]:
+    """
+    Normalize slots through Employee.update_field and merge into `profile`.
+    Returns (new_profile, rejected) where rejected maps slot -> reason.
+    """
+    emp = Employee()
+    rejected: Dict[str, str] = {}
+    for key, value in slots.items():
+        if key == "phone":
+            value = re.sub(r"[^\d+]", "", value)
+        if key == "os_requirement":
+            value = normalize_os(value) or value
+        try:
+            emp.update_field(key, value)
+        except (ValueError, AttributeError) as e:
+            rejected[key] = str(e)
+    if "email" in slots and "email" not in rejected and not emp._email_ok():
+        rejected["email"] = "invalid email"
+    new = dict(profile or {})
+    for key in slots:
+        if key not in rejected:
+            new[key] = getattr(emp, key)
+    return new, rejected
+
+
+def next_missing(profile: dict) -> Optional[str]:
+    for key in SLOT_ORDER:
+        if not (profile or {}).get(key):
+            return key
+    return None
+
+
+def fast_path(text: str, profile: dict) -> Tuple[dict, Optional[str]]:
+    """
+    Deterministic slot-filling turn. Returns (profile, reply); reply is None
+    when the message needs the LLM (a question, a request, unparsed content,
+    a negation, or nothing left to collect so tools have to run). The profile
+    is only updated together with a reply: anything the LLM handles is left
+    for the LLM/tools to fill, so a half-understood message can't mark a
+    slot as known.
+    """
+    slots = extract_slots(text)
+    if not slots or "?" in text or _NEGATION.search(text) or residual_words(text):
+        return profile, None
+    new_profile, rejected = fill_profile(profile, slots)
+    if rejected:
+        return profile, None
+    missing = next_missing(new_profile)
+    if missing is None:
+        return profile, None
+
+    got = ", ".join(f"{k.replace('_', ' ')}: {new_profile[k]}" for k in SLOT_ORDER if k in slots)
+    greet = f"Thanks {new_profile['name'].split()[0]}! " if "name" in slots else "Thanks! "
+    return new_profile, f"{greet}Noted {got}. {SLOT_PROMPTS[missing]}"
@@ -0,0 +1,117 @@
+# tool_executor.py
+from __future__ import annotations
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional
+
+import psycopg
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+
+# A transactional tool runs on a connection the executor owns:
+#   fn(conn, args, owner, after_commit) -> result dict with "ok"
+# It must not commit; the executor commits or rolls back the whole group.
+# Side effects that must only happen once the group is durable (free-inventory
+# cache updates) are appended to after_commit as callables.
+TxTool = Callable[[Any, dict, Optional[str], List[Callable[[], None]]], dict]
+
+
+class _GroupFailed(Exception):
+    pass
+
+
+def _call_key(tc: dict) -> str:
+    return tc["name"] + ":" + json.dumps(tc.get("args") or {}, sort_keys=True, default=str)
+
+
+def make_tool_node(tools: list, pool, transactional: Dict[str, TxTool], max_workers: int = 8):
+    """
+    Graph node replacing ToolNode for the onboarding agents.
+
+    For the tool calls of the last AIMessage it:
+      * runs identical calls (same name + args) only once,
+      * runs every DB-mutating call for this employee (thread) in ONE
+        transaction on one pooled connection: all commit or all roll back,
+      * runs the remaining independent calls concurrently next to that group.
+    """
+    by_name = {t.name: t for t in tools}
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+
+    def run_plain(tc: dict, config: RunnableConfig) -> Any:
+        try:
+            return by_name[tc["name"]].invoke(tc.get("args") or {}, config=config)
+        except Exception as e:
+            return {"ok": False, "message": f"Error: {e}"}
+
+    def run_group(calls: List[dict], owner: Optional[str]) -> Dict[str, Any]:
+        results: Dict[str, Any] = {}
+        failed: Optional[dict] = None
+        current: Optional[dict] = None   # the call running when an exception hit
+        after_commit: List[Callable[[], None]] = []
+        try:
+            with pool.connection() as conn:
+                with conn.transaction():
+                    for tc in calls:
+                        current = tc
+                        res = transactional[tc["name"]](conn, tc.get("args") or {}, owner, after_commit)
+                        results[tc["id"]] = res
+                        if isinstance(res, dict) and res.get("ok") is False:
+                            failed = tc
+                            raise _GroupFailed()
+                    current = None
+        except _GroupFailed:
+            pass
+        except (psycopg.Error, TypeError, ValueError) as e:
+            error = {"ok": False, "message": f"Error: {e}"}
+            if current is None:
+                # connection or commit failure: no single call to blame
+                return {tc["id"]: {"ok": False, "message": f"Rolled back: transaction failed (Error: {e}). "
+                                                           "Nothing was assigned."} for tc in calls}
+            failed = current
+            results = {current["id"]: error}
+        else:
+            for update in after_commit:
+                update()
+        if failed is not None:
+            reason = results[failed["id"]].get("message", "failed")
+            for tc in calls:
+                if tc["id"] != failed["id"]:
+                    results[tc["id"]] = {
+                        "ok": False,
+                        "message": f"Rolled back: {failed['name']} failed ({reason}). Nothing was assigned.",
+                    }
+        return results
+
+    def tool_node(state: dict, config: RunnableConfig) -> dict:
+        last = state["messages"][-1]
+        calls = list(getattr(last, "tool_calls", None) or []) if isinstance(last, AIMessage) else []
+        if not calls:
+            return {"messages": []}
+        owner = ((config or {}).get("configurable") or {}).get("thread_id")
+
+        # 1) dedupe identical calls
+        unique: Dict[str, dict] = {}
+        alias: Dict[str, str] = {}
+        for tc in calls:
+            key = _call_key(tc)
+            unique.setdefault(key, tc)
+            alias[tc["id"]] = unique[key]["id"]
+
+        # 2) split into the transactional group and independent calls
+        tx_calls = [tc for tc in unique.values() if tc["name"] in transactional]
+        plain_calls = [tc for tc in unique.values() if tc["name"] not in transactional]
+
+        # 3) run both concurrently
+        group_future = executor.submit(run_group, tx_calls, owner) if tx_calls else None
+        plain_futures = {tc["id"]: executor.submit(run_plain, tc, config) for tc in plain_calls}
+        results: Dict[str, Any] = group_future.result() if group_future else {}
+        results.update({cid: f.result() for cid, f in plain_futures.items()})
+
+        messages = []
+        for tc in calls:
+            res = results[alias[tc["id"]]]
+            content = res if isinstance(res, str) else json.dumps(res, default=str)
+            messages.append(ToolMessage(content=content, name=tc["name"], tool_call_id=tc["id"]))
+        return {"messages": messages}
+
+    return tool_node
@@ -0,0 +1,282 @@
+# transcript_search.py
+"""
+Full-text search over onboarding conversations.
+
+Conversations only live in the checkpoint tables, serialized per thread, so
+nothing in them can be queried. This keeps a projection next to them
+(database/transcripts.sql):
+
+  * transcript_threads   one row per thread: the slot-filled profile (JSONB,
+                         GIN jsonb_path_ops) and the projection watermark
+  * transcript_messages  one row per user/assistant message with a stored
+                         tsvector (GIN) and a (created_at, thread_id, seq)
+                         index for newest-first paging
+
+TranscriptProjector appends a thread's new messages after each turn, on a
+background thread, in one statement (thread upsert + message insert);
+re-projecting is harmless, (thread_id, seq) is the key. Threads from before
+the projection existed are filled in with `--backfill`, which reads the
+latest checkpoint of every thread.
+
+search() pages newest-first with a keyset cursor, so page N costs what
+page 1 costs. Example, "who asked for a macOS laptop last week":
+
+    python transcript_search.py "macos laptop" --days 7 --role user
+    python transcript_search.py --backfill
+"""
+from __future__ import annotations
+import os
+import json
+import base64
+import argparse
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Tuple
+
+PAGE_SIZE = 20
+MAX_PAGE = 100
+WATERMARK_CACHE = 10_000   # threads whose watermark is remembered in-process
+BACKFILL_BATCH = 200
+TS_CONFIG = "english"      # must match the tsv column in transcripts.sql
+
+WATERMARK_SQL = "SELECT projected_upto FROM onboarding.transcript_threads WHERE thread_id = %s;"
+
+# The thread row goes in first (CTE) so the messages' foreign key is satisfied
+# within the same statement.
+PROJECT_SQL = """
+    WITH t AS (
+        INSERT INTO onboarding.transcript_threads AS t (thread_id, profile, projected_upto)
+        VALUES (%(thread_id)s, %(profile)s::jsonb, %(upto)s)
+        ON CONFLICT (thread_id) DO UPDATE
+        SET profile = EXCLUDED.profile,
+            projected_upto = GREATEST(t.projected_upto, EXCLUDED.projected_upto),
+            updated_at = NOW()
+    )
+    INSERT INTO onboarding.transcript_messages (thread_id, seq, role, content, created_at)
+    SELECT %(thread_id)s, m.seq, m.role, m.content, COALESCE(%(at)s::timestamptz, NOW())
+    FROM unnest(%(seqs)s::int[], %(roles)s::text[], %(contents)s::text[]) AS m(seq, role, content)
+    ON CONFLICT (thread_id, seq) DO NOTHING;
+"""
+
+# Filters are spliced in from this fixed set (values stay parameters), so the
+# planner sees a plain predicate per page instead of "param IS NULL OR ..."
+# branches that hide the indexes.
+SEARCH_FILTERS = {
+    "query":     "m.tsv @@ q.q",
+    "since":     "m.created_at >= %(since)s::timestamptz",
+    "until":     "m.created_at < %(until)s::timestamptz",
+    "role":      "m.role = %(role)s",
+    "thread_id": "m.thread_id = %(thread_id)s",
+    "profile":   "t.profile @> %(profile)s::jsonb",
+    "cursor":    "(m.created_at, m.thread_id, m.seq) < (%(c_at)s::timestamptz, %(c_thread)s, %(c_seq)s)",
+}
+
+SEARCH_SQL = """
+    SELECT m.thread_id, m.seq, m.role, m.created_at, t.profile,
+           {snippet} AS snippet
+    FROM onboarding.transcript_messages m
+    JOIN onboarding.transcript_threads t USING (thread_id)
+    CROSS JOIN (SELECT websearch_to_tsquery('{cfg}', %(query)s) AS q) q
+    WHERE {where}
+    ORDER BY m.created_at DESC, m.thread_id DESC, m.seq DESC
+    LIMIT %(limit)s;
+"""
+
+# ts_headline is costly, but the planner evaluates it only for the rows that
+# survive the LIMIT.
+SNIPPET_SQL = f"ts_headline('{TS_CONFIG}', m.content, q.q, 'MaxFragments=1, MinWords=8, MaxWords=25')"
+PLAIN_SNIPPET_SQL = "left(m.content, 200)"
+
+
+# ---------------- projection ----------------
+
+class TranscriptProjector:
+    """Appends new transcript messages of a thread to the search tables."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._upto: Dict[str, int] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="transcript-index")
+
+    def project(self, thread_id: str, messages: List[Dict[str, str]], profile: Optional[dict] = None,
+                at: Optional[str] = None) -> int:
+        """
+        `messages` is the thread's whole transcript as {"role", "content"}
+        dicts; only the part past the watermark is sent. Returns rows sent.
+        """
+        with self.pool.connection() as conn:
+            upto = self._upto.get(thread_id)
+            if upto is None:
+                row = conn.execute(WATERMARK_SQL, (thread_id,)).fetchone()
+                upto = 0 if row is None else (row["projected_upto"] if isinstance(row, dict) else row[0])
+            new = messages[upto:]
+            if new:
+                conn.execute(PROJECT_SQL, {
+                    "thread_id": thread_id,
+                    "profile": json.dumps(profile or {}, default=str),
+                    "upto": len(messages),
+                    "at": at,
+                    "seqs": list(range(upto, len(messages))),
+                    "roles": [m["role"] for m in new],
+                    "contents": [m["content"] for m in new],
+                })
+        if len(self._upto) >= WATERMARK_CACHE:
+            self._upto.clear()
+        self._upto[thread_id] = max(upto, len(messages))
+        return len(new)
+
+    def submit(self, thread_id: str, messages: List[Dict[str, str]], profile: Optional[dict] = None) -> None:
+        """Project off the caller's thread; indexing must never slow a reply down."""
+        def run():
+            try:
+                self.project(thread_id, messages, profile)
+            except Exception as e:
+                print("transcript index error:", e)
+        self._executor.submit(run)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+def from_env(pool) -> Optional[TranscriptProjector]:
+    """A projector on `pool` if TRANSCRIPT_INDEX=1, else None."""
+    if os.getenv("TRANSCRIPT_INDEX") != "1":
+        return None
+    return TranscriptProjector(pool)
+
+
+# ---------------- search ----------------
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    raw = json.dumps([row["created_at"].isoformat(), row["thread_id"], row["seq"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str, int]:
+    try:
+        at, thread_id, seq = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return at, thread_id, int(seq)
+    except (ValueError, TypeError) as e:
+        raise ValueError("invalid cursor") from e
+
+
+def _search_sql(query: Optional[str], since: Optional[str], until: Optional[str], role: Optional[str],
+                profile: Optional[dict], thread_id: Optional[str], cursor: Optional[str],
+                limit: int) -> Tuple[str, Dict[str, Any], int]:
+    limit = max(1, min(int(limit or PAGE_SIZE), MAX_PAGE))
+    query = (query or "").strip() or None
+    params: Dict[str, Any] = {"query": query or "", "since": since, "until": until, "role": role,
+                              "thread_id": thread_id, "limit": limit + 1,
+                              "profile": json.dumps(profile) if profile else None}
+    if cursor:
+        params["c_at"], params["c_thread"], params["c_seq"] = decode_cursor(cursor)
+    active = {"query": query, "since": since, "until": until, "role": role,
+              "thread_id": thread_id, "profile": profile, "cursor": cursor}
+    where = " AND ".join(SEARCH_FILTERS[k] for k, v in active.items() if v) or "TRUE"
+    sql = SEARCH_SQL.format(snippet=SNIPPET_SQL if query else PLAIN_SNIPPET_SQL, cfg=TS_CONFIG, where=where)
+    return sql, params, limit
+
+
+def _page(rows: list, limit: int) -> dict:
+    more = len(rows) > limit
+    rows = rows[:limit]
+    results = [{"thread_id": r["thread_id"], "seq": r["seq"], "role": r["role"],
+                "created_at": r["created_at"].isoformat(), "snippet": r["snippet"],
+                "profile": r["profile"]} for r in rows]
+    return {"results": results, "next_cursor": encode_cursor(rows[-1]) if more else None}
+
+
+def search(conn, query: Optional[str] = None, *, since: Optional[str] = None, until: Optional[str] = None,
+           role: Optional[str] = None, profile: Optional[dict] = None, thread_id: Optional[str] = None,
+           cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    """
+    Newest-first matches of `query` (web-search syntax: words, "phrases",
+    OR, -exclude; empty = everything) within the filters. `profile` is a
+    containment filter, e.g. {"os_requirement": "macos"}. Pass the returned
+    next_cursor back for the next page. `conn` must use dict_row.
+    """
+    sql, params, limit = _search_sql(query, since, until, role, profile, thread_id, cursor, limit)
+    with conn.cursor() as cur:
+        cur.execute(sql, params)
+        return _page(cur.fetchall(), limit)
+
+
+async def asearch(conn, query: Optional[str] = None, *, since: Optional[str] = None, until: Optional[str] = None,
+                  role: Optional[str] = None, profile: Optional[dict] = None, thread_id: Optional[str] = None,
+                  cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    sql, params, limit = _search_sql(query, since, until, role, profile, thread_id, cursor, limit)
+    async with conn.cursor() as cur:
+        await cur.execute(sql, params)
+        return _page(await cur.fetchall(), limit)
+
+
+# ---------------- backfill ----------------
+
+def backfill(pool, batch: int = BACKFILL_BATCH) -> dict:
+    """Project every checkpointed thread from its latest checkpoint (resumable, idempotent)."""
+    from checkpoint_delta import make_checkpointer
+    from onboarding_chatbot_with_profile import visible_messages
+
+    projector = TranscriptProjector(pool)
+    threads = rows = 0
+    after = ""
+    with pool.connection() as conn:
+        saver = make_checkpointer(conn)
+        while True:
+            ids = [r["thread_id"] for r in conn.execute(
+                "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id > %s ORDER BY thread_id LIMIT %s",
+                (after, batch)).fetchall()]
+            if not ids:
+                break
+            for thread_id in ids:
+                tup = saver.get_tuple({"configurable": {"thread_id": thread_id}})
+                if tup is None:
+                    continue
+                values = tup.checkpoint.get("channel_values", {})
+                messages = visible_messages(values.get("messages", []))
+                # per-message times aren't checkpointed; the thread's last checkpoint stands in
+                rows += projector.project(thread_id, messages, values.get("profile"), at=tup.checkpoint.get("ts"))
+                threads += 1
+            after = ids[-1]
+            print(f"backfill: {threads} threads, {rows} messages")
+    return {"threads": threads, "messages": rows}
+
+
+def main():
+    from dotenv import load_dotenv
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    ap = argparse.ArgumentParser(description="Search onboarding transcripts, or backfill the index.")
+    ap.add_argument("query", nargs="?", default=None)
+    ap.add_argument("--days", type=float, help="only the last N days")
+    ap.add_argument("--since", help="ISO timestamp")
+    ap.add_argument("--until")
+    ap.add_argument("--role", choices=("user", "assistant"))
+    ap.add_argument("--os", dest="os_requirement", help="profile filter")
+    ap.add_argument("--seat-type", help="profile filter")
+    ap.add_argument("--limit", type=int, default=PAGE_SIZE)
+    ap.add_argument("--cursor")
+    ap.add_argument("--backfill", action="store_true", help="project all checkpointed threads")
+    args = ap.parse_args()
+
+    load_dotenv()
+    with ConnectionPool(os.getenv("DATABASE_URL"), min_size=1, max_size=2,
+                        kwargs={"row_factory": dict_row, "autocommit": True}) as pool:
+        if args.backfill:
+            print(backfill(pool))
+            return
+        since = args.since
+        if args.days:
+            since = (datetime.now(timezone.utc) - timedelta(days=args.days)).isoformat()
+        profile = {k: v for k, v in (("os_requirement", args.os_requirement), ("seat_type", args.seat_type)) if v}
+        with pool.connection() as conn:
+            page = search(conn, args.query, since=since, until=args.until, role=args.role,
+                          profile=profile or None, cursor=args.cursor, limit=args.limit)
+        for r in page["results"]:
+            print(f"{r['created_at']}  {r['thread_id']}#{r['seq']}  {r['role']}: {r['snippet']}")
+        print("next_cursor:", page["next_cursor"])
+
+
+if __name__ == "__main__":
+    main()